@@ -1,9 +1,8 @@
 
 import asyncio
 import pandas as pd
-import ccxt.async_support as ccxt
-import yfinance as yf
 import config
+import market_data
 import signals
 import logging
 from datetime import datetime, timedelta, timezone
@@ -18,54 +17,30 @@ CRYPTO_TIMEFRAME = '5m'
 STOCK_TIMEFRAME = '5m'
 
 async def fetch_historical_crypto(symbol, limit_days=BACKTEST_DAYS):
-    """Fetches historical OHLCV data for Crypto from Binance."""
-    exchange_config = {'enableRateLimit': True}
-    if config.BINANCE_API_KEY and config.BINANCE_SECRET_KEY:
-        exchange_config['apiKey'] = config.BINANCE_API_KEY
-        exchange_config['secret'] = config.BINANCE_SECRET_KEY
-    exchange = ccxt.binance(exchange_config)
-    try:
-        since = exchange.parse8601((datetime.now(timezone.utc) - timedelta(days=limit_days)).isoformat())
-        ohlcv = await exchange.fetch_ohlcv(symbol, CRYPTO_TIMEFRAME, since, limit=1000)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        return df
-    except Exception as e:
-        logger.error(f"Error fetching crypto history for {symbol}: {e}")
-        return None
-    finally:
-        await exchange.close()
+    """Fetches historical OHLCV data for Crypto (Binance via the local candle store)."""
+    return await _fetch_historical(symbol, CRYPTO_TIMEFRAME, limit_days)
+
+async def fetch_historical_stock(symbol, limit_days=BACKTEST_DAYS):
+    """Fetches historical OHLCV data for Stock (Yahoo Finance via the local candle store)."""
+    # yfinance 5m data is limited to 60 days, so 30 is fine
+    return await _fetch_historical(symbol, STOCK_TIMEFRAME, limit_days)
 
-def fetch_historical_stock(symbol, limit_days=BACKTEST_DAYS):
-    """Fetches historical OHLCV data for Stock from Yahoo Finance."""
+async def _fetch_historical(symbol, timeframe, limit_days):
+    """Syncs only the missing candles into the store, then reads the range from disk."""
     try:
-        # yfinance 5m data is limited to 60 days, so 30 is fine
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period=f"{limit_days}d", interval=STOCK_TIMEFRAME)
-        if df.empty:
+        since = int((datetime.now(timezone.utc) - timedelta(days=limit_days)).timestamp() * 1000)
+        await market_data.sync_candle_store(symbol, timeframe, since=since)
+        candles = market_data.get_candle_store().read(symbol, timeframe, start=since)
+        if candles is None or len(candles) == 0:
             return None
-        df = df.reset_index()
-        # Normalize columns
-        df = df.rename(columns={'Datetime': 'timestamp', 'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'})
-        # Ensure UTC timezone for consistency or remove tz to prevent mismatch issues
-        if df['timestamp'].dt.tz is not None:
-             df['timestamp'] = df['timestamp'].dt.tz_convert(None)
-        return df
+        stats = market_data.record_series_health(symbol, timeframe, candles.timestamp, market_data.session_day_offset(symbol))
+        if stats['gaps']:
+            logger.warning(f"{symbol}: {stats['missing_bars']} bars missing from history ({stats['missing_ratio']:.1%}), backtest runs over the holes")
+        return market_data.candles_to_df(candles)
     except Exception as e:
-        logger.error(f"Error fetching stock history for {symbol}: {e}")
+        logger.error(f"Error fetching history for {symbol}: {e}")
         return None
 
-def resample_to_5m(df_1m):
-    """Resamples 1m dataframe to 5m for Crypto HTF analysis."""
-    df_5m = df_1m.set_index('timestamp').resample('5min').agg({
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }).dropna().reset_index()
-    return df_5m
-
 async def simulate_trades(df, symbol, asset_type):
     """Replays the signals logic over the dataframe."""
     trades = []
@@ -75,6 +50,7 @@ async def simulate_trades(df, symbol, asset_type):
     
     # Start after 200 candles to allow EMA 50 (on 5m) to warmup if calculating on the fly
     start_index = 200 
+    candles = market_data.df_to_candles(df) if asset_type == 'CRYPTO' else None
     
     for i in range(start_index, len(df)):
         # Create a window of data simulatin "live" state
@@ -86,12 +62,12 @@ async def simulate_trades(df, symbol, asset_type):
             signal_data = None
             
             if asset_type == 'CRYPTO':
-                # Generate 5m Data from current 1m window
-                # We perform resampling on the available window to mimic live state
-                # Optimally we should have pre-resampled, but this ensures no lookahead bias
-                window_5m = resample_to_5m(window)
-                if len(window_5m) > 50:
-                    signal_data = await signals.analyze_crypto(None, symbol, df_1m=window, df_5m=window_5m)
+                # Derive HTF candles from the same cached-size window the live bot sees
+                # (only candles up to i, so no lookahead bias)
+                window_raw = candles[max(0, i + 1 - config.CANDLE_CACHE_SIZE):i + 1]
+                window_htf = market_data.resample_candles(window_raw, config.CRYPTO_HTF_TIMEFRAME, CRYPTO_TIMEFRAME)
+                if len(window_htf) > 50:
+                    signal_data = await signals.analyze_crypto(None, symbol, raw_candles=window_raw, raw_htf_candles=window_htf)
             else:
                 # Stock (already 5m)
                 signal_data = await signals.analyze_stock(symbol, df=window)
@@ -164,7 +140,7 @@ async def run_backtest():
     chk_stocks = ['RELIANCE.NS', 'TCS.NS'] 
     for symbol in chk_stocks:
         logger.info(f"Fetching data for {symbol}...")
-        df = fetch_historical_stock(symbol, limit_days=7) # 7 days
+        df = await fetch_historical_stock(symbol, limit_days=7) # 7 days
         if df is not None:
             trades = await simulate_trades(df, symbol, 'STOCK')
             all_trades.extend(trades)
@@ -195,5 +171,11 @@ async def run_backtest():
         df_res.to_csv("backtest_results.csv", index=False)
         print("\nSaved detailed results to backtest_results.csv")
 
+async def main():
+    try:
+        await run_backtest()
+    finally:
+        await market_data.close_crypto_exchange()
+
 if __name__ == "__main__":
-    asyncio.run(run_backtest())
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+"""
+Accuracy and speed benchmark for the indicator kernels (indicators.py, utils, market_data.calculate_indicators_*).
+
+Runs every indicator over seeded synthetic OHLCV series (100, 10k and 1M bars by default) and,
+with --symbol, over candles recorded in the local candle store. Reports ns/bar, peak memory
+(bytes/bar) and the max absolute deviation from the pandas_ta reference, and exits with
+status 1 when a threshold below is exceeded (speed is only checked from 10k bars, where
+per-call overhead no longer dominates).
+
+Usage:
+    python benchmark_indicators.py
+    python benchmark_indicators.py --sizes 100 10000 --symbol BTC/USDT --timeframe 5m
+pandas_ta is optional: without it only speed and memory are checked.
+"""
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import config
+import indicators
+import market_data
+import streaming_indicators
+import utils
+from candle_store import CandleStore
+try:
+    import pandas_ta as ta
+except ImportError:
+    ta = None
+
+logger = logging.getLogger(__name__)
+
+MAX_DEVIATION = 1e-9 # Max absolute deviation from pandas_ta (prices are ~100, oscillators 0-100)
+SPEED_MIN_BARS = 10_000
+# name: (max ns/bar, max peak bytes/bar)
+THRESHOLDS = {
+    'sma_20': (100, 128),
+    'ema_20': (60, 48),
+    'ema_200': (60, 64),
+    'rsi_14': (120, 128),
+    'atr_14': (100, 96),
+    'adx_14': (300, 192),
+    'vwap_session': (200, 200),
+    'indicators_stock': (800, 400),
+    'stream_rsi_14': (10_000, 64), # Pure Python per update, meant for one bar at a time
+}
+
+# --- Data ---
+
+def synthetic_ohlcv(n, seed=42, tf_ms=300000, start_ms=1_700_006_400_000):
+    """Seeded random-walk candles (geometric, ~100 price level) as a dict of arrays."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.r_[100.0, close[:-1]]
+    spread = close * rng.uniform(0, 0.002, n)
+    return {
+        'timestamp': start_ms + np.arange(n, dtype=np.int64) * tf_ms,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 1000, n),
+    }
+
+def recorded_ohlcv(symbol, timeframe):
+    """Closed candles from the local candle store (None if nothing is stored)."""
+    candles = CandleStore(config.CANDLE_STORE_DIR).read(symbol, timeframe)
+    if candles is None or len(candles) == 0:
+        return None
+    return {name: np.array(getattr(candles, name)) for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')}
+
+def _frame(d):
+    return pd.DataFrame({k: d[k] for k in ('open', 'high', 'low', 'close', 'volume')})
+
+# --- Cases: name -> (ours(data), reference(data) or None) ---
+
+def _stream_rsi(d):
+    rsi = streaming_indicators.RSI(14)
+    return rsi.update_many(d['close'])
+
+def _ref_vwap(d):
+    df = _frame(d).set_index(pd.to_datetime(d['timestamp'], unit='ms'))
+    return ta.vwap(df['high'], df['low'], df['close'], df['volume'], anchor='D')
+
+def _ref_indicators_stock(d):
+    df = _frame(d)
+    return {
+        'ema_fast': ta.ema(df['close'], length=config.EMA_FAST),
+        'ema_slow': ta.ema(df['close'], length=config.EMA_SLOW),
+        'ema_200': ta.ema(df['close'], length=200),
+        'rsi': ta.rsi(df['close'], length=14),
+        'adx': ta.adx(df['high'], df['low'], df['close'], length=14)['ADX_14'],
+        'vol_avg': ta.sma(df['volume'], length=20),
+    }
+
+CASES = {
+    'sma_20': (lambda d: indicators.sma_series(d['volume'], 20), lambda d: ta.sma(pd.Series(d['volume']), length=20)),
+    'ema_20': (lambda d: indicators.ema_series(d['close'], 20), lambda d: ta.ema(pd.Series(d['close']), length=20)),
+    'ema_200': (lambda d: indicators.ema_series(d['close'], 200), lambda d: ta.ema(pd.Series(d['close']), length=200)),
+    'rsi_14': (lambda d: utils.calculate_rsi_series(d['close'], 14), lambda d: ta.rsi(pd.Series(d['close']), length=14)),
+    'atr_14': (
+        lambda d: indicators.atr_series(d['high'], d['low'], d['close'], 14),
+        lambda d: ta.atr(pd.Series(d['high']), pd.Series(d['low']), pd.Series(d['close']), length=14),
+    ),
+    'adx_14': (
+        lambda d: indicators.adx_series(d['high'], d['low'], d['close'], 14)[0],
+        lambda d: ta.adx(pd.Series(d['high']), pd.Series(d['low']), pd.Series(d['close']), length=14)['ADX_14'],
+    ),
+    'vwap_session': (
+        lambda d: indicators.vwap_series(d['high'], d['low'], d['close'], d['volume'], timestamps=d['timestamp']),
+        _ref_vwap,
+    ),
+    'indicators_stock': (lambda d: market_data.calculate_indicators_stock(_frame(d)), _ref_indicators_stock),
+    'stream_rsi_14': (_stream_rsi, lambda d: ta.rsi(pd.Series(d['close']), length=14).iloc[-1]),
+}
+
+# --- Measurement ---
+
+def max_deviation(ours, ref):
+    """
+    Max |ours - ref| over all outputs; inf if the warmup (NaN) patterns differ.
+    pandas_ta returns None for inputs shorter than the period, where we expect all NaN.
+    """
+    if isinstance(ours, dict):
+        return max(max_deviation(ours[k], ref[k]) for k in ref)
+    a = np.atleast_1d(np.asarray(ours, dtype=np.float64))
+    b = np.full(a.shape, np.nan) if ref is None else np.atleast_1d(np.asarray(ref, dtype=np.float64))
+    if a.shape != b.shape or not np.array_equal(np.isnan(a), np.isnan(b)):
+        return float('inf')
+    valid = ~np.isnan(a)
+    return float(np.abs(a[valid] - b[valid]).max()) if valid.any() else 0.0
+
+def measure(fn, data, repeat):
+    """Best wall time (ns) over `repeat` runs, peak traced memory (bytes) of one run, and its result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn(data)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    result = fn(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+def run_benchmarks(datasets, check_reference=True):
+    """
+    datasets: [(label, ohlcv dict)]
+    Returns: (rows, failures) where rows are dicts for the report.
+    """
+    rows, failures = [], []
+    for label, data in datasets:
+        n = len(data['close'])
+        repeat = max(1, min(20, 200_000 // n))
+        for name, (ours, reference) in CASES.items():
+            elapsed, peak, result = measure(ours, data, repeat)
+            ns_bar, bytes_bar = elapsed / n, peak / n
+            deviation = max_deviation(result, reference(data)) if check_reference else None
+            rows.append({'data': label, 'bars': n, 'indicator': name, 'ns_bar': ns_bar, 'bytes_bar': bytes_bar, 'deviation': deviation})
+
+            max_ns, max_bytes = THRESHOLDS[name]
+            if deviation is not None and not deviation <= MAX_DEVIATION:
+                failures.append(f"{name} on {label}: deviation {deviation:.3g} > {MAX_DEVIATION:g}")
+            if n >= SPEED_MIN_BARS and ns_bar > max_ns:
+                failures.append(f"{name} on {label}: {ns_bar:.1f} ns/bar > {max_ns}")
+            if n >= SPEED_MIN_BARS and bytes_bar > max_bytes:
+                failures.append(f"{name} on {label}: {bytes_bar:.1f} bytes/bar > {max_bytes}")
+    return rows, failures
+
+def print_report(rows):
+    print(f"{'data':<24} {'bars':>9} {'indicator':<18} {'ns/bar':>10} {'bytes/bar':>10} {'max |dev|':>11}")
+    for r in rows:
+        dev = 'n/a' if r['deviation'] is None else f"{r['deviation']:.2e}"
+        print(f"{r['data']:<24} {r['bars']:>9} {r['indicator']:<18} {r['ns_bar']:>10.1f} {r['bytes_bar']:>10.1f} {dev:>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indicator speed, memory and accuracy against pandas_ta.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 1_000_000], help="Synthetic series lengths")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--symbol', help="Also run on candles recorded in the candle store (e.g. BTC/USDT)")
+    parser.add_argument('--timeframe', default=config.CRYPTO_TIMEFRAME)
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    datasets = [(f"synthetic-{n}", synthetic_ohlcv(n, args.seed)) for n in args.sizes]
+    if args.symbol:
+        recorded = recorded_ohlcv(args.symbol, args.timeframe)
+        if recorded is None:
+            logger.warning(f"No stored {args.timeframe} candles for {args.symbol}, skipping recorded data")
+        else:
+            datasets.append((f"{args.symbol} {args.timeframe}", recorded))
+    if ta is None:
+        logger.warning("pandas_ta not installed: accuracy is not checked")
+
+    rows, failures = run_benchmarks(datasets, check_reference=ta is not None)
+    print_report(rows)
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll indicators within thresholds.")
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import os
 import threading
 import asyncio
 import nest_asyncio
+import nse_client
 from flask import Flask
 from telegram.ext import Application, ContextTypes, CommandHandler
 from telegram import Update
@@ -17,7 +18,10 @@ import trade_manager
 import trade_manager
 import gc
 import webhook_handler
+import kline_stream
+import rate_limiter
 import time
+import numpy as np
 
 # Apply nest_asyncio to allow nested loops if needed (though PTB handles this well usually)
 nest_asyncio.apply()
@@ -155,37 +159,19 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Check if it's a known crypto symbol
     if symbol in common_ids:
-        try:
-            import requests
-            coin_id = common_ids[symbol]
-            url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd&include_24hr_change=true"
-            logger.info(f"Fetching crypto price from CoinGecko: {url}")
-            
-            resp = await asyncio.to_thread(requests.get, url, timeout=15)
-            logger.info(f"CoinGecko response status: {resp.status_code}")
-            
-            if resp.status_code == 200:
-                data = resp.json()
-                logger.info(f"CoinGecko data: {data}")
-                
-                if coin_id in data and 'usd' in data[coin_id]:
-                    price = data[coin_id]['usd']
-                    change = data[coin_id].get('usd_24h_change', 0) or 0
-                    emoji = "🟢" if change >= 0 else "🔴"
-                    msg = (
-                        f"💰 **{symbol}/USD**\n\n"
-                        f"Price: ${price:,.2f}\n"
-                        f"24h Change: {emoji} {change:+.2f}%"
-                    )
-                    await update.message.reply_text(msg, parse_mode='Markdown')
-                    return
-                else:
-                    logger.error(f"CoinGecko returned unexpected data: {data}")
-            else:
-                logger.error(f"CoinGecko returned status {resp.status_code}: {resp.text}")
-                
-        except Exception as e:
-            logger.error(f"CoinGecko error for {symbol}: {e}")
+        # Coalesced: concurrent /price calls for the same coin share one CoinGecko request
+        quote = await market_data.fetch_coingecko_price(common_ids[symbol])
+        if quote is not None:
+            price = quote['usd']
+            change = quote.get('usd_24h_change', 0) or 0
+            emoji = "🟢" if change >= 0 else "🔴"
+            msg = (
+                f"💰 **{symbol}/USD**\n\n"
+                f"Price: ${price:,.2f}\n"
+                f"24h Change: {emoji} {change:+.2f}%"
+            )
+            await update.message.reply_text(msg, parse_mode='Markdown')
+            return
         
         # If CoinGecko failed, show error (don't try as stock for known crypto)
         await update.message.reply_text(f"❌ Could not fetch crypto price for {symbol}. Try again later.")
@@ -197,7 +183,10 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         search_url = f"https://api.coingecko.com/api/v3/search?query={symbol}"
         logger.info(f"Searching CoinGecko for: {symbol}")
         
+        await rate_limiter.acquire('coingecko')
         search_resp = await asyncio.to_thread(requests.get, search_url, timeout=10)
+        if search_resp.status_code == 429:
+            rate_limiter.penalize('coingecko', rate_limiter.parse_retry_after(search_resp.headers))
         
         if search_resp.status_code == 200:
             search_data = search_resp.json()
@@ -211,23 +200,19 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 coin_symbol = best_match['symbol']
                 
                 # Fetch price for this ID
-                price_url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd&include_24hr_change=true"
-                price_resp = await asyncio.to_thread(requests.get, price_url, timeout=10)
-                
-                if price_resp.status_code == 200:
-                    data = price_resp.json()
-                    if coin_id in data:
-                        price = data[coin_id]['usd']
-                        change = data[coin_id].get('usd_24h_change', 0) or 0
-                        emoji = "🟢" if change >= 0 else "🔴"
-                        
-                        msg = (
-                            f"💰 **{coin_name} ({coin_symbol.upper()})/USD**\n\n"
-                            f"Price: ${price:,.6f}\n" # 6 decimals for shitcoins
-                            f"24h Change: {emoji} {change:+.2f}%"
-                        )
-                        await update.message.reply_text(msg, parse_mode='Markdown')
-                        return
+                quote = await market_data.fetch_coingecko_price(coin_id)
+                if quote is not None:
+                    price = quote['usd']
+                    change = quote.get('usd_24h_change', 0) or 0
+                    emoji = "🟢" if change >= 0 else "🔴"
+                    
+                    msg = (
+                        f"💰 **{coin_name} ({coin_symbol.upper()})/USD**\n\n"
+                        f"Price: ${price:,.6f}\n" # 6 decimals for shitcoins
+                        f"24h Change: {emoji} {change:+.2f}%"
+                    )
+                    await update.message.reply_text(msg, parse_mode='Markdown')
+                    return
 
         # If crypto search fails, try Stock
         await fetch_stock_price(update, f"{symbol}.NS")
@@ -243,6 +228,7 @@ async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def fetch_stock_price(update: Update, stock_symbol: str):
     """Helper to fetch and display stock price."""
     import yfinance as yf
+    await rate_limiter.acquire('yahoo')
     ticker = yf.Ticker(stock_symbol)
     info = ticker.fast_info
     price = info.last_price
@@ -265,11 +251,10 @@ async def fetch_stock_price(update: Update, stock_symbol: str):
 
 async def market_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show global market sentiment."""
-    await update.message.reply_text("🏥 Checking Market Pulse...")
-    
     try:
+        # Served from the in-memory pulse cache (refreshed by refresh_market_pulse)
         # 1. Crypto Sentiment
-        fng = market_data.get_fear_and_greed_index()
+        fng = await market_data.get_fear_and_greed_index()
         fng_val = fng.get('value', 0)
         fng_class = fng.get('value_classification', 'Unknown')
         
@@ -306,12 +291,62 @@ async def market_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Error in market command: {e}")
         await update.message.reply_text("❌ Failed to fetch market data.")
 
+async def refresh_market_pulse(context: ContextTypes.DEFAULT_TYPE):
+    """Keeps the market pulse cache warm so /market answers from memory."""
+    await market_data.refresh_market_pulse()
+
 # --- Scanning Jobs ---
 MAX_CRYPTO_PAIRS = 20
 MAX_STOCK_SYMBOLS = 20
 
+def crypto_scan_list():
+    """The crypto pairs scanned or streamed: config.CRYPTO_PAIRS up to the MAX_CRYPTO_PAIRS hard cap."""
+    if len(config.CRYPTO_PAIRS) > MAX_CRYPTO_PAIRS:
+        logger.warning(f"⚠️ Too many Crypto Pairs ({len(config.CRYPTO_PAIRS)}). Truncating to {MAX_CRYPTO_PAIRS} to save RAM.")
+        # Slice it locally (don't modify config permanently)
+        return config.CRYPTO_PAIRS[:MAX_CRYPTO_PAIRS]
+    return config.CRYPTO_PAIRS
+
+def crypto_scan_blocked():
+    """Returns a reason string if crypto analysis should not run right now (else None)."""
+    if not utils.is_market_open('CRYPTO'):
+        return "Crypto Market Closed."
+
+    # Watchdog Check: If Webhooks are active, PAUSE local scanning
+    # This saves massive CPU/RAM
+    if time.time() - webhook_handler.last_webhook_time < config.WATCHDOG_TIMEOUT:
+        return "Webhook Mode Active."
+
+    # User Request: Prioritize Stocks during Market Hours (Exclusive Mode)
+    # If the Indian Stock Market is OPEN, we skip Crypto to save resources/focus
+    if utils.is_market_open('STOCK'):
+        return "Stock Market Open (Prioritizing Stocks)."
+    return None
+
+async def dispatch_crypto_signal(bot, signal):
+    """Sends a crypto signal and routes it to the trade managers (memoized repeats were sent already)."""
+    if signal.get('memoized'):
+        return
+    # Get current balance for recommendation logic
+    current_bal = spot_mgr.calculate_balance()
+    await telegram_handler.send_signal(bot, signal, 'CRYPTO', balance=current_bal)
+    
+    # Routing Logic
+    if signal['side'] == 'LONG':
+        if config.ENABLE_SPOT_TRADING:
+            await spot_mgr.open_trade(signal, bot)
+        if config.ENABLE_FUTURES_TRADING:
+            await future_mgr.open_trade(signal, bot)
+    elif signal['side'] == 'SHORT':
+        if config.ENABLE_FUTURES_TRADING:
+            await future_mgr.open_trade(signal, bot)
+
 async def scan_crypto(context: ContextTypes.DEFAULT_TYPE):
     """Scan Crypto Markets."""
+    # Streaming Mode: analysis is triggered on bar close instead (see on_crypto_bar_close)
+    if crypto_stream is not None:
+        return
+
     if not utils.is_market_open('CRYPTO'):
         logger.info("Crypto Market Closed. Skipping scan.")
         return
@@ -324,13 +359,7 @@ async def scan_crypto(context: ContextTypes.DEFAULT_TYPE):
             logger.info("🛑 Crypto Scan Paused: Webhook Mode Active.")
         return
 
-    # Hard Cap Check
-    if len(config.CRYPTO_PAIRS) > MAX_CRYPTO_PAIRS:
-        logger.warning(f"⚠️ Too many Crypto Pairs ({len(config.CRYPTO_PAIRS)}). Truncating to {MAX_CRYPTO_PAIRS} to save RAM.")
-        # Slice it locally for this scan (don't modify config permanently if not needed, but for safety lets iterate on slice)
-        scan_list = config.CRYPTO_PAIRS[:MAX_CRYPTO_PAIRS]
-    else:
-        scan_list = config.CRYPTO_PAIRS
+    scan_list = crypto_scan_list()
 
     # Acquire Lock to prevent overlap with Stock Scan
     if SCAN_LOCK.locked():
@@ -353,29 +382,87 @@ async def scan_crypto(context: ContextTypes.DEFAULT_TYPE):
         exchange = market_data.get_crypto_exchange()
         if not exchange: return
 
-        for symbol in scan_list:
-            try:
-                signal = await signals.analyze_crypto(exchange, symbol)
-                if signal:
-                    # Get current balance for recommendation logic
-                    current_bal = spot_mgr.calculate_balance()
-                    await telegram_handler.send_signal(context.bot, signal, 'CRYPTO', balance=current_bal)
-                    
-                    # Routing Logic
-                    if signal['side'] == 'LONG':
-                        if config.ENABLE_SPOT_TRADING:
-                            await spot_mgr.open_trade(signal, context.bot)
-                        if config.ENABLE_FUTURES_TRADING:
-                            await future_mgr.open_trade(signal, context.bot)
-                    elif signal['side'] == 'SHORT':
-                        if config.ENABLE_FUTURES_TRADING:
-                            await future_mgr.open_trade(signal, context.bot)
-                            
-            except Exception as e:
-                logger.error(f"Error scanning {symbol}: {e}")
-        
-        # Force Garbage Collection after scan cycle
-        gc.collect()
+        # 1. Closed candles for the pairs whose last closed bar was not evaluated yet (cached, incremental fetches)
+        pending = [symbol for symbol in scan_list if not signals.is_evaluated(symbol, config.CRYPTO_TIMEFRAME)]
+        if len(pending) < len(scan_list):
+            logger.info(f"Crypto scan: {len(scan_list) - len(pending)} pairs unchanged since the last closed bar")
+
+        async def fetch(symbol):
+            candles = await market_data.fetch_crypto_candles(exchange, symbol, timeframe=config.CRYPTO_TIMEFRAME)
+            if candles is not None and market_data.is_series_healthy(symbol, config.CRYPTO_TIMEFRAME):
+                return market_data.closed_candles(symbol, config.CRYPTO_TIMEFRAME, candles)
+            return None
+
+        fetched = await utils.bounded_gather(fetch, pending, config.SCAN_FETCH_CONCURRENCY, config.SCAN_FETCH_TIMEOUT, label='Fetch')
+        candles_by_symbol, keys = {}, {}
+        for symbol, candles in zip(pending, fetched):
+            if candles is None or len(candles) == 0:
+                continue
+            # Keyed on the data: with the exchange behind the clock the last closed bar may be one we already saw
+            keys[symbol] = signals.evaluation_key(symbol, config.CRYPTO_TIMEFRAME, candles.last_timestamp)
+            if signals.get_memoized(keys[symbol]) is None:
+                candles_by_symbol[symbol] = candles
+
+        # 2. Batched indicators + mask screen; only pairs that can signal get the full analysis
+        try:
+            table, candidates = signals.crypto_indicator_table(candles_by_symbol)
+            if table is not None:
+                mask = signals.screen_crypto(table)
+                candidates += table['symbol'][mask].tolist()
+                # Screened out: the decision for this bar is "no signal", remember it
+                for row in np.flatnonzero(~mask):
+                    symbol = str(table['symbol'][row])
+                    vector = {name: float(table[name][row]) for name in ('close', 'ema_20_htf', 'ema_50_htf', 'vwap_htf')}
+                    vector['rsi'] = float(table['rsi'][row, -1])
+                    signals.memoize(keys[symbol], vector, None)
+        except Exception as e:
+            # One bad frame must not cost the whole cycle: analyse pair by pair (each one isolated)
+            logger.error(f"Crypto screen failed, analysing every pair: {e}")
+            candidates = list(candles_by_symbol)
+        logger.info(f"Crypto screen: {len(candidates)}/{len(candles_by_symbol)} pairs to analyze")
+
+        # 3. Validate (full analysis + AI) concurrently, 4. dispatch in scan_list order as results arrive
+        screened_in = set(candidates)
+        candidates = [symbol for symbol in scan_list if symbol in screened_in]
+        analyses = utils.bounded_tasks(
+            lambda symbol: signals.analyze_crypto(exchange, symbol, raw_candles=candles_by_symbol[symbol]),
+            candidates, config.SCAN_VALIDATE_CONCURRENCY, config.SCAN_VALIDATE_TIMEOUT, label='Analysis',
+        )
+        for symbol, analysis in zip(candidates, analyses):
+            signal = await analysis
+            if signal:
+                try:
+                    await dispatch_crypto_signal(context.bot, signal)
+                except Exception as e:
+                    logger.error(f"Error dispatching {symbol}: {e}")
+
+# --- Crypto Streaming Mode ---
+crypto_stream = None
+
+async def on_crypto_bar_close(bot, symbol):
+    """
+    Analyzes a symbol as soon as its streamed candle closes (candles are already cached).
+    Same gates as scan_crypto: pair cap, series health, and SCAN_LOCK (bar closes queue behind each other).
+    """
+    reason = crypto_scan_blocked()
+    if reason:
+        logger.debug(f"{symbol} bar closed, analysis skipped: {reason}")
+        return
+    if symbol not in crypto_scan_list():
+        return
+
+    candles = market_data.get_cached_candles(symbol, config.CRYPTO_TIMEFRAME)
+    if candles is None:
+        return
+    if not market_data.is_series_healthy(symbol, config.CRYPTO_TIMEFRAME):
+        logger.debug(f"{symbol} bar closed, analysis skipped: candle series has unfilled gaps")
+        return
+
+    async with SCAN_LOCK:
+        future_mgr.check_balance_sufficiency()
+        signal = await signals.analyze_crypto(market_data.get_crypto_exchange(), symbol, raw_candles=candles)
+        if signal:
+            await dispatch_crypto_signal(bot, signal)
 
 async def scan_stocks(context: ContextTypes.DEFAULT_TYPE):
     """Scan Stock Markets."""
@@ -409,12 +496,32 @@ async def scan_stocks(context: ContextTypes.DEFAULT_TYPE):
         else:
             scan_list = config.STOCK_SYMBOLS
 
+        # Symbols whose last closed bar was already evaluated are skipped entirely
+        scan_list = [symbol for symbol in scan_list if not signals.is_evaluated(symbol, config.STOCK_TIMEFRAME)]
+        if not scan_list:
+            logger.info("Stock scan: no new closed bars since the last scan")
+            return
+
+        # One grouped download for the whole universe; after the first scan of the day only new bars are requested
+        frames = await market_data.fetch_stock_intraday_batch(scan_list)
+
+        # Daily trend filter (NSE EOD bars, fetched once per symbol and day)
+        with_data = [symbol for symbol in scan_list if symbol in frames]
+        trends = await utils.bounded_gather(signals.daily_trend_ok, with_data, config.SCAN_FETCH_CONCURRENCY, config.SCAN_FETCH_TIMEOUT, label='Daily trend')
+        downtrend = {symbol for symbol, ok in zip(with_data, trends) if ok is False}
+        if downtrend:
+            logger.info(f"Stock scan: {len(downtrend)} symbols below their daily EMA{config.STOCK_DAILY_TREND_EMA}, skipped")
+
         for symbol in scan_list:
-            # Add delay between symbols to avoid rate limits
-            await asyncio.sleep(2)
             try:
-                signal = await signals.analyze_stock(symbol)
-                if signal:
+                df = frames.pop(symbol, None)
+                if df is None:
+                    raise LookupError(f"No data for {symbol}")
+                if symbol in downtrend:
+                    success_count += 1
+                    continue
+                signal = await signals.analyze_stock(symbol, df=df, is_backtest=False)
+                if signal and not signal.get('memoized'):
                     # Get current balance for recommendation logic
                     current_bal = stock_mgr.calculate_balance()
                     await telegram_handler.send_signal(context.bot, signal, 'STOCK', balance=current_bal)
@@ -436,10 +543,19 @@ async def scan_stocks(context: ContextTypes.DEFAULT_TYPE):
 
 # --- Trade Manager Job ---
 async def check_trades(context: ContextTypes.DEFAULT_TYPE):
-    """Update active trades."""
-    await spot_mgr.update_trades(context.bot)
-    await future_mgr.update_trades(context.bot)
-    await stock_mgr.update_trades(context.bot)
+    """Update active trades from one shared price snapshot (one request per market, not per trade)."""
+    managers = (spot_mgr, future_mgr, stock_mgr)
+    crypto_symbols, stock_symbols = set(), set()
+    for mgr in managers:
+        crypto, stock = mgr.held_symbols()
+        crypto_symbols |= crypto
+        stock_symbols |= stock
+    if not crypto_symbols and not stock_symbols:
+        return
+
+    snapshot = await market_data.fetch_price_snapshot(crypto_symbols, stock_symbols)
+    for mgr in managers:
+        await mgr.update_trades(context.bot, snapshot)
 
 # --- Webhook Polling Job (The Bridge) ---
 async def check_webhooks(context: ContextTypes.DEFAULT_TYPE):
@@ -482,6 +598,31 @@ async def check_webhooks(context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             logger.error(f"Failed to process webhook signal: {e}")
 
+# --- Lifecycle Hooks ---
+async def post_init(application: Application):
+    """Warm up shared resources once the event loop is running."""
+    global crypto_stream
+    await market_data.init_crypto_exchange()
+
+    if config.CRYPTO_STREAMING_MODE:
+        async def handle_bar_close(symbol):
+            await on_crypto_bar_close(application.bot, symbol)
+
+        pairs = crypto_scan_list()
+        crypto_stream = kline_stream.KlineStream(
+            pairs, on_bar_close=handle_bar_close, rest_seed=not config.CRYPTO_STREAM_REPLAY
+        )
+        crypto_stream.start()
+        logger.info(f"Crypto Streaming Mode: {len(pairs)} pairs via {config.BINANCE_WS_URL}")
+
+async def post_shutdown(application: Application):
+    """Release shared network sessions on shutdown."""
+    if crypto_stream is not None:
+        await crypto_stream.stop()
+    await market_data.close_crypto_exchange()
+    await market_data.close_http_session()
+    await nse_client.close_nse_client()
+
 # --- Main Entry Point ---
 
 
@@ -509,7 +650,13 @@ def main():
 
         # 2. Initialize Telegram Bot
         try:
-            application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+            application = (
+                Application.builder()
+                .token(config.TELEGRAM_BOT_TOKEN)
+                .post_init(post_init)
+                .post_shutdown(post_shutdown)
+                .build()
+            )
             logger.info("Telegram App built successfully.")
         except Exception as e:
             logger.critical(f"Failed to build Telegram App: {e}")
@@ -546,6 +693,10 @@ def main():
         job_queue.run_repeating(check_webhooks, interval=2, first=5)
         logger.info("Scheduled Webhook Consumer every 2s")
 
+        # Market Pulse cache (/market answers from memory)
+        job_queue.run_repeating(refresh_market_pulse, interval=config.MARKET_PULSE_REFRESH_INTERVAL, first=1)
+        logger.info(f"Scheduled Market Pulse refresh every {config.MARKET_PULSE_REFRESH_INTERVAL}s")
+
     # 4. Run Telegram Polling
         logger.info("Bot is running... Starting Polling.")
         # Drop pending updates to avoid processing old messages on restart
@@ -634,7 +785,7 @@ async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Send to Main Channel
         channel_id = config.TELEGRAM_CRYPTO_CHANNEL_ID
         if channel_id:
-            await context.bot.send_message(chat_id=channel_id, text=msg, parse_mode='Markdown')
+            await telegram_handler.send_message(context.bot, channel_id, msg, parse_mode='Markdown')
             report.append("✅ Test Notification Sent to Channel")
         else:
              report.append("⚠️ Channel ID missing, skipped notification")
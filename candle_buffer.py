@@ -0,0 +1,135 @@
+import numpy as np
+
+class CandleBuffer:
+    """
+    Fixed-capacity OHLCV ring buffer (one NumPy array per column).
+    Storage is twice the capacity, so the live window is always contiguous: appends are
+    O(1) amortised and open/high/low/close/volume are zero-copy views that utils.calculate_*
+    accept directly. Views are only valid until the next append/merge.
+    """
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("CandleBuffer capacity must be positive")
+        self.capacity = capacity
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._ohlcv = np.zeros((5, 2 * capacity), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+
+    @classmethod
+    def from_ohlcv(cls, candles, capacity=None):
+        """Builds a buffer from ccxt-style lists [[timestamp, o, h, l, c, v], ...]."""
+        buf = cls(capacity or max(len(candles), 1))
+        buf.merge(candles)
+        return buf
+
+    @classmethod
+    def from_arrays(cls, ts, open_, high, low, close, volume, capacity=None):
+        """Builds a buffer from column arrays (copied in one go)."""
+        n = len(ts)
+        buf = cls(capacity or max(n, 1))
+        n = min(n, buf.capacity)
+        buf._ts[:n] = np.asarray(ts[-n:] if n else ts[:0], dtype=np.int64)
+        for row, col in enumerate((open_, high, low, close, volume)):
+            buf._ohlcv[row, :n] = np.asarray(col[-n:] if n else col[:0], dtype=np.float64)
+        buf._end = n
+        return buf
+
+    def __len__(self):
+        return self._end - self._start
+
+    # --- Zero-copy column views ---
+    @property
+    def timestamp(self):
+        return self._ts[self._start:self._end]
+
+    @property
+    def open(self):
+        return self._ohlcv[0, self._start:self._end]
+
+    @property
+    def high(self):
+        return self._ohlcv[1, self._start:self._end]
+
+    @property
+    def low(self):
+        return self._ohlcv[2, self._start:self._end]
+
+    @property
+    def close(self):
+        return self._ohlcv[3, self._start:self._end]
+
+    @property
+    def volume(self):
+        return self._ohlcv[4, self._start:self._end]
+
+    @property
+    def last_timestamp(self):
+        return int(self._ts[self._end - 1]) if len(self) else None
+
+    # --- Mutation ---
+    def _compact(self):
+        """Moves the live window to the front of storage (runs once every `capacity` appends)."""
+        n = len(self)
+        self._ts[:n] = self._ts[self._start:self._end]
+        self._ohlcv[:, :n] = self._ohlcv[:, self._start:self._end]
+        self._start, self._end = 0, n
+
+    def append(self, timestamp, open_, high, low, close, volume):
+        """Appends a candle. A candle with the same timestamp as the last one replaces it (still-forming bar)."""
+        if len(self):
+            last_ts = self._ts[self._end - 1]
+            if timestamp == last_ts:
+                self._end -= 1
+            elif timestamp < last_ts:
+                raise ValueError(f"Candle {timestamp} is older than the last buffered candle {last_ts}")
+
+        if self._end == len(self._ts):
+            self._compact()
+
+        i = self._end
+        self._ts[i] = timestamp
+        self._ohlcv[:, i] = (open_, high, low, close, volume)
+        self._end += 1
+        if len(self) > self.capacity:
+            self._start += 1
+
+    def merge(self, candles):
+        """
+        Merges ccxt-style candles (oldest first). Buffered candles at or after the first new
+        timestamp are dropped first, so a refreshed still-forming bar replaces the stale one.
+        """
+        if not candles:
+            return
+        first_ts = candles[0][0]
+        if len(self):
+            self._end = self._start + int(np.searchsorted(self.timestamp, first_ts, side='left'))
+        for c in candles:
+            self.append(c[0], c[1], c[2], c[3], c[4], c[5])
+
+    def to_list(self):
+        """Returns ccxt-style lists [[timestamp, o, h, l, c, v], ...]."""
+        rows = self._ohlcv[:, self._start:self._end].T.tolist()
+        return [[t] + row for t, row in zip(self.timestamp.tolist(), rows)]
+
+def as_candle_buffer(candles):
+    """Accepts a CandleBuffer or ccxt-style lists and returns a CandleBuffer."""
+    if candles is None or isinstance(candles, CandleBuffer):
+        return candles
+    return CandleBuffer.from_ohlcv(candles)
+
+def find_gaps(timestamps, tf_ms, day_offset_ms=None):
+    """
+    Finds holes in a sorted timestamp series.
+    Returns [(first_missing_ts, next_present_ts), ...].
+    With day_offset_ms (local UTC offset) holes spanning a local day boundary are ignored,
+    so a market's overnight/weekend close is not reported as missing data.
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if len(ts) < 2:
+        return []
+    idx = np.flatnonzero(np.diff(ts) > tf_ms)
+    if day_offset_ms is not None and len(idx):
+        day = (ts + day_offset_ms) // 86400000
+        idx = idx[day[idx] == day[idx + 1]]
+    return [(int(ts[i] + tf_ms), int(ts[i + 1])) for i in idx]
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import numpy as np
+import config
+from candle_buffer import CandleBuffer, find_gaps
+
+logger = logging.getLogger(__name__)
+
+# One fixed-size record per candle (48 bytes)
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'),
+])
+
+def _safe_name(symbol):
+    return symbol.replace('/', '_').replace(':', '_')
+
+def to_records(candles):
+    """Converts a CandleBuffer or ccxt-style lists into a CANDLE_DTYPE array."""
+    if isinstance(candles, CandleBuffer):
+        rec = np.empty(len(candles), dtype=CANDLE_DTYPE)
+        rec['timestamp'] = candles.timestamp
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            rec[name] = getattr(candles, name)
+        return rec
+    return np.array([tuple(c[:6]) for c in candles], dtype=CANDLE_DTYPE)
+
+class CandleStore:
+    """
+    On-disk candle history shared by the live bot, backtests and diagnostics.
+    One append-only binary file per (symbol, timeframe), read through np.memmap so range
+    queries only touch the pages they need. Only CLOSED candles belong here.
+    A small JSON sidecar remembers ranges the data source confirmed as empty, so
+    gap tracking does not keep re-requesting them.
+    """
+    def __init__(self, root=config.CANDLE_STORE_DIR):
+        self.root = root
+        self._last_ts = {} # (symbol, timeframe) -> last stored timestamp
+
+    def _path(self, symbol, timeframe):
+        return os.path.join(self.root, _safe_name(symbol), f"{timeframe}.bin")
+
+    def _meta_path(self, symbol, timeframe):
+        return os.path.join(self.root, _safe_name(symbol), f"{timeframe}.meta.json")
+
+    def _open(self, symbol, timeframe):
+        """Memory-maps the stored records (None if nothing stored)."""
+        path = self._path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        n = os.path.getsize(path) // CANDLE_DTYPE.itemsize # Ignore a torn trailing record
+        if n == 0:
+            return None
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r', shape=(n,))
+
+    def count(self, symbol, timeframe):
+        path = self._path(symbol, timeframe)
+        return os.path.getsize(path) // CANDLE_DTYPE.itemsize if os.path.exists(path) else 0
+
+    def first_timestamp(self, symbol, timeframe):
+        mm = self._open(symbol, timeframe)
+        return int(mm['timestamp'][0]) if mm is not None else None
+
+    def last_timestamp(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self._last_ts:
+            mm = self._open(symbol, timeframe)
+            self._last_ts[key] = int(mm['timestamp'][-1]) if mm is not None else None
+        return self._last_ts[key]
+
+    def read(self, symbol, timeframe, start=None, end=None, limit=None):
+        """
+        Range query by timestamp (ms): start inclusive, end exclusive.
+        limit keeps only the most recent candles of the range.
+        Returns: CandleBuffer (None if nothing stored)
+        """
+        mm = self._open(symbol, timeframe)
+        if mm is None:
+            return None
+        ts = mm['timestamp']
+        lo = int(np.searchsorted(ts, start, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, side='left')) if end is not None else len(ts)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        rec = mm[lo:hi]
+        return CandleBuffer.from_arrays(
+            rec['timestamp'], rec['open'], rec['high'], rec['low'], rec['close'], rec['volume'],
+            capacity=limit
+        )
+
+    def write(self, symbol, timeframe, candles):
+        """
+        Stores closed candles. New candles after the last stored one are appended;
+        older ones (backfilled gaps) trigger a sorted merge + atomic rewrite.
+        Returns the number of new candles stored.
+        """
+        rec = to_records(candles)
+        if len(rec) == 0:
+            return 0
+        rec = rec[np.argsort(rec['timestamp'], kind='stable')]
+
+        path = self._path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stored_n = self.count(symbol, timeframe)
+        last = self.last_timestamp(symbol, timeframe)
+
+        if last is None or rec['timestamp'][0] > last:
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.truncate(stored_n * CANDLE_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(rec.tobytes())
+            added = len(rec)
+        else:
+            old = np.array(self._open(symbol, timeframe))
+            merged = np.concatenate((old, rec))
+            # Keep the first occurrence of each timestamp (stored data wins)
+            _, idx = np.unique(merged['timestamp'], return_index=True)
+            merged = merged[idx]
+            added = len(merged) - len(old)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(merged.tobytes())
+            os.replace(tmp, path)
+            rec = merged
+
+        self._last_ts[(symbol, timeframe)] = int(max(rec['timestamp'][-1], last or 0))
+        return added
+
+    def _load_meta(self, symbol, timeframe):
+        try:
+            with open(self._meta_path(symbol, timeframe)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'empty': []}
+
+    def _save_meta(self, symbol, timeframe, meta):
+        path = self._meta_path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(meta, f)
+
+    def mark_empty(self, symbol, timeframe, start, end):
+        """Records a range the source has no data for (exchange outage, market holiday)."""
+        meta = self._load_meta(symbol, timeframe)
+        meta['empty'].append([int(start), int(end)])
+        self._save_meta(symbol, timeframe, meta)
+
+    def synced_from(self, symbol, timeframe):
+        """Earliest timestamp history was requested from (None if never synced)."""
+        return self._load_meta(symbol, timeframe).get('synced_from')
+
+    def set_synced_from(self, symbol, timeframe, since):
+        meta = self._load_meta(symbol, timeframe)
+        meta['synced_from'] = int(since)
+        self._save_meta(symbol, timeframe, meta)
+
+    def gaps(self, symbol, timeframe, tf_ms, day_offset_ms=None):
+        """Missing ranges inside the stored history, excluding ranges already known to be empty."""
+        mm = self._open(symbol, timeframe)
+        if mm is None:
+            return []
+        known = {tuple(r) for r in self._load_meta(symbol, timeframe)['empty']}
+        return [g for g in find_gaps(mm['timestamp'], tf_ms, day_offset_ms) if g not in known]
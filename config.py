@@ -38,12 +38,22 @@ CRYPTO_TAKE_PROFIT = 0.01 # 1%
 CRYPTO_RISK_PER_TRADE = 0.95 # 95% Risk for micro account (5 USDT) to ensure trade size > minimum
 INITIAL_CAPITAL_CRYPTO = 10 # USD (User Real Balance) - Default
 CRYPTO_TIMEFRAME = '5m' # 5m Timeframe for Manual Execution (Option C)
+CRYPTO_HTF_TIMEFRAME = '15m' # Trend Filter Timeframe (Derived locally from CRYPTO_TIMEFRAME candles)
+CRYPTO_CANDLE_LIMIT = 100 # Candles per timeframe used for analysis
 INITIAL_CAPITAL_CRYPTO_SPOT = 10 # USD
 INITIAL_CAPITAL_CRYPTO_FUTURE = 10 # USD
 ENABLE_SPOT_TRADING = False
 ENABLE_FUTURES_TRADING = True
 FUTURE_LEVERAGE = 5 # x5 Leverage
 MIN_TRADE_AMOUNT_CRYPTO = 5 # Binance Min
+CRYPTO_STREAMING_MODE = False # True = WebSocket klines (analysis on bar close) instead of REST polling
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443") # Point at kline_replay_server.py for offline tests
+CRYPTO_STREAM_REPLAY = os.getenv("CRYPTO_STREAM_REPLAY", "false").lower() == "true" # Replayed klines only: no REST seed/refills, nothing stored
+CANDLE_CACHE_SIZE = 400 # Candles kept in memory per (symbol, timeframe) for incremental fetches (enough for 100+ HTF bars)
+SERIES_MAX_MISSING_RATIO = 0.02 # Analysis skips a symbol whose candles still miss more than 2% of bars after backfill
+CANDLE_STORE_ENABLED = True # Persist closed candles on disk (candle_store.py) so restarts and backtests start warm
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", "data/candles")
+CANDLE_STORE_HISTORY_DAYS = 30 # Default history kept in sync by market_data.sync_candle_store
 
 # --- Crypto Pairs ---
 CRYPTO_PAIRS = [
@@ -97,8 +107,68 @@ STOCK_MARKET_CLOSE_MINUTE = 30
 
 
 STOCK_TIMEFRAME = '5m'
-
-
+STOCK_BATCH_SIZE = 50 # Tickers per grouped yf.download request
+STOCK_BUFFER_SIZE = 400 # Intraday bars kept per stock (5 sessions of 5m bars), topped up incrementally
+NSE_DATA_ENABLED = True # Daily (EOD) stock candles from NSE first, Yahoo as fallback
+NSE_BASE_URL = os.getenv("NSE_BASE_URL", "https://www.nseindia.com") # Point at a local fixture server for tests
+NSE_HISTORY_CHUNK_DAYS = 40 # Calendar days per NSE historical API request
+STOCK_DAILY_TREND_FILTER = True # Stock scan: only analyse symbols whose last daily close is above the daily EMA
+STOCK_DAILY_TREND_EMA = 50 # Daily EMA period of that filter
+STOCK_DAILY_HISTORY_DAYS = 120 # Calendar days of daily bars it loads (NSE EOD data, cached per IST day)
+
+
+
+# --- Rate Limits (rate_limiter.py) ---
+# Bucket name -> (tokens per second, burst capacity)
+RATE_LIMITS = {
+    'binance': (80, 1200), # Request weight (Binance allows 6000/min per IP, keep headroom)
+    'yahoo': (2, 5), # Requests (unofficial API, 429s above a few per second)
+    'yahoo_batch': (2, 100), # Tickers in grouped downloads (yfinance sends one request per ticker; two 50-ticker chunks of burst)
+    'coingecko': (0.4, 5), # Requests (~25/min on the free tier)
+    'alternative_me': (1, 5), # Requests (60/min)
+    'nse': (2, 3), # Requests (NSE blocks aggressive clients)
+    'telegram': (25, 30), # Messages across all chats (Bot API allows ~30/s)
+    'telegram_chat': (0.33, 3), # Messages per channel/group (20/min)
+    'groq': (0.5, 5), # Requests (30/min free tier)
+    'gemini': (0.25, 3), # Requests (15/min free tier)
+    'openrouter': (0.33, 5), # Requests (20/min free models)
+}
+
+# --- Request Coalescing (market_data.single_flight) ---
+# Seconds a fetched result is reused by later callers, per data type (0 = only share in-flight requests)
+SINGLE_FLIGHT_TTL = {
+    'ticker': 2, # Max age of a streamed price the snapshot uses instead of REST
+    'snapshot': 2, # check_trades price snapshot, shared by the trade managers
+    'candles': 5,
+    'stock': 30,
+    'coingecko': 30,
+}
+
+# --- Scan Pipeline (bot.scan_crypto) ---
+# Symbols move through fetch -> indicators -> validate (AI) -> dispatch; stages run concurrently up to these limits
+SCAN_FETCH_CONCURRENCY = 8 # Candle fetches in flight (still paced by the 'binance' bucket)
+SCAN_VALIDATE_CONCURRENCY = 4 # Full analyses in flight (each may wait on one LLM call)
+SCAN_FETCH_TIMEOUT = 20 # Seconds per symbol before its fetch is dropped for this cycle
+SCAN_VALIDATE_TIMEOUT = 60 # Seconds per symbol (must stay above AI_LATENCY_BUDGET)
+
+# --- AI Validation (signals.validate_with_ai) ---
+AI_HEDGED_REQUESTS = True # Ask the next provider in parallel when the current one is slow (False = one after another, on failure only)
+AI_HEDGE_DELAY = 4 # Seconds without an answer before hedging (Groq usually answers in ~1 s, Gemini in 2-5 s)
+AI_LATENCY_BUDGET = 20 # Seconds for the whole validation; past that the fallback verdict (APPROVED, 'AI Unresponsive') is used
+
+# --- AI Verdict Cache (verdict_cache.py) ---
+AI_VERDICT_CACHE_ENABLED = True # Reuse the AI verdict while the same crossover is re-detected by the lookback
+AI_VERDICT_CACHE_PATH = os.getenv("AI_VERDICT_CACHE_PATH", "data/ai_verdicts.json") # Survives restarts
+AI_VERDICT_CACHE_SIZE = 500 # Entries (least recently used evicted first)
+AI_VERDICT_CACHE_TTL = 4 * 3600 # Seconds (the 10-candle lookback is 50 min on 5m bars, longer on stock bars)
+
+# --- Market Pulse (/market, morning pulse) ---
+MARKET_PULSE_TTL = { # Seconds before a value is refreshed
+    'fear_greed': 3600, # Alternative.me publishes once a day
+    'nifty': 60,
+    'usdinr': 60,
+}
+MARKET_PULSE_REFRESH_INTERVAL = 60 # Background refresh job (bot.py)
 
 # --- Webhook Settings ---
 WEBHOOK_PASSPHRASE = os.getenv("WEBHOOK_PASSPHRASE", "my_secret_passphrase")
@@ -0,0 +1,234 @@
+import numpy as np
+
+# --- NumPy Indicator Kernels ---
+# Full-series indicators over plain arrays (lists or zero-copy CandleBuffer views).
+# Every function returns a float64 array the length of its input, NaN during warmup,
+# with the same definitions (seeding included) as pandas_ta so results agree to ~1e-9.
+# SMA/EMA/RSI/VWAP series also take 2-D (symbols x candles) arrays and work along the last axis,
+# so a whole universe of aligned windows is computed in one call.
+# No per-element Python loops: moving averages use prefix sums and the exponential
+# filters use the closed form of the recursion, evaluated block by block.
+
+# Largest growth factor (as a natural log) allowed inside one EWM block before the
+# running sum is rescaled. Keeps beta**-k (and x * beta**-k) far from float64 overflow;
+# precision does not depend on it since the newest terms dominate each partial sum.
+_EWM_BLOCK_LOG = 200.0
+
+def _as_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+def ewm(values, alpha, start=0):
+    """
+    Recursive filter y[i] = (1 - alpha) * y[i-1] + alpha * x[i], seeded with y[start] = x[start]
+    (pandas .ewm(alpha=alpha, adjust=False) on a series whose first valid value is at `start`).
+    Within a block the recursion is y[k] = beta^k * (y0 + alpha * cumsum(x[j] / beta^j)),
+    so the only Python loop is over blocks (a handful per call), not over elements.
+    """
+    x = _as_array(values)
+    n = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if start >= n:
+        return out
+    beta = 1.0 - alpha
+    if beta <= 0:
+        out[..., start:] = x[..., start:]
+        return out
+
+    out[..., start] = x[..., start]
+    block = max(1, int(_EWM_BLOCK_LOG / -np.log(beta)))
+    powers = beta ** np.arange(1, min(block, n) + 1)
+    prev = x[..., start:start + 1]
+    for i in range(start + 1, n, block):
+        seg = x[..., i:i + block]
+        m = seg.shape[-1]
+        decay = powers[:m]
+        out[..., i:i + m] = decay * (prev + alpha * np.cumsum(seg / decay, axis=-1))
+        prev = out[..., i + m - 1:i + m]
+    return out
+
+def _first_valid(x):
+    valid = np.flatnonzero(~np.isnan(x))
+    return int(valid[0]) if len(valid) else len(x)
+
+# Fixed-window sums (SMA, rolling VWAP) come from prefix sums that restart every
+# _PREFIX_BLOCK bars: a single cumsum over 1M bars would grow so large that differences of it
+# lose ~1e-8 absolute precision, block-local ones stay at the scale of one block.
+_PREFIX_BLOCK = 1024
+
+def _range_sums(x, first, span):
+    """
+    sum(x[..., first[k]:k + 1]) for every k along the last axis (first: int array, same shape),
+    given k - first[k] < span for all k. Exact up to the block scale, so use it for fixed windows
+    only (see _session_cumsum).
+    """
+    n = x.shape[-1]
+    block = max(_PREFIX_BLOCK, span) # A range then crosses at most one block boundary
+    blocks = -(-n // block)
+    padded = np.zeros(x.shape[:-1] + (blocks * block,))
+    padded[..., :n] = x
+    local = np.cumsum(padded.reshape(x.shape[:-1] + (blocks, block)), axis=-1)
+    totals = local[..., -1]
+    local = local.reshape(padded.shape)[..., :n]
+
+    first_block = first // block
+    crossing = first_block != np.arange(n) // block
+    before_first = np.take_along_axis(local - x, first, axis=-1) # Local prefix before first[k]
+    carry = np.where(crossing, np.take_along_axis(totals, first_block, axis=-1), 0.0)
+    return local - before_first + carry
+
+def _rolling_sum(x, window):
+    """Sum of the last `window` values at every bar (NaN before that)."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        first = np.broadcast_to(np.arange(x.shape[-1]) - (window - 1), x.shape).clip(0)
+        out[..., window - 1:] = _range_sums(x, first, window)[..., window - 1:]
+    return out
+
+def sma_series(values, length):
+    """Simple Moving Average (rolling mean over `length` bars) via block-local prefix sums."""
+    x = _as_array(values)
+    if length <= 0:
+        return np.full(x.shape, np.nan)
+    return _rolling_sum(x, length) / length
+
+def ema_series(values, length):
+    """EMA (alpha = 2 / (length + 1)), seeded with the SMA of the first `length` values."""
+    x = _as_array(values)
+    if length <= 0 or x.shape[-1] < length:
+        return np.full(x.shape, np.nan)
+    seeded = x.copy()
+    seeded[..., length - 1] = x[..., :length].mean(axis=-1)
+    return ewm(seeded, 2.0 / (length + 1), start=length - 1)
+
+def rma_series(values, length):
+    """Wilder's moving average (alpha = 1 / length), starting at the first valid value (1-D)."""
+    x = _as_array(values)
+    return ewm(x, 1.0 / length, start=_first_valid(x))
+
+def rsi_series(values, length=14):
+    """
+    Wilder RSI for every bar. Average gain/loss are RMAs of the price changes,
+    so the first value is at index 1 (NaN where there was no movement at all).
+    """
+    x = _as_array(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < 2:
+        return out
+    delta = np.diff(x, axis=-1)
+    avg_gain = ewm(np.maximum(delta, 0), 1.0 / length)
+    avg_loss = ewm(-np.minimum(delta, 0), 1.0 / length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[..., 1:] = 100 * avg_gain / (avg_gain + avg_loss)
+    return out
+
+# --- VWAP ---
+# Anchored: sums reset at every session start. Sessions start daily at 00:00 UTC shifted by
+# -anchor_offset_ms (0 = UTC day for crypto, market_data.vwap_anchor_offset gives the NSE open).
+# Rolling: fixed N-bar window. Neither: cumulative over the loaded window.
+DAY_MS = 86400000
+
+def session_ids(timestamps, anchor_offset_ms=0):
+    """Session number of each bar (ms timestamps)."""
+    return (np.asarray(timestamps, dtype=np.int64) + anchor_offset_ms) // DAY_MS
+
+def _session_cumsum(x, sessions):
+    """
+    Cumulative sum that restarts whenever the session id changes (along the last axis).
+    Each session is laid out as its own row of a (sessions, longest session) grid and summed from
+    its first bar: a difference of running sums would cancel badly on a low-volume session open.
+    """
+    sessions = np.broadcast_to(sessions, x.shape)
+    starts = np.ones(x.shape, dtype=bool)
+    starts[..., 1:] = sessions[..., 1:] != sessions[..., :-1]
+    idx = np.arange(x.shape[-1])
+    col = idx - np.maximum.accumulate(np.where(starts, idx, 0), axis=-1)
+    row = np.cumsum(starts.ravel()).reshape(x.shape) - 1
+    grid = np.zeros((row.max() + 1 if row.size else 0, col.max() + 1 if col.size else 0))
+    grid[row, col] = x
+    return np.cumsum(grid, axis=-1)[row, col]
+
+def vwap_series(high, low, close, volume, timestamps=None, anchor_offset_ms=0, window=None):
+    """
+    VWAP of the typical price (h + l + c) / 3 for every bar.
+    timestamps: anchored to sessions (see above); window: rolling over the last `window` bars
+    (NaN before that); neither: cumulative from the first bar of the window.
+    """
+    h, l, c, v = _as_array(high), _as_array(low), _as_array(close), _as_array(volume)
+    pv = (h + l + c) / 3 * v
+    if window:
+        pv_sum, v_sum = _rolling_sum(pv, window), _rolling_sum(v, window)
+    elif timestamps is not None:
+        sessions = session_ids(timestamps, anchor_offset_ms)
+        pv_sum, v_sum = _session_cumsum(pv, sessions), _session_cumsum(v, sessions)
+    else:
+        pv_sum, v_sum = np.cumsum(pv, axis=-1), np.cumsum(v, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pv_sum / v_sum
+
+def vwap_latest(high, low, close, volume, timestamps=None, anchor_offset_ms=0, window=None):
+    """
+    Latest VWAP value only (1-D). Touches just the bars that count: the last `window` bars,
+    or the bars since the current session started. NaN without volume.
+    """
+    start = 0
+    if window:
+        start = max(0, len(close) - window)
+    elif timestamps is not None:
+        ts = np.asarray(timestamps, dtype=np.int64)
+        session_start = session_ids(ts[-1], anchor_offset_ms) * DAY_MS - anchor_offset_ms
+        start = int(np.searchsorted(ts, session_start))
+    h, l, c, v = (_as_array(x)[start:] for x in (high, low, close, volume))
+    v_sum = v.sum()
+    return float(((h + l + c) / 3 * v).sum() / v_sum) if v_sum > 0 else float('nan')
+
+def true_range(high, low, close, prenan=False):
+    """max(high - low, |high - prev close|, |low - prev close|); the first bar is just high - low."""
+    h, l, c = _as_array(high), _as_array(low), _as_array(close)
+    tr = h - l
+    if len(tr) > 1:
+        prev = c[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(h[1:] - prev), np.abs(l[1:] - prev)))
+    if prenan and len(tr):
+        tr[0] = np.nan
+    return tr
+
+def atr_series(high, low, close, length=14, prenan=False):
+    """Average True Range: Wilder RMA of the true range, seeded with the mean of the first `length` bars (1-D)."""
+    tr = true_range(high, low, close, prenan=prenan)
+    if length <= 0 or len(tr) < length:
+        return np.full(len(tr), np.nan)
+    seeded = tr.copy()
+    seeded[length - 1] = np.nanmean(tr[:length])
+    return ewm(seeded, 1.0 / length, start=length - 1)
+
+def adx_series(high, low, close, length=14):
+    """
+    Average Directional Index (1-D).
+    Returns: (adx, plus_di, minus_di) arrays (pandas_ta ADX_n, DMP_n, DMN_n).
+    """
+    h, l = _as_array(high), _as_array(low)
+    n = len(h)
+    nan = np.full(n, np.nan)
+    if length <= 0 or n < length + 1:
+        return nan, nan.copy(), nan.copy()
+
+    # 1. Directional movement
+    up = np.diff(h)
+    dn = -np.diff(l)
+    pos = np.where((up > dn) & (up > 0), up, 0.0)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+
+    # 2. Directional indicators (scaled by ATR, which sets the warmup)
+    k = 100 / atr_series(h, l, close, length, prenan=True)
+    plus_di = nan.copy()
+    minus_di = nan.copy()
+    plus_di[1:] = k[1:] * ewm(pos, 1.0 / length)
+    minus_di[1:] = k[1:] * ewm(neg, 1.0 / length)
+
+    # 3. ADX = RMA of DX (a bar with no movement either way counts as DX 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    start = _first_valid(plus_di)
+    dx[start:] = np.nan_to_num(dx[start:])
+    adx = ewm(dx, 1.0 / length, start=start)
+    return adx, plus_di, minus_di
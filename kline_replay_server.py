@@ -0,0 +1,144 @@
+"""
+Local WebSocket replay server for kline_stream.KlineStream (offline load testing).
+
+Speaks the Binance combined-stream protocol (SUBSCRIBE messages on /stream) and plays either
+a recording made with KlineStream(record_path=...) or synthetic klines for any number of symbols.
+
+Usage:
+    python kline_replay_server.py --file klines.jsonl --speed 60
+    python kline_replay_server.py --synthetic --speed 0 --bars 500
+Then run the bot with CRYPTO_STREAMING_MODE = True and
+    BINANCE_WS_URL=ws://localhost:8765 CRYPTO_STREAM_REPLAY=true
+Replay mode skips the REST seed: the replayed (synthetic or old) klines would otherwise be
+older than the freshly seeded bars and be dropped as late duplicates.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+from aiohttp import web, WSMsgType
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+def load_recording(path):
+    """Loads recorded combined-stream messages (one JSON per line), skipping subscription acks."""
+    messages = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            msg = json.loads(line)
+            if 'stream' in msg:
+                messages.append(msg)
+    messages.sort(key=lambda m: m['data'].get('E', 0))
+    return messages
+
+def synthetic_klines(streams, bars, ticks_per_bar=4, start_ms=1_700_000_000_000):
+    """Yields random-walk kline/ticker messages for every subscribed stream, bar by bar."""
+    state = {} # stream name -> [open, high, low, close, volume] of the forming bar
+    for bar in range(bars):
+        for tick in range(ticks_per_bar):
+            closed = tick == ticks_per_bar - 1
+            for stream in streams:
+                name, _, kind = stream.partition('@')
+                if not kind.startswith('kline_'):
+                    continue
+                interval = kind[len('kline_'):]
+                tf_ms = ccxt.Exchange.parse_timeframe(interval) * 1000
+                t = start_ms - start_ms % tf_ms + bar * tf_ms
+                event_ms = t + (tick + 1) * tf_ms // ticks_per_bar - (1 if closed else 0)
+
+                st = state.setdefault(name, [100.0, 100.0, 100.0, 100.0, 0.0])
+                if tick == 0: # New bar opens at the previous close
+                    st[0] = st[1] = st[2] = st[3]
+                    st[4] = 0.0
+                st[3] = max(st[3] * (1 + random.gauss(0, 0.002)), 0.0001)
+                st[1], st[2] = max(st[1], st[3]), min(st[2], st[3])
+                st[4] += random.uniform(1, 100)
+                o, h, l, c, v = st
+
+                k = {'t': t, 'T': t + tf_ms - 1, 's': name.upper(), 'i': interval,
+                     'o': f"{o:.8f}", 'h': f"{h:.8f}", 'l': f"{l:.8f}", 'c': f"{c:.8f}", 'v': f"{v:.4f}", 'x': closed}
+                yield {'stream': stream, 'data': {'e': 'kline', 'E': event_ms, 's': name.upper(), 'k': k}}
+                if f"{name}@ticker" in streams:
+                    yield {'stream': f"{name}@ticker", 'data': {'e': '24hrTicker', 'E': event_ms, 's': name.upper(), 'c': f"{c:.8f}"}}
+
+async def play(ws, messages, speed):
+    """Sends messages, sleeping by event-time gaps divided by speed (0 = as fast as possible)."""
+    sent = 0
+    prev_event = None
+    for msg in messages:
+        event_ms = msg['data'].get('E', 0)
+        if speed > 0 and prev_event is not None and event_ms > prev_event:
+            await asyncio.sleep((event_ms - prev_event) / 1000 / speed)
+        prev_event = event_ms
+        await ws.send_str(json.dumps(msg))
+        sent += 1
+        if sent % 1000 == 0:
+            await asyncio.sleep(0) # Let other clients run
+    return sent
+
+async def stream_handler(request):
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    app = request.app
+    streams = set(filter(None, request.query.get('streams', '').split('/')))
+
+    async def subscriptions():
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            req = json.loads(msg.data)
+            if req.get('method') == 'SUBSCRIBE':
+                streams.update(req.get('params', []))
+                await ws.send_str(json.dumps({'result': None, 'id': req.get('id')}))
+
+    reader = asyncio.create_task(subscriptions())
+    try:
+        # Give the client a moment to send its SUBSCRIBE batches
+        await asyncio.sleep(app['subscribe_wait'])
+        if app['recording'] is not None:
+            messages = [m for m in app['recording'] if m['stream'] in streams]
+        else:
+            messages = synthetic_klines(sorted(streams), app['bars'])
+        sent = await play(ws, messages, app['speed'])
+        logger.info(f"Replay finished: {sent} messages for {len(streams)} streams")
+        await reader
+    finally:
+        reader.cancel()
+    return ws
+
+def build_app(recording=None, speed=1.0, bars=300, subscribe_wait=2.0):
+    """Creates the replay app (used by the CLI and by tests)."""
+    app = web.Application()
+    app['recording'] = recording
+    app['speed'] = speed
+    app['bars'] = bars
+    app['subscribe_wait'] = subscribe_wait
+    app.router.add_get('/stream', stream_handler)
+    app.router.add_get('/ws', stream_handler)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic Binance klines over WebSocket.")
+    parser.add_argument('--file', help="Recording made with KlineStream(record_path=...)")
+    parser.add_argument('--synthetic', action='store_true', help="Generate random-walk klines for every subscribed symbol")
+    parser.add_argument('--bars', type=int, default=300, help="Synthetic bars per symbol")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier (0 = no pacing)")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    if not args.file and not args.synthetic:
+        parser.error("Pass --file or --synthetic")
+
+    recording = load_recording(args.file) if args.file else None
+    if recording is not None:
+        logger.info(f"Loaded {len(recording)} recorded messages from {args.file}")
+    web.run_app(build_app(recording, args.speed, args.bars), port=args.port)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import aiohttp
+import config
+import market_data
+
+logger = logging.getLogger(__name__)
+
+# Binance accepts up to 1024 streams per connection and 5 incoming messages per second.
+SUBSCRIBE_BATCH = 200
+SUBSCRIBE_INTERVAL = 0.25
+
+def to_stream_name(symbol):
+    """'BTC/USDT' -> 'btcusdt' (Binance stream naming)."""
+    return symbol.replace('/', '').lower()
+
+class KlineStream:
+    """
+    Streams klines + tickers for many symbols over ONE multiplexed Binance WebSocket.
+    Streamed candles are merged into market_data's candle cache; when a bar closes,
+    on_bar_close(symbol) is awaited so analysis runs right after the close instead of
+    on the next REST polling cycle. It fires once per bar, only after the closed bar was written.
+    Cold caches and missed bars are refilled via REST in the background, never inside the message loop.
+    rest_seed=False skips the REST warmup and refills (offline load tests against kline_replay_server.py).
+    """
+    def __init__(self, symbols, timeframe=config.CRYPTO_TIMEFRAME, on_bar_close=None,
+                 url=config.BINANCE_WS_URL, record_path=None, max_callbacks=5, rest_seed=True):
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.on_bar_close = on_bar_close
+        self.url = url.rstrip('/')
+        self.record_path = record_path
+        self.rest_seed = rest_seed
+        self.stats = {'messages': 0, 'bars_closed': 0, 'refetches': 0, 'reconnects': 0}
+        self._by_stream = {to_stream_name(s): s for s in self.symbols}
+        self._callback_sem = asyncio.Semaphore(max_callbacks)
+        self._callbacks = set()
+        self._refetching = {} # symbol -> background REST refill task
+        self._closed_while_refetching = {} # symbol -> open timestamp of a bar that closed meanwhile
+        self._record_file = None
+        self._task = None
+
+    def start(self):
+        """Starts the stream in the background (reconnects until stopped)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Stops the stream and waits for pending callbacks."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+    async def _seed(self):
+        """Fills (or refills after a reconnect) the candle cache via REST."""
+        if not self.rest_seed:
+            return
+        exchange = market_data.get_crypto_exchange()
+        for symbol in self.symbols:
+            await market_data.fetch_crypto_candles(exchange, symbol, timeframe=self.timeframe)
+
+    async def _subscribe(self, ws):
+        streams = []
+        for name in self._by_stream:
+            streams.append(f"{name}@kline_{self.timeframe}")
+            streams.append(f"{name}@ticker")
+        for i in range(0, len(streams), SUBSCRIBE_BATCH):
+            await ws.send_json({'method': 'SUBSCRIBE', 'params': streams[i:i + SUBSCRIBE_BATCH], 'id': i // SUBSCRIBE_BATCH + 1})
+            await asyncio.sleep(SUBSCRIBE_INTERVAL)
+
+    async def _run(self):
+        if self.record_path:
+            self._record_file = open(self.record_path, 'a')
+
+        backoff = 1
+        while True:
+            try:
+                await self._seed()
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(f"{self.url}/stream", heartbeat=30) as ws:
+                        await self._subscribe(ws)
+                        logger.info(f"📡 Kline stream connected ({len(self.symbols)} symbols, {self.timeframe})")
+                        backoff = 1
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                await self._handle(msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Kline stream error: {e}")
+
+            self.stats['reconnects'] += 1
+            logger.warning(f"Kline stream disconnected. Reconnecting in {backoff}s...")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _handle(self, raw):
+        self.stats['messages'] += 1
+        if self._record_file:
+            self._record_file.write(raw + '\n')
+
+        msg = json.loads(raw)
+        if 'result' in msg: # Subscription ack
+            return
+        data = msg.get('data', msg)
+        event = data.get('e')
+
+        if event == 'kline':
+            k = data['k']
+            symbol = self._by_stream.get(k['s'].lower())
+            if symbol is None:
+                return
+            candle = [k['t'], float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+            status = market_data.apply_stream_candle(symbol, self.timeframe, candle, closed=k['x'], strict=self.rest_seed)
+            if status == market_data.STREAM_CLOSED:
+                self._bar_closed(symbol)
+            elif status == market_data.STREAM_REFETCH:
+                # Cold cache or missed bars (e.g. after reconnect): refill via REST without blocking the stream
+                if k['x']:
+                    self._closed_while_refetching[symbol] = k['t']
+                if symbol not in self._refetching:
+                    self.stats['refetches'] += 1
+                    self._refetching[symbol] = self._spawn(self._refetch(symbol))
+
+        elif event == '24hrTicker':
+            symbol = self._by_stream.get(data['s'].lower())
+            if symbol is not None:
+                market_data.update_stream_ticker(symbol, float(data['c']), data['E'])
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+        return task
+
+    def _bar_closed(self, symbol):
+        self.stats['bars_closed'] += 1
+        if self.on_bar_close:
+            self._spawn(self._fire(symbol))
+
+    async def _refetch(self, symbol):
+        """REST refill; a bar that closed while the cache was cold is analysed once it is in."""
+        try:
+            buf = await market_data.fetch_crypto_candles(market_data.get_crypto_exchange(), symbol, timeframe=self.timeframe)
+        finally:
+            self._refetching.pop(symbol, None)
+        closed_ts = self._closed_while_refetching.pop(symbol, None)
+        if closed_ts is not None and buf is not None and len(buf) and buf.last_timestamp >= closed_ts:
+            self._bar_closed(symbol)
+
+    async def _fire(self, symbol):
+        async with self._callback_sem:
+            try:
+                await self.on_bar_close(symbol)
+            except Exception as e:
+                logger.error(f"Bar-close handler failed for {symbol}: {e}")
@@ -131,9 +131,13 @@ async def main():
         return
 
     ctx = MockContext(config.TELEGRAM_BOT_TOKEN)
-    await scan_and_report_crypto(ctx)
-    await scan_and_report_stocks(ctx)
-    await scan_and_report_news(ctx)
+    await market_data.init_crypto_exchange()
+    try:
+        await scan_and_report_crypto(ctx)
+        await scan_and_report_stocks(ctx)
+        await scan_and_report_news(ctx)
+    finally:
+        await market_data.close_crypto_exchange()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,90 +1,410 @@
-import ccxt
+import ccxt.async_support as ccxt
+import aiohttp
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
 import yfinance as yf
 import config
 import logging
 import asyncio
+import time
+from types import MappingProxyType
 
+import indicators
 import nse_client
-import requests
+import rate_limiter
+from candle_buffer import CandleBuffer, as_candle_buffer, find_gaps
+from candle_store import CandleStore
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 # --- Exchange Setup ---
+# Process-wide async exchange (Singleton). Shared by scanners, trade managers and scripts
+# so we keep one aiohttp session (keep-alive connections) and load markets only once.
+_crypto_exchange = None
+
 def get_crypto_exchange():
-    """Initialize the Binance exchange (Singapore server allows this)."""
+    """Returns the shared async Binance client (Singapore server allows this)."""
+    global _crypto_exchange
+    if _crypto_exchange is not None:
+        return _crypto_exchange
     try:
         # Using Binance - Best liquidity, works in Singapore
         exchange_config = {
-            'enableRateLimit': True,
+            'enableRateLimit': False, # Paced by rate_limiter's 'binance' weight bucket (see exchange_call)
             'timeout': 30000,
         }
         if config.BINANCE_API_KEY and config.BINANCE_SECRET_KEY:
             exchange_config['apiKey'] = config.BINANCE_API_KEY
             exchange_config['secret'] = config.BINANCE_SECRET_KEY
             
-        exchange = ccxt.binance(exchange_config)
-        return exchange
+        _crypto_exchange = ccxt.binance(exchange_config)
+        return _crypto_exchange
     except Exception as e:
         logger.error(f"Error initializing crypto exchange: {e}")
         return None
 
+async def init_crypto_exchange():
+    """Creates the shared exchange and loads markets once (call at startup)."""
+    exchange = get_crypto_exchange()
+    if exchange is None:
+        return None
+    try:
+        await exchange_call(exchange, 'load_markets')
+        logger.info(f"Crypto exchange ready ({len(exchange.markets)} markets loaded).")
+    except Exception as e:
+        # Not fatal: ccxt retries the lazy load on the first request
+        logger.error(f"Error loading crypto markets: {e}")
+    return exchange
+
+async def close_crypto_exchange():
+    """Closes the shared exchange session (call on shutdown)."""
+    global _crypto_exchange
+    exchange, _crypto_exchange = _crypto_exchange, None
+    if exchange is None:
+        return
+    try:
+        await exchange.close()
+    except Exception as e:
+        logger.error(f"Error closing crypto exchange: {e}")
+
+# Binance request weight per ccxt method (unlisted methods count as 1)
+_BINANCE_WEIGHTS = {'load_markets': 20, 'fetch_ohlcv': 2, 'fetch_ticker': 2, 'fetch_tickers': 80}
+_BINANCE_WEIGHT_LIMIT_1M = 6000
+
+async def exchange_call(exchange, method, *args, **kwargs):
+    """
+    Calls a ccxt exchange method under the shared Binance weight budget.
+    The bucket is synced with Binance's used-weight header and paused on 429/418 responses.
+    """
+    await rate_limiter.acquire('binance', _BINANCE_WEIGHTS.get(method, 1))
+    try:
+        result = await getattr(exchange, method)(*args, **kwargs)
+    except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+        rate_limiter.penalize('binance', rate_limiter.parse_retry_after(exchange.last_response_headers))
+        raise
+    headers = exchange.last_response_headers or {}
+    used = next((v for k, v in headers.items() if k.lower() == 'x-mbx-used-weight-1m'), None)
+    if used is not None:
+        rate_limiter.get_bucket('binance').observe_usage(int(used), _BINANCE_WEIGHT_LIMIT_1M)
+    return result
+
+# --- Single-Flight (request coalescing) ---
+# Concurrent requests for the same key (endpoint, symbol, timeframe) share one in-flight task;
+# successful results are reused for a short per-endpoint TTL (config.SINGLE_FLIGHT_TTL).
+_inflight = {}
+_recent_results = {} # key -> (expires_at, result)
+
+async def single_flight(key, fetch):
+    """Awaits fetch() at most once at a time per key. key[0] selects the result TTL."""
+    hit = _recent_results.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+
+        def done(t):
+            _inflight.pop(key, None)
+            ttl = config.SINGLE_FLIGHT_TTL.get(key[0], 0)
+            if ttl and not t.cancelled() and t.exception() is None and t.result() is not None:
+                _prune_recent_results()
+                _recent_results[key] = (time.monotonic() + ttl, t.result())
+
+        task.add_done_callback(done)
+    # Shielded: one caller being cancelled must not cancel the fetch for the others
+    return await asyncio.shield(task)
+
+def _prune_recent_results():
+    """Drops expired results, so the cache only holds keys fetched within the last TTL."""
+    now = time.monotonic()
+    for key in [k for k, (expires, _) in _recent_results.items() if expires <= now]:
+        del _recent_results[key]
+
+def clear_single_flight_cache():
+    """Drops reusable results (in-flight requests are left alone)."""
+    _recent_results.clear()
+
+# --- Candle Cache ---
+# Fixed-length CandleBuffer per (symbol, timeframe). After the first download we only
+# ask the exchange for candles since the last cached bar.
+_candle_cache = {}
+
+def clear_candle_cache(symbol=None):
+    """Drops cached candles (all, or for one symbol)."""
+    if symbol is None:
+        _candle_cache.clear()
+        _stream_closed.clear()
+        return
+    for key in [k for k in _candle_cache if k[0] == symbol]:
+        del _candle_cache[key]
+        _stream_closed.pop(key, None)
+
+def get_cached_candles(symbol, timeframe=config.CRYPTO_TIMEFRAME):
+    """Returns the cached CandleBuffer for (symbol, timeframe) without any network call (or None)."""
+    return _candle_cache.get((symbol, timeframe))
+
+# --- Streaming Feed (kline_stream.py) ---
+# Last streamed ticker per symbol: {'last': float, 'timestamp': ms}
+_stream_tickers = {}
+_stream_closed = {} # (symbol, timeframe) -> open timestamp of the last bar the stream reported closed
+
+# apply_stream_candle results
+STREAM_CLOSED = 'closed' # A bar closed and was written (analysis can run)
+STREAM_APPLIED = 'applied' # The forming bar was updated
+STREAM_DUPLICATE = 'duplicate' # Not newer than what the buffer holds, nothing written
+STREAM_REFETCH = 'refetch' # Cold cache or missed bars, nothing written (refill via REST)
+
+def apply_stream_candle(symbol, timeframe, candle, closed=False, strict=True):
+    """
+    Merges a streamed candle ([timestamp, o, h, l, c, v]) into the candle cache.
+    closed: the exchange's bar-close flag for this candle.
+    Returns one of the STREAM_* statuses above.
+    With strict=False (offline replay) the buffer is created on demand, holes are accepted
+    and nothing is written to the candle store.
+    """
+    key = (symbol, timeframe)
+    buf = _candle_cache.get(key)
+    if buf is None or len(buf) == 0:
+        if strict:
+            return STREAM_REFETCH
+        buf = _candle_cache[key] = CandleBuffer(config.CANDLE_CACHE_SIZE)
+    else:
+        last_ts = buf.last_timestamp
+        if candle[0] < last_ts or candle[0] <= _stream_closed.get(key, -1):
+            return STREAM_DUPLICATE # Late or repeated message, already superseded
+        tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        if strict and candle[0] - last_ts > tf_ms:
+            return STREAM_REFETCH
+        if strict and candle[0] > last_ts: # A new bar opened, so the previous one is closed
+            _persist_closed(symbol, timeframe, buf.to_list()[-1:], candle[0])
+    buf.append(*candle)
+    if not closed:
+        return STREAM_APPLIED
+    _stream_closed[key] = candle[0]
+    return STREAM_CLOSED
+
+def update_stream_ticker(symbol, last_price, timestamp):
+    """Stores the latest streamed price for a symbol."""
+    _stream_tickers[symbol] = {'last': last_price, 'timestamp': timestamp}
+
+def get_stream_ticker(symbol):
+    """Returns the latest streamed ticker for a symbol (or None)."""
+    return _stream_tickers.get(symbol)
+
+# --- Resampling (HTF from base candles) ---
+# Binance weekly bars open on Monday 00:00 UTC, the epoch (1970-01-01) was a Thursday.
+_WEEK_OFFSET_MS = 4 * 86400 * 1000
+
+def resample_candles(candles, timeframe, base_timeframe=config.CRYPTO_TIMEFRAME):
+    """
+    Builds higher-timeframe candles from base-timeframe candles (CandleBuffer or Raw Lists).
+    Buckets are aligned to exchange bar boundaries. A leading bucket that is missing its
+    first base bars is dropped; the last bucket is kept as the still-forming bar, the same
+    way the exchange returns it.
+    Returns: CandleBuffer
+    """
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    base_ms = ccxt.Exchange.parse_timeframe(base_timeframe) * 1000
+    if timeframe.endswith('M') or tf_ms % base_ms != 0:
+        raise ValueError(f"Cannot resample {base_timeframe} candles to {timeframe}")
+
+    src = as_candle_buffer(candles)
+    if src is None or len(src) == 0:
+        return CandleBuffer(1)
+
+    ts = src.timestamp
+    offset = _WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    buckets = (ts - offset) // tf_ms
+
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+    bucket_ts = buckets[starts] * tf_ms + offset
+
+    # Leading partial bucket (window started mid-bar) would have a wrong open/volume
+    first = 1 if ts[0] != bucket_ts[0] else 0
+    if first >= len(starts):
+        return CandleBuffer(1)
+
+    return CandleBuffer.from_arrays(
+        bucket_ts[first:],
+        src.open[starts[first:]],
+        np.maximum.reduceat(src.high, starts)[first:],
+        np.minimum.reduceat(src.low, starts)[first:],
+        src.close[ends[first:] - 1],
+        np.add.reduceat(src.volume, starts)[first:],
+    )
+
+def last_closed_candle_ts(timeframe, now_ms=None, day_offset_ms=None):
+    """
+    Open timestamp (ms) of the last candle that has closed by now_ms (default: now), from the clock alone.
+    day_offset_ms aligns daily bars to a local midnight (e.g. IST for NSE daily candles).
+    """
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    offset = (day_offset_ms or 0) if tf_ms >= 86400000 else 0
+    return ((now_ms + offset) // tf_ms - 1) * tf_ms - offset
+
+def is_candle_closed(symbol, timeframe, ts, now_ms=None):
+    """True once the bar opened at `ts` has ended by now_ms (default: now) or the stream reported it closed."""
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return ts + tf_ms <= now_ms or ts <= _stream_closed.get((symbol, timeframe), -1)
+
+def closed_candles(symbol, timeframe, candles, now_ms=None):
+    """
+    The candles (CandleBuffer or raw lists) without a still-forming last bar, as a CandleBuffer.
+    The buffer itself is returned when every bar is closed, a copy otherwise.
+    """
+    buf = as_candle_buffer(candles)
+    if buf is None or len(buf) == 0 or is_candle_closed(symbol, timeframe, buf.last_timestamp, now_ms):
+        return buf
+    return CandleBuffer.from_arrays(
+        buf.timestamp[:-1], buf.open[:-1], buf.high[:-1], buf.low[:-1], buf.close[:-1], buf.volume[:-1]
+    )
+
+def closed_frame(symbol, timeframe, df, now_ms=None):
+    """The OHLCV dataframe without a still-forming last row (same rule as closed_candles)."""
+    if df is None or df.empty or is_candle_closed(symbol, timeframe, last_frame_timestamp(df), now_ms):
+        return df
+    return df.iloc[:-1]
+
+def last_frame_timestamp(df):
+    """Epoch-ms open timestamp of the last row of an OHLCV dataframe."""
+    return int(_timestamps_ms(df.tail(1))[0])
+
 # --- Data Fetching ---
 async def fetch_crypto_ohlcv(exchange, symbol, timeframe=config.CRYPTO_TIMEFRAME, limit=100):
-    """Fetch OHLCV data from Binance (Async wrapper effectively)."""
+    """Fetch OHLCV data from Binance as a DataFrame."""
+    bars = await fetch_crypto_candles_raw(exchange, symbol, timeframe=timeframe, limit=limit)
+    if bars is None:
+        return None
+    df = pd.DataFrame(bars, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+async def fetch_crypto_candles(exchange, symbol, timeframe=config.CRYPTO_TIMEFRAME, limit=config.CANDLE_CACHE_SIZE):
+    """
+    Fetch OHLCV data from Binance into the cached CandleBuffer (No Pandas).
+    Only candles newer than the last cached bar are downloaded; concurrent callers share one request.
+    Returns the shared buffer itself: treat it as read-only.
+    """
+    window = max(limit, config.CANDLE_CACHE_SIZE)
+    return await single_flight(
+        ('candles', symbol, timeframe, window),
+        lambda: _fetch_crypto_candles(exchange, symbol, timeframe, limit)
+    )
+
+async def _fetch_crypto_candles(exchange, symbol, timeframe, limit):
+    key = (symbol, timeframe)
+    window = max(limit, config.CANDLE_CACHE_SIZE)
     try:
-        # Check if exchange is async or sync. Using sync ccxt method in async loop is blocking.
-        # Ideally use ccxt.async_support but for simplicity we run in executor if needed.
-        # For now, we assume low frequency enough that direct call is okay, or wrap in to_thread.
-        bars = await asyncio.to_thread(exchange.fetch_ohlcv, symbol, timeframe=timeframe, limit=limit)
-        df = pd.DataFrame(bars, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        return df
+        buf = _candle_cache.get(key)
+        tf_ms = exchange.parse_timeframe(timeframe) * 1000
+        
+        # Cold cache: start from the on-disk store (warm restart)
+        if buf is None and config.CANDLE_STORE_ENABLED:
+            buf = get_candle_store().read(symbol, timeframe, limit=window)
+            if buf is not None:
+                _candle_cache[key] = buf
+
+        # Incremental update only if the missing range fits in one request
+        if (buf is not None and buf.capacity >= window and len(buf) >= limit
+                and exchange.milliseconds() - buf.last_timestamp < (window - 1) * tf_ms):
+            bars = await exchange_call(exchange, 'fetch_ohlcv', symbol, timeframe=timeframe, since=buf.last_timestamp, limit=window)
+            buf.merge(bars)
+        else:
+            bars = await exchange_call(exchange, 'fetch_ohlcv', symbol, timeframe=timeframe, limit=window)
+            buf = CandleBuffer.from_ohlcv(bars, capacity=window)
+            _candle_cache[key] = buf
+        
+        _persist_closed(symbol, timeframe, bars, exchange.milliseconds())
+
+        # Gap-aware ingestion: refill every hole with a request sized to it
+        gaps = _new_gaps(symbol, timeframe, buf.timestamp, tf_ms)
+        if gaps:
+            logger.info(f"🩹 Backfilling {len(gaps)} candle gaps for {symbol}")
+            fills = []
+            for start, end in gaps:
+                fills += await exchange_call(
+                    exchange, 'fetch_ohlcv', symbol, timeframe=timeframe, since=start, limit=min(1000, (end - start) // tf_ms)
+                )
+            _persist_closed(symbol, timeframe, fills, exchange.milliseconds(), backfill=True)
+            # Rebuild the window in place (callers hold the buffer): buffered bars win over refetched ones
+            first = int(buf.timestamp[0])
+            merged = {c[0]: c for c in fills if c[0] >= first}
+            merged.update((c[0], c) for c in buf.to_list())
+            buf.merge([merged[t] for t in sorted(merged)])
+        record_series_health(symbol, timeframe, buf.timestamp, attempted=gaps)
+        return buf
     except Exception as e:
         logger.error(f"Error fetching crypto data for {symbol}: {e}")
         return None
 
 async def fetch_crypto_candles_raw(exchange, symbol, timeframe=config.CRYPTO_TIMEFRAME, limit=100):
     """
-    Fetch OHLCV data from Binance as RAW LIST (No Pandas).
+    Fetch OHLCV data from Binance as RAW LIST (No Pandas), served from the candle cache.
     Returns: List of [timestamp, open, high, low, close, volume]
     """
-    try:
-        # Direct CCXT call, keeping it strictly as a list
-        bars = await asyncio.to_thread(exchange.fetch_ohlcv, symbol, timeframe=timeframe, limit=limit)
-        return bars
-    except Exception as e:
-        logger.error(f"Error fetching raw crypto data for {symbol}: {e}")
+    buf = await fetch_crypto_candles(exchange, symbol, timeframe=timeframe, limit=limit)
+    if buf is None:
         return None
+    return buf.to_list()[-limit:]
+
+async def fetch_coingecko_price(coin_id):
+    """
+    Spot USD price + 24h change from CoinGecko, coalesced across callers.
+    Returns: {'usd': float, 'usd_24h_change': float} or None
+    """
+    async def fetch():
+        try:
+            url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd&include_24hr_change=true"
+            logger.info(f"Fetching crypto price from CoinGecko: {url}")
+            await rate_limiter.acquire('coingecko')
+            async with get_http_session().get(url) as resp:
+                logger.info(f"CoinGecko response status: {resp.status}")
+                if resp.status == 429:
+                    rate_limiter.penalize('coingecko', rate_limiter.parse_retry_after(resp.headers))
+                if resp.status != 200:
+                    logger.error(f"CoinGecko returned status {resp.status}: {await resp.text()}")
+                    return None
+                data = await resp.json(content_type=None)
+            if coin_id not in data or 'usd' not in data[coin_id]:
+                logger.error(f"CoinGecko returned unexpected data: {data}")
+                return None
+            return data[coin_id]
+        except Exception as e:
+            logger.error(f"CoinGecko error for {coin_id}: {e}")
+            return None
+
+    return await single_flight(('coingecko', coin_id, None), fetch)
 
 async def fetch_stock_data(symbol, timeframe=config.STOCK_TIMEFRAME, period='5d'):
-    """Fetch Intraday data from Kite (Best), NSE (Backup), or Yahoo (Default)."""
+    """Fetch Intraday data from Kite (Best), NSE (Backup), or Yahoo (Default). Concurrent callers share one request."""
+    df = await single_flight(('stock', symbol, timeframe, period), lambda: _fetch_stock_data(symbol, timeframe, period))
+    return df.copy() if df is not None else None # Callers add indicator columns in place
+
+async def _fetch_stock_data(symbol, timeframe, period):
     
     # 1. Try Kite (Removed temporarily)
 
         
-    # 2. Try NSEPython (Experimental - Often Daily only)
-    # Scalping needs 5m data. NSEPython usually gives EOD. 
-    # Validating if we should use it for 'Intraday'?
-    # Usually no. We skip it for timeframe='5m' unless we solve intraday scraping.
-    # For now, strictly falling back to YFinance for 5m which DOES support it.
-    
-    # try:
-    #     nse = nse_client.NSEDataClient()
-    #     if timeframe == '1d': # Only use for daily
-    #          df = await asyncio.to_thread(nse.fetch_ohlc, symbol, 5)
-    #          if df is not None and not df.empty: return df
-    # except: pass
+    # 2. NSE for daily bars (EOD only, intraday still comes from Yahoo)
+    days = _period_days(period)
+    if timeframe == '1d' and config.NSE_DATA_ENABLED and days:
+        candles = await nse_client.get_nse_client().fetch_daily(symbol, days)
+        if candles is not None and len(candles):
+            return candles_to_df(candles, tz=config.TIMEZONE_STR)
 
     # 3. yfinance Improvement (Session + Retry + Ticker.history)
     max_retries = 3
-    base_delay = 2
     
     for attempt in range(max_retries):
         try:
-             # Add random delay before request to mitigate rate limits
-            await asyncio.sleep(base_delay * (attempt + 1))
+            # Paced by the shared Yahoo bucket (paused after a 429)
+            await rate_limiter.acquire('yahoo')
             
             # Use Ticker.history with a custom session if possible, or just default
             # Ticker.history is often more reliable for single symbols than download
@@ -101,35 +421,17 @@ async def fetch_stock_data(symbol, timeframe=config.STOCK_TIMEFRAME, period='5d'
                 logger.warning(f"Attempt {attempt+1}: No data for {symbol}")
                 continue
 
-            # Standardize Columns
-            df.reset_index(inplace=True)
-            df.columns = [str(col).lower() for col in df.columns]
-            
-            # Rename for consistency
-            rename_map = {
-                'date': 'timestamp', 
-                'datetime': 'timestamp',
-                'stock splits': 'splits'
-            }
-            df.rename(columns=rename_map, inplace=True)
-            
-            # Ensure Timestamp is localized/naive consistent if needed (usually fine)
-            
-            # Allow 'adj close' if 'close' missing (common in yf)
-            if 'close' not in df.columns and 'adj close' in df.columns:
-                 df['close'] = df['adj close']
-
-            required_cols = ['open', 'high', 'low', 'close', 'volume']
-            if not all(col in df.columns for col in required_cols):
+            df = _normalize_stock_df(df)
+            if df is None:
                  continue
 
-            return df
+            return (await _backfill_stock_gaps({symbol: df}, timeframe))[symbol]
 
         except Exception as e:
             error_str = str(e).lower()
-            if "rate limit" in error_str or "429" in error_str:
+            if rate_limiter.is_rate_limit_error(e):
                 logger.warning(f"Rate limited on {symbol} (Attempt {attempt+1}/{max_retries}). Retrying...")
-                await asyncio.sleep(5) # Extra wait
+                rate_limiter.penalize('yahoo')
             elif "delisted" in error_str:
                 logger.warning(f"Ticker {symbol} seems delisted.")
                 return None
@@ -140,79 +442,596 @@ async def fetch_stock_data(symbol, timeframe=config.STOCK_TIMEFRAME, period='5d'
     
     return None
 
+def _period_days(period):
+    """yfinance period string ('5d', '3mo', '1y') in calendar days (None if not convertible)."""
+    for suffix, mult in (('d', 1), ('mo', 31), ('y', 366)):
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return int(period[:-len(suffix)]) * mult
+    return None
+
+def _normalize_stock_df(df):
+    """Standardizes a yfinance frame to timestamp/open/high/low/close/volume columns (None if unusable)."""
+    # Standardize Columns
+    df = df.reset_index()
+    df.columns = [str(col).lower() for col in df.columns]
+    
+    # Rename for consistency
+    rename_map = {
+        'date': 'timestamp', 
+        'datetime': 'timestamp',
+        'stock splits': 'splits'
+    }
+    df.rename(columns=rename_map, inplace=True)
+    
+    # Ensure Timestamp is localized/naive consistent if needed (usually fine)
+    
+    # Allow 'adj close' if 'close' missing (common in yf)
+    if 'close' not in df.columns and 'adj close' in df.columns:
+         df['close'] = df['adj close']
+
+    required_cols = ['open', 'high', 'low', 'close', 'volume']
+    if not all(col in df.columns for col in required_cols):
+         return None
+
+    # Batched downloads pad tickers with NaN rows where they have no bar
+    df = df.dropna(subset=['close'])
+    if df.empty:
+        return None
+    return df.reset_index(drop=True)
+
+async def fetch_stock_data_batch(symbols, timeframe=config.STOCK_TIMEFRAME, period='5d', chunk_size=config.STOCK_BATCH_SIZE):
+    """
+    Fetch Intraday data for many symbols with grouped yf.download requests (chunk_size tickers each).
+    Holes inside a session are backfilled with one more grouped request (see _backfill_stock_gaps).
+    Symbols a grouped request did not return (failed chunk, ticker dropped from the response)
+    fall back to single-symbol fetch_stock_data calls.
+    Returns: {symbol: DataFrame} in the same normalized format as fetch_stock_data.
+    Symbols with no data are left out.
+    """
+    frames = {}
+    for i in range(0, len(symbols), chunk_size):
+        frames.update(await _download_stock_batch(list(symbols[i:i + chunk_size]), timeframe, period=period))
+    frames = await _backfill_stock_gaps(frames, timeframe)
+
+    missing = [s for s in symbols if s not in frames]
+    if missing:
+        logger.warning(f"No batch data for {len(missing)} symbols, fetching them one by one")
+        results = await asyncio.gather(*[fetch_stock_data(s, timeframe, period) for s in missing])
+        frames.update({s: df for s, df in zip(missing, results) if df is not None})
+        missing = [s for s in missing if s not in frames]
+        if missing:
+            logger.warning(f"No data for {len(missing)} symbols: {', '.join(missing)}")
+    return frames
+
+async def _download_stock_batch(chunk, timeframe, max_retries=3, **range_kwargs):
+    """One grouped yf.download (period= or start=/end=), split into normalized per-symbol frames."""
+    frames = {}
+    raw = None
+    for attempt in range(max_retries):
+        try:
+            # yfinance sends one request per ticker: charged per ticker on their own bucket, so a
+            # chunk neither overdraws nor stalls the single-symbol 'yahoo' bucket
+            await rate_limiter.acquire('yahoo_batch', len(chunk))
+            raw = await asyncio.to_thread(
+                yf.download, chunk, interval=timeframe,
+                group_by='ticker', auto_adjust=True, threads=True, progress=False, **range_kwargs
+            )
+            if raw is not None and not raw.empty:
+                break
+            logger.warning(f"Attempt {attempt+1}: No batch data for {len(chunk)} symbols")
+        except Exception as e:
+            if rate_limiter.is_rate_limit_error(e):
+                logger.warning(f"Rate limited on stock batch (Attempt {attempt+1}/{max_retries}). Retrying...")
+                rate_limiter.penalize('yahoo_batch')
+                rate_limiter.penalize('yahoo')
+            else:
+                logger.error(f"Error fetching stock batch: {e}")
+                break
+
+    if raw is None or raw.empty:
+        return frames
+
+    # Split the (ticker, field) column MultiIndex into per-symbol frames
+    multi = isinstance(raw.columns, pd.MultiIndex)
+    tickers = set(raw.columns.get_level_values(0)) if multi else set(chunk)
+    for symbol in chunk:
+        if symbol not in tickers:
+            continue
+        df = raw[symbol] if multi else raw
+        df = _normalize_stock_df(df.dropna(how='all'))
+        if df is not None:
+            frames[symbol] = df
+    return frames
+
+async def _backfill_stock_gaps(frames, timeframe):
+    """
+    Gap-aware ingestion for stock frames: intraday holes (auctions, feed outages) are
+    re-requested for all affected symbols in ONE grouped download, merged in, and the
+    remaining gaps are recorded in the series health stats.
+    """
+    if timeframe[-1] not in 'mh': # Daily bars: holidays are not holes
+        return frames
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    gapped = {symbol: _new_gaps(symbol, timeframe, _timestamps_ms(df), tf_ms, _IST_OFFSET_MS)
+              for symbol, df in frames.items()}
+    gapped = {symbol: gaps for symbol, gaps in gapped.items() if gaps}
+
+    if gapped:
+        start = min(g[0][0] for g in gapped.values())
+        logger.info(f"🩹 Backfilling candle gaps for {len(gapped)} stocks")
+        fills = await _download_stock_batch(sorted(gapped), timeframe, start=datetime.fromtimestamp(start / 1000, timezone.utc))
+        for symbol, fill in fills.items():
+            df = pd.concat([frames[symbol], fill], ignore_index=True)
+            df = df.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+            frames[symbol] = df.reset_index(drop=True)
+
+    for symbol, df in frames.items():
+        record_series_health(symbol, timeframe, _timestamps_ms(df), _IST_OFFSET_MS, attempted=gapped.get(symbol))
+    return frames
+
+# --- Stock Intraday Buffers ---
+# CandleBuffer per (symbol, timeframe), seeded once per IST day with a full download;
+# later scans only ask Yahoo for bars since the last buffered (still-forming) bar.
+_stock_buffers = {} # (symbol, timeframe) -> (IST date seeded, CandleBuffer)
+
+def _ist_date(ms=None):
+    ms = ccxt.Exchange.milliseconds() if ms is None else ms
+    return (ms + _IST_OFFSET_MS) // 86400000
+
+def _df_to_buffer(df, capacity=config.STOCK_BUFFER_SIZE):
+    return CandleBuffer.from_arrays(
+        _timestamps_ms(df), df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+        df['close'].to_numpy(), df['volume'].to_numpy(), capacity=capacity
+    )
+
+async def fetch_stock_intraday_batch(symbols, timeframe=config.STOCK_TIMEFRAME):
+    """
+    Intraday frames for many stocks from the per-symbol buffers:
+    1. symbols not seeded today: one grouped 5-day download (fetch_stock_data_batch),
+    2. seeded symbols: grouped downloads (STOCK_BATCH_SIZE tickers) with a narrow start= window from
+       the chunk's oldest last bar,
+    3. gap check/backfill over the merged series.
+    Returns: {symbol: DataFrame} in the same format as fetch_stock_data_batch. Seeded symbols whose
+    refresh failed are left out rather than served from the stale buffer.
+    """
+    today = _ist_date()
+    warm, cold = {}, []
+    for symbol in symbols:
+        entry = _stock_buffers.get((symbol, timeframe))
+        if entry is not None and entry[0] == today and len(entry[1]):
+            warm[symbol] = entry[1]
+        else:
+            cold.append(symbol)
+
+    frames = {}
+    if cold:
+        seeded = await fetch_stock_data_batch(cold, timeframe=timeframe, period='5d')
+        for symbol, df in seeded.items():
+            _stock_buffers[(symbol, timeframe)] = (today, _df_to_buffer(df))
+            frames[symbol] = df
+
+    if warm:
+        names, fresh = sorted(warm), {}
+        for i in range(0, len(names), config.STOCK_BATCH_SIZE):
+            chunk = names[i:i + config.STOCK_BATCH_SIZE]
+            since = min(warm[symbol].last_timestamp for symbol in chunk)
+            fresh.update(await _download_stock_batch(
+                chunk, timeframe, start=datetime.fromtimestamp(since / 1000, timezone.utc)
+            ))
+        stale = sorted(set(warm) - set(fresh))
+        if stale:
+            logger.warning(f"Intraday refresh failed for {len(stale)}/{len(warm)} stocks, skipping: {', '.join(stale[:10])}")
+        for symbol in fresh:
+            buf = warm[symbol]
+            buf.merge([c for c in df_to_candles(fresh[symbol]) if c[0] >= buf.last_timestamp])
+            frames[symbol] = candles_to_df(buf, tz=config.TIMEZONE_STR)
+
+        # Narrow windows can still skip bars: same gap check + backfill as full downloads
+        checked = await _backfill_stock_gaps({s: frames[s] for s in fresh}, timeframe)
+        for symbol, df in checked.items():
+            if len(df) != len(frames[symbol]):
+                _stock_buffers[(symbol, timeframe)] = (today, _df_to_buffer(df))
+            frames[symbol] = df
+
+    return frames
+
+async def fetch_price_snapshot(crypto_symbols=(), stock_symbols=()):
+    """
+    Last prices for every held symbol with one request per market:
+    fetch_tickers for crypto (fresh streamed prices are used as is), a grouped yf.download for stocks.
+    The same symbol set within config.SINGLE_FLIGHT_TTL['snapshot'] gets the same snapshot.
+    Returns: read-only {symbol: last price}; symbols without a price are left out.
+    """
+    crypto_symbols, stock_symbols = tuple(sorted(crypto_symbols)), tuple(sorted(stock_symbols))
+    return await single_flight(
+        ('snapshot', crypto_symbols, stock_symbols),
+        lambda: _fetch_price_snapshot(crypto_symbols, stock_symbols)
+    )
+
+async def _fetch_price_snapshot(crypto_symbols, stock_symbols):
+    prices = {}
+    now = ccxt.Exchange.milliseconds()
+    missing = []
+    for symbol in crypto_symbols:
+        streamed = get_stream_ticker(symbol)
+        if streamed is not None and now - streamed['timestamp'] < config.SINGLE_FLIGHT_TTL['ticker'] * 1000:
+            prices[symbol] = streamed['last']
+        else:
+            missing.append(symbol)
+
+    async def crypto():
+        if not missing:
+            return {}
+        try:
+            return await exchange_call(get_crypto_exchange(), 'fetch_tickers', sorted(missing))
+        except Exception as e:
+            logger.error(f"Error fetching tickers for {len(missing)} symbols: {e}")
+            return {}
+
+    async def stocks():
+        if not stock_symbols:
+            return {}
+        return await fetch_stock_intraday_batch(sorted(stock_symbols))
+
+    tickers, frames = await asyncio.gather(crypto(), stocks())
+    for symbol, ticker in tickers.items():
+        if ticker and ticker.get('last') is not None:
+            prices[symbol] = ticker['last']
+    for symbol, df in frames.items():
+        prices[symbol] = float(df['close'].iloc[-1])
+    return MappingProxyType(prices)
+
+# --- Series Health (gap tracking) ---
+# Per (symbol, timeframe) gap stats from the last ingestion. Analysis only reads the
+# 'healthy' flag, so skipping a broken series costs one dict lookup.
+_series_health = {}
+
+def _new_gaps(symbol, timeframe, timestamps, tf_ms, day_offset_ms=None):
+    """Gaps in the series that a backfill has not already failed to fill."""
+    known = _series_health.get((symbol, timeframe), {}).get('unfillable', set())
+    return [g for g in find_gaps(timestamps, tf_ms, day_offset_ms) if g not in known]
+
+def record_series_health(symbol, timeframe, timestamps, day_offset_ms=None, attempted=None):
+    """
+    Checks timestamp spacing against the timeframe and stores the gap stats.
+    attempted: gaps a backfill just tried to fill (the ones still open are not retried).
+    Returns the stats dict.
+    """
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    gaps = find_gaps(timestamps, tf_ms, day_offset_ms)
+    missing = sum((end - start) // tf_ms for start, end in gaps)
+    expected = len(timestamps) + missing
+
+    stats = _series_health.setdefault((symbol, timeframe), {'backfilled_bars': 0, 'unfillable': set()})
+    if attempted:
+        still_open = set(gaps) & set(attempted)
+        stats['unfillable'] |= still_open
+        stats['backfilled_bars'] += sum((end - start) // tf_ms for start, end in attempted if (start, end) not in still_open)
+    # Forget unfillable gaps that scrolled out of the window
+    first = int(timestamps[0]) if len(timestamps) else 0
+    stats['unfillable'] = {g for g in stats['unfillable'] if g[1] > first}
+
+    stats.update(
+        gaps=len(gaps),
+        missing_bars=missing,
+        missing_ratio=missing / expected if expected else 0.0,
+        healthy=expected > 0 and missing <= config.SERIES_MAX_MISSING_RATIO * expected,
+    )
+    if attempted and still_open:
+        logger.warning(f"{symbol} {timeframe}: {len(still_open)} gaps could not be backfilled ({missing} missing bars)")
+    return stats
+
+def is_series_healthy(symbol, timeframe):
+    """Cheap health flag for analysis (True when the series was never checked)."""
+    stats = _series_health.get((symbol, timeframe))
+    return stats is None or stats['healthy']
+
+def get_series_health(symbol=None):
+    """Gap stats per (symbol, timeframe), optionally for one symbol."""
+    return {k: v for k, v in _series_health.items() if symbol is None or k[0] == symbol}
+
+# --- Candle Store (candle_store.py) ---
+# Closed candles on disk, shared by the live bot, backtest_engine.py and run_diagnostic.py.
+_candle_store = None
+_IST_OFFSET_MS = 19800 * 1000 # NSE sessions are grouped by IST day when looking for gaps
+_STOCK_INTRADAY_DAYS = 59 # Yahoo serves intraday bars for the last 60 days only
+
+def session_day_offset(symbol):
+    """UTC offset (ms) of the trading day used for gap checks: IST for stocks, None (24/7) for crypto pairs."""
+    return None if '/' in symbol else _IST_OFFSET_MS
+
+def vwap_anchor_offset(symbol):
+    """
+    VWAP session anchor for indicators.vwap_series (ms added before flooring to days):
+    crypto sessions start at 00:00 UTC, NSE sessions at the 09:15 IST open.
+    """
+    if '/' in symbol:
+        return 0
+    open_ms = (config.STOCK_MARKET_OPEN_HOUR * 60 + config.STOCK_MARKET_OPEN_MINUTE) * 60000
+    return _IST_OFFSET_MS - open_ms
+
+def get_candle_store():
+    """Returns the process-wide CandleStore."""
+    global _candle_store
+    if _candle_store is None:
+        _candle_store = CandleStore(config.CANDLE_STORE_DIR)
+    return _candle_store
+
+def _persist_closed(symbol, timeframe, candles, now_ms, backfill=False):
+    """
+    Appends the closed candles that are newer than the store's last one (never raises).
+    backfill=True stores older ones too (refilled gaps, merged into the store).
+    """
+    if not config.CANDLE_STORE_ENABLED or not candles:
+        return
+    try:
+        store = get_candle_store()
+        tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        last = None if backfill else store.last_timestamp(symbol, timeframe)
+        closed = [c for c in candles if c[0] + tf_ms <= now_ms and (last is None or c[0] > last)]
+        if closed:
+            store.write(symbol, timeframe, closed)
+    except Exception as e:
+        logger.error(f"Error storing candles for {symbol}: {e}")
+
+def _timestamps_ms(df):
+    """Epoch-ms timestamps of an OHLCV dataframe (naive timestamps are taken as UTC)."""
+    ts = pd.to_datetime(df['timestamp'], utc=True)
+    return ((ts - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+
+def df_to_candles(df):
+    """Converts an OHLCV dataframe to raw candle lists ([ms timestamp, o, h, l, c, v])."""
+    ohlcv = df[['open', 'high', 'low', 'close', 'volume']].astype(float).values.tolist()
+    return [[t] + row for t, row in zip(_timestamps_ms(df).tolist(), ohlcv)]
+
+def candles_to_df(candles, tz=None):
+    """Converts a CandleBuffer to an OHLCV dataframe (naive UTC timestamps, or converted to tz)."""
+    ts = pd.to_datetime(candles.timestamp, unit='ms')
+    if tz is not None:
+        ts = ts.tz_localize('UTC').tz_convert(tz)
+    return pd.DataFrame({
+        'timestamp': ts,
+        'open': candles.open, 'high': candles.high, 'low': candles.low,
+        'close': candles.close, 'volume': candles.volume,
+    })
+
+async def _fetch_crypto_range(exchange, symbol, timeframe, start, end):
+    """Downloads [start, end) from Binance page by page (1000 candles per request)."""
+    tf_ms = exchange.parse_timeframe(timeframe) * 1000
+    candles = []
+    since = start
+    while since < end:
+        bars = await exchange_call(exchange, 'fetch_ohlcv', symbol, timeframe=timeframe, since=since, limit=1000)
+        if not bars:
+            break
+        candles.extend(b for b in bars if b[0] < end)
+        if bars[-1][0] < since or len(bars) < 1000:
+            break
+        since = bars[-1][0] + tf_ms
+    return candles
+
+async def _fetch_stock_range(symbol, timeframe, start, end):
+    """Downloads [start, end) from Yahoo (intraday history is clamped to the last 60 days)."""
+    if timeframe[-1] in 'mh':
+        start = max(start, ccxt.Exchange.milliseconds() - _STOCK_INTRADAY_DAYS * 86400000)
+        if start >= end:
+            return []
+
+    def get_data_sync():
+        return yf.Ticker(symbol).history(
+            start=datetime.fromtimestamp(start / 1000, timezone.utc),
+            end=datetime.fromtimestamp(end / 1000, timezone.utc),
+            interval=timeframe
+        )
+
+    await rate_limiter.acquire('yahoo')
+    df = await asyncio.to_thread(get_data_sync)
+    if df is None or df.empty:
+        return []
+    df = _normalize_stock_df(df)
+    if df is None:
+        return []
+    return [c for c in df_to_candles(df) if start <= c[0] < end]
+
+async def sync_candle_store(symbol, timeframe, since=None):
+    """
+    Brings the on-disk history of a symbol up to date, downloading only what is missing:
+    1. history between `since` and the first stored candle (once per `since`),
+    2. interior gaps (overnight/weekend closes are not gaps for stocks),
+    3. the tail after the last stored candle.
+    Crypto pairs ('BTC/USDT') come from Binance, anything else from Yahoo.
+    Returns the number of candles added (None on error).
+    """
+    store = get_candle_store()
+    is_stock = '/' not in symbol
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    now = ccxt.Exchange.milliseconds()
+    if since is None:
+        since = now - config.CANDLE_STORE_HISTORY_DAYS * 86400000
+    since -= since % tf_ms
+
+    ranges = []
+    first = store.first_timestamp(symbol, timeframe)
+    if first is None:
+        ranges.append((since, now))
+    else:
+        synced_from = store.synced_from(symbol, timeframe)
+        if since < first and (synced_from is None or since < synced_from):
+            ranges.append((since, first))
+        ranges.extend(g for g in store.gaps(symbol, timeframe, tf_ms, session_day_offset(symbol)) if g[1] > since)
+        ranges.append((store.last_timestamp(symbol, timeframe) + tf_ms, now))
+
+    added = 0
+    try:
+        for start, end in ranges:
+            if end - start < tf_ms:
+                continue
+            if is_stock:
+                candles = await _fetch_stock_range(symbol, timeframe, start, end)
+            else:
+                candles = await _fetch_crypto_range(get_crypto_exchange(), symbol, timeframe, start, end)
+
+            closed = [c for c in candles if c[0] + tf_ms <= now]
+            if closed:
+                added += store.write(symbol, timeframe, closed)
+            elif first is not None and start > first and end <= store.last_timestamp(symbol, timeframe):
+                store.mark_empty(symbol, timeframe, start, end) # Interior gap the source cannot fill
+        if first is None or since < first:
+            store.set_synced_from(symbol, timeframe, since)
+    except Exception as e:
+        logger.error(f"Error syncing candle store for {symbol} {timeframe}: {e}")
+        return None
+
+    if added:
+        logger.info(f"💾 Stored {added} new {timeframe} candles for {symbol}")
+    return added
+
 # --- Indicator Calculation ---
+# NumPy kernels (indicators.py) on contiguous float64 columns. pandas_ta is no longer
+# needed at runtime (test_indicators.py still checks the kernels against it).
+
+def _column(data, name):
+    """One OHLCV column of a DataFrame or CandleBuffer as a contiguous float64 array."""
+    col = data[name] if isinstance(data, pd.DataFrame) else getattr(data, name)
+    return np.ascontiguousarray(col, dtype=np.float64)
+
 def calculate_indicators_crypto(df):
     """Calculate RSI for Crypto."""
     try:
-        df['rsi'] = ta.rsi(df['close'], length=config.RSI_PERIOD)
+        df['rsi'] = indicators.rsi_series(_column(df, 'close'), config.RSI_PERIOD)
         return df
     except Exception as e:
         logger.error(f"Error calculating Crypto Indicators: {e}")
         return df
 
-def calculate_indicators_stock(df):
-    """Calculate EMAs and Volume for Stocks."""
+def calculate_indicators_stock(data, tail=None):
+    """
+    Calculate EMAs, RSI, ADX and Volume for Stocks.
+    data: OHLCV DataFrame or CandleBuffer (left untouched).
+    Returns: {name: float64 array} (NaN during warmup), only the last `tail` bars if given.
+    None on error.
+    """
     try:
-        df['ema_fast'] = ta.ema(df['close'], length=config.EMA_FAST)
-        df['ema_slow'] = ta.ema(df['close'], length=config.EMA_SLOW)
-        
+        high, low = _column(data, 'high'), _column(data, 'low')
+        close, volume = _column(data, 'close'), _column(data, 'volume')
+        result = {
+            'close': close,
+            'volume': volume,
+            'ema_fast': indicators.ema_series(close, config.EMA_FAST),
+            'ema_slow': indicators.ema_series(close, config.EMA_SLOW),
+        }
+
         # --- Safety Indicators ---
         # 1. Trend Filter: EMA 50
-        df['ema_trend'] = ta.ema(df['close'], length=50)
-        
+        ema_trend = result['ema_trend'] = indicators.ema_series(close, 50)
+
         # 2. Momentum Filter: RSI
-        df['rsi'] = ta.rsi(df['close'], length=14)
-        
+        result['rsi'] = indicators.rsi_series(close, 14)
+
         # 3. Strength Filter: ADX (Requires High, Low, Close)
-        adx_df = ta.adx(df['high'], df['low'], df['close'], length=14)
-        if adx_df is not None and not adx_df.empty:
-            # ADX return columns: ADX_14, DMP_14, DMN_14. We just want ADX.
-            df['adx'] = adx_df[adx_df.columns[0]] # usually the first column is ADX
-        
+        result['adx'] = indicators.adx_series(high, low, close, 14)[0]
+
         # --- Advanced Safety (Slope) ---
-        # Calculate Slope of EMA 50 over last 10 candles
-        # Slope = (Current EMA - EMA 10 bars ago) / EMA 10 bars ago
-        df['ema_trend_slope'] = (df['ema_trend'] - df['ema_trend'].shift(10)) / df['ema_trend'].shift(10) * 100
-        
+        # Slope of EMA 50 over the last 10 candles, in %
+        slope = np.full(len(close), np.nan)
+        slope[10:] = (ema_trend[10:] - ema_trend[:-10]) / ema_trend[:-10] * 100
+        result['ema_trend_slope'] = slope
+
         # EMA 200 (Optional Safety)
-        df['ema_200'] = ta.ema(df['close'], length=200)
+        result['ema_200'] = indicators.ema_series(close, 200)
 
         # Volume Moving Average (20 period)
-        df['vol_avg'] = ta.sma(df['volume'], length=20)
-        
-        return df
-        return df
+        result['vol_avg'] = indicators.sma_series(volume, 20)
+
+        if tail is not None:
+            # Copies, so the full-length arrays can be freed right away
+            result = {name: values[-tail:].copy() for name, values in result.items()}
+        return result
     except Exception as e:
         logger.error(f"Error calculating Stock Indicators: {e}")
-        return df
+        return None
 
 # --- Market Pulse (Free APIs) ---
-def get_fear_and_greed_index():
-    """Fetches Crypto Fear & Greed Index from Alternative.me."""
+# Served from memory: values are kept per item TTL (config.MARKET_PULSE_TTL) and refreshed
+# in the background (bot.refresh_market_pulse job). An expired value is still returned while
+# a refresh runs, so /market never waits on the network once warmed up.
+_http_session = None
+_pulse_cache = {} # name -> (expires_at, value)
+_pulse_tasks = {} # name -> background refresh task
+
+def get_http_session():
+    """Returns the shared aiohttp session for plain HTTP APIs (create inside the event loop)."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _http_session
+
+async def close_http_session():
+    """Closes the shared aiohttp session (call on shutdown)."""
+    global _http_session
+    session, _http_session = _http_session, None
+    if session is not None and not session.closed:
+        await session.close()
+
+async def _refresh_pulse(name):
+    value = await single_flight(('pulse', name, None), _PULSE_FETCHERS[name])
+    if value is not None:
+        _pulse_cache[name] = (time.monotonic() + config.MARKET_PULSE_TTL[name], value)
+    return value
+
+def _refresh_pulse_in_background(name):
+    task = _pulse_tasks.get(name)
+    if task is None or task.done():
+        _pulse_tasks[name] = asyncio.create_task(_refresh_pulse(name))
+
+async def _get_pulse(name):
+    """Cached value (stale values trigger a background refresh); waits only on a cold cache."""
+    hit = _pulse_cache.get(name)
+    if hit is None:
+        return await _refresh_pulse(name)
+    if hit[0] <= time.monotonic():
+        _refresh_pulse_in_background(name)
+    return hit[1]
+
+async def refresh_market_pulse(force=False):
+    """Refreshes expired (or all, with force) market pulse values concurrently."""
+    now = time.monotonic()
+    names = [n for n in _PULSE_FETCHERS if force or n not in _pulse_cache or _pulse_cache[n][0] <= now]
+    if names:
+        await asyncio.gather(*[_refresh_pulse(n) for n in names])
+
+async def _fetch_fear_and_greed():
     try:
+        await rate_limiter.acquire('alternative_me')
         url = "https://api.alternative.me/fng/?limit=1"
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            item = data['data'][0]
-            return {
-                'value': int(item['value']),
-                'value_classification': item['value_classification']
-            }
+        async with get_http_session().get(url) as response:
+            if response.status == 429:
+                rate_limiter.penalize('alternative_me', rate_limiter.parse_retry_after(response.headers))
+            if response.status == 200:
+                data = await response.json(content_type=None)
+                item = data['data'][0]
+                return {
+                    'value': int(item['value']),
+                    'value_classification': item['value_classification']
+                }
     except Exception as e:
         logger.error(f"Error fetching Fear & Greed Index: {e}")
-    return {'value': 0, 'value_classification': 'Unknown'}
+    return None
 
-async def get_market_status():
-    """Fetches Nifty 50 Trend from Yahoo Finance."""
+async def _fetch_yahoo_day(ticker_symbol):
+    """Today's open and last price for a Yahoo ticker (None on error)."""
+    await rate_limiter.acquire('yahoo')
+    # Run in thread as yfinance can be blocking
+    hist = await asyncio.to_thread(lambda: yf.Ticker(ticker_symbol).history(period="1d"))
+    if hist.empty:
+        return None
+    return float(hist["Open"].iloc[-1]), float(hist["Close"].iloc[-1])
+
+async def _fetch_market_status():
     try:
-        # Run in thread as yfinance can be blocking
-        ticker = await asyncio.to_thread(yf.Ticker, "^NSEI")
-        hist = await asyncio.to_thread(ticker.history, period="1d")
-        
-        if not hist.empty:
-            last_close = float(hist["Close"].iloc[-1])
-            open_price = float(hist["Open"].iloc[-1])
+        day = await _fetch_yahoo_day("^NSEI")
+        if day:
+            open_price, last_close = day
             
             change = last_close - open_price
             pct_change = (change / open_price) * 100
@@ -231,16 +1050,11 @@ async def get_market_status():
     
     return None
 
-async def get_usdinr_status():
-    """Fetches USD/INR Price & Trend from Yahoo Finance."""
+async def _fetch_usdinr_status():
     try:
-        # Run in thread as yfinance can be blocking
-        ticker = await asyncio.to_thread(yf.Ticker, "INR=X")
-        hist = await asyncio.to_thread(ticker.history, period="1d")
-        
-        if not hist.empty:
-            last_close = float(hist["Close"].iloc[-1])
-            open_price = float(hist["Open"].iloc[-1])
+        day = await _fetch_yahoo_day("INR=X")
+        if day:
+            open_price, last_close = day
             
             change = last_close - open_price
             pct_change = (change / open_price) * 100
@@ -257,3 +1071,21 @@ async def get_usdinr_status():
         logger.error(f"Error fetching USD/INR: {e}")
     
     return None
+
+_PULSE_FETCHERS = {
+    'fear_greed': _fetch_fear_and_greed,
+    'nifty': _fetch_market_status,
+    'usdinr': _fetch_usdinr_status,
+}
+
+async def get_fear_and_greed_index():
+    """Crypto Fear & Greed Index from Alternative.me (cached)."""
+    return await _get_pulse('fear_greed') or {'value': 0, 'value_classification': 'Unknown'}
+
+async def get_market_status():
+    """Nifty 50 Trend from Yahoo Finance (cached, None if unavailable)."""
+    return await _get_pulse('nifty')
+
+async def get_usdinr_status():
+    """USD/INR Price & Trend from Yahoo Finance (cached, None if unavailable)."""
+    return await _get_pulse('usdinr')
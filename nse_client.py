@@ -1,102 +1,152 @@
 import logging
-import pandas as pd
-from datetime import datetime, timedelta
 import asyncio
-
-# Attempt import, handle failure if not installed yet
-try:
-    from nsepython import equity_history
-    NSE_PYTHON_AVAILABLE = True
-except ImportError:
-    NSE_PYTHON_AVAILABLE = False
+import calendar
+from datetime import datetime, timedelta, timezone
+import aiohttp
+import numpy as np
+import config
+import rate_limiter
+from candle_buffer import CandleBuffer
 
 logger = logging.getLogger(__name__)
 
+IST = timezone(timedelta(hours=5, minutes=30))
+_IST_OFFSET_MS = 19800 * 1000
+
+# NSE rejects requests without browser-like headers and the cookies set by its home page
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Historical API fields -> candle columns
+_FIELDS = ('CH_TIMESTAMP', 'CH_OPENING_PRICE', 'CH_TRADE_HIGH_PRICE', 'CH_TRADE_LOW_PRICE', 'CH_CLOSING_PRICE', 'CH_TOT_TRADED_QTY')
+
+def to_candles(rows):
+    """
+    Converts NSE historical rows (newest first, one per day) straight into a CandleBuffer.
+    Candle timestamps are the IST midnight of the trading day (same as Yahoo daily bars).
+    """
+    by_day = {}
+    for row in rows:
+        try:
+            day = datetime.strptime(row['CH_TIMESTAMP'][:10], "%Y-%m-%d")
+            ts = calendar.timegm(day.timetuple()) * 1000 - _IST_OFFSET_MS
+            by_day[ts] = [float(row[f]) for f in _FIELDS[1:]]
+        except (KeyError, TypeError, ValueError):
+            continue # Skip malformed rows
+    if not by_day:
+        return None
+    ts = np.array(sorted(by_day), dtype=np.int64)
+    cols = np.array([by_day[t] for t in ts.tolist()], dtype=np.float64).T
+    return CandleBuffer.from_arrays(ts, *cols)
+
 class NSEDataClient:
-    def __init__(self):
-        if not NSE_PYTHON_AVAILABLE:
-            logger.warning("nsepython library not found.")
-    
-    def fetch_ohlc(self, symbol, days=5):
+    """
+    Async EOD (daily) data from the NSE historical API.
+    One persistent aiohttp session (NSE cookies are primed once and renewed on 401/403)
+    and a per-day result cache: EOD bars only change after the close, so a symbol is
+    downloaded at most once per IST day.
+    base_url points at a local fixture server in tests.
+    """
+    def __init__(self, base_url=config.NSE_BASE_URL, chunk_days=config.NSE_HISTORY_CHUNK_DAYS):
+        self.base_url = base_url.rstrip('/')
+        self.chunk_days = chunk_days
+        self._session = None
+        self._primed = False
+        self._prime_lock = asyncio.Lock()
+        self._cache = {} # (symbol, days) -> (IST date, CandleBuffer)
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            # unsafe=True keeps cookies for IP hosts too (local fixture server)
+            self._session = aiohttp.ClientSession(
+                headers=_HEADERS, timeout=aiohttp.ClientTimeout(total=15), cookie_jar=aiohttp.CookieJar(unsafe=True)
+            )
+            self._primed = False
+        async with self._prime_lock:
+            if not self._primed:
+                async with self._session.get(f"{self.base_url}/") as resp:
+                    await resp.read() # Sets the session cookies
+                self._primed = True
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _fetch_rows(self, symbol, start, end):
+        """One historical API request (dates as IST date objects). Returns the raw rows."""
+        params = {
+            'symbol': symbol,
+            'series': '["EQ"]',
+            'from': start.strftime("%d-%m-%Y"),
+            'to': end.strftime("%d-%m-%Y"),
+        }
+        for attempt in range(2):
+            await rate_limiter.acquire('nse')
+            session = await self._get_session()
+            async with session.get(f"{self.base_url}/api/historical/cm/equity", params=params) as resp:
+                if resp.status in (401, 403) and attempt == 0:
+                    self._primed = False # Cookies expired, prime again
+                    continue
+                if resp.status == 429:
+                    rate_limiter.penalize('nse', rate_limiter.parse_retry_after(resp.headers))
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
+                return data.get('data', [])
+        return []
+
+    async def fetch_daily(self, symbol, days=60):
         """
-        Fetches historical data via nsepython.
-        symbol: e.g. "RELIANCE" (without .NS)
-        days: Number of days to look back
+        Daily candles for the last `days` calendar days.
+        symbol: e.g. "RELIANCE" or "RELIANCE.NS"
+        Returns: CandleBuffer (None on error / no data)
         """
-        if not NSE_PYTHON_AVAILABLE: return None
-        
+        clean_symbol = symbol.replace('.NS', '').upper()
+        today = datetime.now(IST).date()
+        hit = self._cache.get((clean_symbol, days))
+        if hit is not None and hit[0] == today:
+            return hit[1]
+
         try:
-            # Format Symbol: Remove .NS if present
-            clean_symbol = symbol.replace('.NS', '').upper()
-            
-            # Dates
-            end_date = datetime.now().strftime("%d-%m-%Y")
-            start_date = (datetime.now() - timedelta(days=days)).strftime("%d-%m-%Y")
-            
-            logger.info(f"Fetching NSE data for {clean_symbol} ({start_date} to {end_date})")
-            
-            # Run blocking call in thread
-            # equity_history returns a list of dictionaries or similar
-            # Series EQ is standard for stocks
-            df = equity_history(clean_symbol, "EQ", start_date, end_date)
-            
-            if df is None or df.empty:
-                logger.warning(f"NSEPython returned empty data for {clean_symbol}")
+            # The API serves limited ranges per request, so long histories are chunked
+            start = today - timedelta(days=days)
+            ranges = []
+            while start <= today:
+                end = min(start + timedelta(days=self.chunk_days - 1), today)
+                ranges.append((start, end))
+                start = end + timedelta(days=1)
+
+            logger.info(f"Fetching NSE data for {clean_symbol} ({days} days, {len(ranges)} requests)")
+            chunks = await asyncio.gather(*[self._fetch_rows(clean_symbol, s, e) for s, e in ranges])
+            candles = to_candles([row for rows in chunks for row in rows])
+            if candles is None:
+                logger.warning(f"NSE returned empty data for {clean_symbol}")
                 return None
-                
-            # nsepython returns DataFrame usually?
-            # Columns are typically: CH_TIMESTAMP, CH_OPENING_PRICE, CH_TRADE_HIGH_PRICE, CH_TRADE_LOW_PRICE, CH_CLOSING_PRICE, CH_TOT_TRADED_QTY
-            
-            # Handle standard NSE columns
-            # Standardize names to: timestamp, open, high, low, close, volume
-            
-            rename_map = {
-                'CH_TIMESTAMP': 'timestamp', 
-                'CH_OPENING_PRICE': 'open',
-                'CH_TRADE_HIGH_PRICE': 'high', 
-                'CH_TRADE_LOW_PRICE': 'low',
-                'CH_CLOSING_PRICE': 'close', 
-                'CH_TOT_TRADED_QTY': 'volume'
-            }
-            
-            # Filter just the columns we need if they exist
-            cols_to_keep = [c for c in rename_map.keys() if c in df.columns]
-            df = df[cols_to_keep].copy()
-            df.rename(columns=rename_map, inplace=True)
-            
-            # Convert types
-            df['timestamp'] = pd.to_datetime(df['timestamp'], format="%Y-%m-%d") # Format might vary
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # NSEPython often returns EOD data mostly? 
-            # equity_history is usually daily data. 
-            # Does user need Intraday?
-            # nsepython doesn't easily support 1-minute intraday history publicly without heavy scraping.
-            # YFinance provides 1m/5m intraday.
-            # If user wants SCALPING (5m charts), daily data is useless for EMA crossover signals on 5m.
-            
-            # CHECK: Does equity_history give intraday? No, usually EOD.
-            # If bot needs 5m candles, NSEPython might NOT be suitable unless "intraday" function exists.
-            
-            # Let's check nse_fetch logic or similar.
-            # Most free NSE scrapers only give EOD history or Live Quote (snapshot).
-            # Live Quote is useful for current price, but not for EMA history.
-            
-            # Pivot: If NSEPython is EOD only, it CANNOT replace YFinance for 5m scalping.
-            # I must check if I can get intraday.
-            
-            logger.warning("NSEPython equity_history is typically Daily data. Checking if useful for scalping...")
-            # If we need 5m bars, we might be stuck with YFinance or Kite/Upstox.
-            # However, let's return what we have. If it's daily, the bot might use it for Daily Trend?
-            # But signals.py uses 5m.
-            
-            # For now, return DF. If it's daily data (one row per day), it won't work for 5m scalping logic which calls signals.py.
-            # We'll see.
-            
-            return df
-            
+
+            self._cache[(clean_symbol, days)] = (today, candles)
+            return candles
+
         except Exception as e:
-            logger.error(f"NSEPython Error for {clean_symbol}: {e}")
+            logger.error(f"NSE Error for {clean_symbol}: {e}")
             return None
+
+# --- Shared Client (Singleton) ---
+_client = None
+
+def get_nse_client():
+    """Returns the process-wide NSEDataClient (one session, one cache)."""
+    global _client
+    if _client is None:
+        _client = NSEDataClient()
+    return _client
+
+async def close_nse_client():
+    """Closes the shared client session (call on shutdown)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+import config
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second refill up to `capacity`.
+    Callers await acquire(cost) instead of sleeping a fixed amount, so throughput follows
+    the real quota. penalize() (429 / Retry-After) pauses the bucket and halves its rate;
+    the rate recovers step by step once requests succeed again.
+    """
+    RECOVERY_SECONDS = 60 # Quiet period before a penalized rate is raised again
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._penalized_at = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._penalized_at is not None and now - self._penalized_at > self.RECOVERY_SECONDS:
+            self.rate = min(self.base_rate, self.rate * 2)
+            self._penalized_at = None if self.rate == self.base_rate else now
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def try_acquire(self, cost=1):
+        """Takes tokens if available right now (for sync code paths). Returns True on success."""
+        now = self._refill()
+        if now < self._blocked_until or self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    async def acquire(self, cost=1):
+        """
+        Waits until `cost` tokens are available and takes them (FIFO via the lock).
+        A cost above the capacity waits for a full bucket and leaves it in debt,
+        so the following callers pay for the oversized request.
+        """
+        need = min(cost, self.capacity)
+        async with self._lock:
+            while True:
+                now = self._refill()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                if self.tokens >= need:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((need - self.tokens) / self.rate)
+
+    def penalize(self, retry_after=None):
+        """Upstream said slow down: pause for retry_after seconds (default 1/rate) and halve the rate."""
+        now = time.monotonic()
+        wait = retry_after if retry_after else max(1.0, 1 / self.rate)
+        self._blocked_until = max(self._blocked_until, now + wait)
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        self._penalized_at = now
+        self.tokens = 0
+        logger.warning(f"⏳ Rate limited by {self.name}: pausing {wait:.1f}s, rate now {self.rate:.2f}/s")
+
+    def observe_usage(self, used, limit):
+        """Syncs with a server-reported usage counter (e.g. Binance x-mbx-used-weight-1m)."""
+        self._refill()
+        self.tokens = min(self.tokens, max(0, self.capacity * (1 - used / limit)))
+
+# --- Named Buckets (Singletons) ---
+_buckets = {}
+
+def get_bucket(name):
+    """
+    Returns the shared bucket for `name`. Sub-buckets such as 'telegram_chat:<id>'
+    use the limits of their prefix ('telegram_chat') from config.RATE_LIMITS.
+    """
+    bucket = _buckets.get(name)
+    if bucket is None:
+        rate, capacity = config.RATE_LIMITS[name.split(':', 1)[0]]
+        bucket = _buckets[name] = TokenBucket(name, rate, capacity)
+    return bucket
+
+async def acquire(name, cost=1):
+    await get_bucket(name).acquire(cost)
+
+def try_acquire(name, cost=1):
+    return get_bucket(name).try_acquire(cost)
+
+def penalize(name, retry_after=None):
+    get_bucket(name).penalize(retry_after)
+
+def parse_retry_after(headers):
+    """Reads a Retry-After header (seconds) from a headers mapping (None if absent/unparseable)."""
+    if not headers:
+        return None
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def is_rate_limit_error(e):
+    """True for 429 / quota style errors from any client library."""
+    status = getattr(e, 'status_code', None) or getattr(e, 'status', None) or getattr(e, 'code', None)
+    if status == 429:
+        return True
+    text = str(e).lower()
+    return '429' in text or 'rate limit' in text or 'too many requests' in text or 'resource_exhausted' in text
@@ -53,8 +53,10 @@ async def main():
             logger.info("Sending Daily Market Pulse...")
             
             # Reusing logic from bot.py market_command but specialized for job
-            fng = market_data.get_fear_and_greed_index()
-            nifty = await market_data.get_market_status()
+            fng, nifty = await asyncio.gather(
+                market_data.get_fear_and_greed_index(),
+                market_data.get_market_status()
+            )
             
             # Reuse logic strictly or duplicate? Duplicating small logic is safer than importing bot.py (circular)
             fng_val = fng.get('value', 0)
@@ -78,14 +80,16 @@ async def main():
             
             # Send to both channels
             if config.TELEGRAM_STOCK_CHANNEL_ID:
-                await bot.send_message(chat_id=config.TELEGRAM_STOCK_CHANNEL_ID, text=msg, parse_mode='Markdown')
+                await telegram_handler.send_message(bot, config.TELEGRAM_STOCK_CHANNEL_ID, msg, parse_mode='Markdown')
             if config.TELEGRAM_CRYPTO_CHANNEL_ID:
-                await bot.send_message(chat_id=config.TELEGRAM_CRYPTO_CHANNEL_ID, text=msg, parse_mode='Markdown')
+                await telegram_handler.send_message(bot, config.TELEGRAM_CRYPTO_CHANNEL_ID, msg, parse_mode='Markdown')
 
         logger.info("Content Job Complete.")
 
     except Exception as e:
         logger.error(f"Error in Content Job: {e}")
+    finally:
+        await market_data.close_http_session()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 async def test_signals():
     print("--- Starting Diagnostic Run ---")
-    exchange = market_data.get_crypto_exchange()
+    exchange = await market_data.init_crypto_exchange()
     if not exchange:
         print("Failed to init exchange")
         return
@@ -30,6 +30,9 @@ async def test_signals():
             # We call analyze_crypto directly. 
             # The modified signals.py should log DEBUG messages explaining rejections.
             print(f"  > Fetching data and analyzing...")
+            # Top up the local candle store so the candle cache starts warm
+            tf_ms = exchange.parse_timeframe(config.CRYPTO_TIMEFRAME) * 1000
+            await market_data.sync_candle_store(symbol, config.CRYPTO_TIMEFRAME, since=exchange.milliseconds() - config.CANDLE_CACHE_SIZE * tf_ms)
             result = await signals.analyze_crypto(exchange, symbol)
             
             if result:
@@ -39,5 +42,11 @@ async def test_signals():
         except Exception as e:
             print(f"Error: {e}")
 
+async def main():
+    try:
+        await test_signals()
+    finally:
+        await market_data.close_crypto_exchange()
+
 if __name__ == "__main__":
-    asyncio.run(test_signals())
+    asyncio.run(main())
@@ -1,24 +1,28 @@
 import logging
 import asyncio
-import pandas as pd
-import pandas_ta as ta
+import numpy as np
 import config
+import indicators
 import market_data
 import utils
 import sheets
+import rate_limiter
+import verdict_cache
+from candle_buffer import as_candle_buffer
 from google import genai
 try:
-    from groq import Groq
+    from groq import AsyncGroq
 except ImportError:
-    Groq = None
+    AsyncGroq = None
 import json
 import os
 
 logger = logging.getLogger(__name__)
 
-# AI Clients (Singletons)
+# AI Clients (Singletons, async so a losing hedged request can really be cancelled)
 _genai_client = None
 _groq_client = None
+_openrouter_client = None
 
 def get_genai_client():
     global _genai_client
@@ -28,21 +32,135 @@ def get_genai_client():
 
 def get_groq_client():
     global _groq_client
-    if _groq_client is None and config.GROQ_API_KEY and Groq:
-        _groq_client = Groq(api_key=config.GROQ_API_KEY)
+    if _groq_client is None and config.GROQ_API_KEY and AsyncGroq:
+        _groq_client = AsyncGroq(api_key=config.GROQ_API_KEY)
     return _groq_client
 
-async def validate_with_ai(symbol, market_type, signal, setup, df, context_summary=None):
+def get_openrouter_client():
+    global _openrouter_client
+    if _openrouter_client is None and config.OPENROUTER_API_KEY:
+        # Standard OpenAI-format API
+        from openai import AsyncOpenAI
+        _openrouter_client = AsyncOpenAI(base_url="https://openrouter.ai/api/v1", api_key=config.OPENROUTER_API_KEY)
+    return _openrouter_client
+
+AI_PROMPT_VERSION = 1 # Bump when the prompt or the models change: cached verdicts are keyed by it
+
+async def validate_with_ai(symbol, market_type, signal, setup, df, context_summary=None, signal_ts=None):
     """
-    Asks AI (Gemini or Groq) to validate the technical signal.
+    Asks AI (Groq, Gemini, OpenRouter; see first_verdict) to validate the technical signal.
+    signal_ts (the signal candle's timestamp) enables the verdict cache: the same signal
+    re-detected on a later scan gets the stored verdict instead of another LLM call.
     """
-    gemini = get_genai_client()
-    groq = get_groq_client()
-    
-    if not gemini and not groq:
+    key = None
+    if config.AI_VERDICT_CACHE_ENABLED and signal_ts is not None:
+        # The "(Candle -i)" suffix shifts as the signal candle ages, the setup itself does not
+        key = verdict_cache.verdict_key(symbol, signal, setup.split(' (')[0], signal_ts, AI_PROMPT_VERSION)
+        cached = verdict_cache.get_verdict_cache().get(key)
+        if cached is not None:
+            logger.info(f"{symbol}: Reusing AI verdict for this {signal} signal ({cached['verdict']})")
+            return dict(cached)
+
+    ai_data = await _ask_ai(symbol, market_type, signal, setup, df, context_summary)
+    if key is not None and ai_data['confidence'] not in ('N/A', 'Error'): # Only real answers
+        verdict_cache.get_verdict_cache().put(key, ai_data)
+    return ai_data
+
+def _parse_verdict(text, tag):
+    data = json.loads(text)
+    return {
+        'confidence': f"{data.get('confidence', 0)}% ({tag})",
+        'reasoning': data.get('reasoning', 'No reasoning'),
+        'verdict': data.get('verdict', 'APPROVED')
+    }
+
+async def _ask_groq(prompt):
+    await rate_limiter.acquire('groq')
+    chat_completion = await get_groq_client().chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model="llama-3.3-70b-versatile",
+        response_format={"type": "json_object"}
+    )
+    return _parse_verdict(chat_completion.choices[0].message.content, 'Q')
+
+async def _ask_gemini(prompt):
+    await rate_limiter.acquire('gemini')
+    response = await get_genai_client().aio.models.generate_content(
+        model='gemini-flash-latest',
+        contents=prompt
+    )
+    raw_text = response.text.replace('```json', '').replace('```', '').strip()
+    return _parse_verdict(raw_text, 'G')
+
+async def _ask_openrouter(prompt):
+    await rate_limiter.acquire('openrouter')
+    completion = await get_openrouter_client().chat.completions.create(
+        model="deepseek/deepseek-r1-distill-llama-70b", # Cost effective, high IQ
+        messages=[{"role": "user", "content": prompt}],
+        extra_headers={
+           "HTTP-Referer": "https://github.com/crypto-scalp-bot",
+           "X-Title": "CryptoScalpBot"
+         },
+        response_format={"type": "json_object"}
+    )
+    return _parse_verdict(completion.choices[0].message.content, 'OR')
+
+# Priority order: Groq (better reliability/higher limits), Gemini, OpenRouter (final fallback)
+AI_PROVIDERS = [
+    ('groq', 'Groq', get_groq_client, _ask_groq),
+    ('gemini', 'Gemini', get_genai_client, _ask_gemini),
+    ('openrouter', 'OpenRouter', get_openrouter_client, _ask_openrouter),
+]
+
+async def _try_provider(bucket, name, ask, prompt):
+    """One provider call; None (logged, rate limit fed back) on failure."""
+    try:
+        return await ask(prompt)
+    except Exception as e:
+        if rate_limiter.is_rate_limit_error(e):
+            rate_limiter.penalize(bucket, rate_limiter.parse_retry_after(getattr(getattr(e, 'response', None), 'headers', None)))
+        logger.warning(f"{name} validation failed: {e}")
+        return None
+
+async def first_verdict(providers, prompt, hedge_delay, budget):
+    """
+    Asks providers [(bucket, name, ask)] in order and returns the first verdict (None if all fail
+    or the budget runs out). The next provider is started as soon as one fails, or hedged in
+    parallel after hedge_delay seconds without an answer (None = only on failure, i.e. strictly
+    one after another). Requests still running once a verdict arrives are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    queue = list(providers)
+    running = {asyncio.create_task(_try_provider(*queue.pop(0), prompt))} if queue else set()
+    try:
+        while running:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(f"AI validation exceeded its {budget}s budget")
+                return None
+            wait = remaining if hedge_delay is None or not queue else min(hedge_delay, remaining)
+            done, running = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result() is not None:
+                    return task.result()
+            # A provider failed, or none answered within the hedge delay: bring in the next one
+            if queue and (done or hedge_delay is not None) and loop.time() < deadline:
+                bucket, name, ask = queue.pop(0)
+                if not done:
+                    logger.info(f"No AI verdict after {hedge_delay}s, hedging with {name}")
+                running.add(asyncio.create_task(_try_provider(bucket, name, ask, prompt)))
+        return None
+    finally:
+        for task in running:
+            task.cancel()
+
+async def _ask_ai(symbol, market_type, signal, setup, df, context_summary):
+    """validate_with_ai without the cache: first verdict from the providers, APPROVED if all fail."""
+    providers = [(bucket, name, ask) for bucket, name, client, ask in AI_PROVIDERS if client()]
+    if not providers:
         return {'confidence': 'N/A', 'reasoning': 'AI Keys missing', 'verdict': 'APPROVED'}
 
-    # Technical Context
     # Technical Context
     if df is not None:
         recent_data = df.tail(5).to_string()
@@ -63,109 +181,127 @@ async def validate_with_ai(symbol, market_type, signal, setup, df, context_summa
         f"- verdict (APPROVED or REJECTED)"
     )
 
-    # 1. Try Groq (Primary Fallback for better reliability/higher limits)
-    if groq:
-        try:
-            chat_completion = await asyncio.to_thread(
-                groq.chat.completions.create,
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-                response_format={"type": "json_object"}
-            )
-            data = json.loads(chat_completion.choices[0].message.content)
-            return {
-                'confidence': f"{data.get('confidence', 0)}% (Q)",
-                'reasoning': data.get('reasoning', 'No reasoning'),
-                'verdict': data.get('verdict', 'APPROVED')
-            }
-        except Exception as e:
-            logger.warning(f"Groq validation failed: {e}")
-
-    # 2. Try Gemini
-    if gemini:
-        try:
-            response = await asyncio.to_thread(
-                gemini.models.generate_content,
-                model='gemini-flash-latest',
-                contents=prompt
-            )
-            raw_text = response.text.replace('```json', '').replace('```', '').strip()
-            data = json.loads(raw_text)
-            return {
-                'confidence': f"{data.get('confidence', 0)}% (G)",
-                'reasoning': data.get('reasoning', 'No reasoning'),
-                'verdict': data.get('verdict', 'APPROVED')
-            }
-        except Exception as e:
-            logger.warning(f"Gemini validation failed: {e}")
-
-    # 3. Try OpenRouter (Final Fallback)
-    openrouter_key = config.OPENROUTER_API_KEY
-    if openrouter_key:
-        try:
-             # Standard OpenAI-format call
-            from openai import OpenAI
-            client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=openrouter_key,
-            )
-            completion = await asyncio.to_thread(
-                client.chat.completions.create,
-                model="deepseek/deepseek-r1-distill-llama-70b", # Cost effective, high IQ
-                messages=[{"role": "user", "content": prompt}],
-                extra_headers={
-                   "HTTP-Referer": "https://github.com/crypto-scalp-bot", 
-                   "X-Title": "CryptoScalpBot"
-                 },
-                response_format={"type": "json_object"}
-            )
-            data = json.loads(completion.choices[0].message.content)
-            return {
-                'confidence': f"{data.get('confidence', 0)}% (OR)",
-                'reasoning': data.get('reasoning', 'No reasoning'),
-                'verdict': data.get('verdict', 'APPROVED')
-            }
-        except Exception as e:
-            logger.warning(f"OpenRouter validation failed: {e}")
+    hedge_delay = config.AI_HEDGE_DELAY if config.AI_HEDGED_REQUESTS else None
+    verdict = await first_verdict(providers, prompt, hedge_delay, config.AI_LATENCY_BUDGET)
+    if verdict is not None:
+        return verdict
 
     # Fallback after all fail
     return {'confidence': 'Error', 'reasoning': 'AI Unresponsive', 'verdict': 'APPROVED'}
 
 
+# --- Evaluation Memo ---
+# A closed bar only needs evaluating once: with a 120 s scan and 5m candles the same bar
+# used to be analysed 2-3 times. Live analysis only looks at closed bars (a still-forming
+# last bar is dropped first), and the indicator vector and signal decision are kept per
+# (symbol, timeframe) under the timestamp of the last closed bar in the data. A repeat
+# evaluation of that bar returns the memoized decision; a signal comes back marked
+# memoized=True, so the scans do not dispatch it a second time.
+# Live scans only (backtests replay history and bypass it).
+_MEMO_SETTINGS = (
+    'CRYPTO_TIMEFRAME', 'CRYPTO_HTF_TIMEFRAME', 'CRYPTO_CANDLE_LIMIT', 'RSI_PERIOD', 'RSI_OVERSOLD',
+    'RSI_OVERBOUGHT', 'REQUIRE_VOLUME_SPIKE', 'CRYPTO_STOP_LOSS', 'CRYPTO_TAKE_PROFIT',
+    'STOCK_TIMEFRAME', 'EMA_FAST', 'EMA_SLOW', 'EMA_CROSS_THRESHOLD', 'ADX_MIN', 'ADX_MAX',
+    'RSI_MIN', 'RSI_MAX', 'STOCK_STOP_LOSS',
+)
+_evaluation_memo = {} # (symbol, timeframe) -> (key, {'indicators': ..., 'signal': ...})
+
+def config_hash():
+    """Hash of the settings that change indicator values or signal rules."""
+    return hash(tuple(repr(getattr(config, name, None)) for name in _MEMO_SETTINGS))
+
+def evaluation_key(symbol, timeframe, closed_ts):
+    """(symbol, timeframe, open timestamp of the last closed candle analysed, config hash)."""
+    return (symbol, timeframe, closed_ts, config_hash())
+
+def is_evaluated(symbol, timeframe, now_ms=None):
+    """
+    True when the memo already holds the last bar the clock says has closed, so a scan can skip
+    fetching the symbol. A shortcut only: analyze_* key the memo on the bars they actually get.
+    """
+    closed_ts = market_data.last_closed_candle_ts(timeframe, now_ms, market_data.session_day_offset(symbol))
+    return get_memoized(evaluation_key(symbol, timeframe, closed_ts)) is not None
+
+def get_memoized(key):
+    """The memoized {'indicators', 'signal'} entry for an evaluation key (None on a miss)."""
+    entry = _evaluation_memo.get(key[:2])
+    return entry[1] if entry is not None and entry[0] == key else None
+
+def memoize(key, indicators, signal):
+    # One entry per (symbol, timeframe): a new bar replaces the previous one
+    _evaluation_memo[key[:2]] = (key, {'indicators': indicators, 'signal': signal})
+
+def clear_evaluation_memo():
+    _evaluation_memo.clear()
+
+def _replay(entry, symbol):
+    """The memoized decision for a bar evaluated before (signals marked memoized=True)."""
+    logger.debug(f"{symbol}: Bar already evaluated, using memoized result")
+    signal = entry['signal']
+    return None if signal is None else dict(signal, memoized=True)
+
 async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=None):
     """
-    Analyzes a crypto symbol for RSI scalping signals.
-    Uses config.CRYPTO_TIMEFRAME for execution (e.g., 5m) and 15m for Trend.
-    ZERO-PANDAS IMPLEMENTATION (List/NumPy only).
+    Analyzes a crypto symbol for RSI scalping signals (memoized per closed bar in live mode).
+    Uses config.CRYPTO_TIMEFRAME for execution (e.g., 5m) and config.CRYPTO_HTF_TIMEFRAME (15m) for Trend.
+    HTF candles are resampled from the execution candles unless passed in.
+    Live mode drops a still-forming last bar; a bar that was already evaluated returns the memoized result.
     """
-    # 1. Fetch Execution Data (e.g. 5m)
+    if exchange is None: # Backtest
+        return await _analyze_crypto(exchange, symbol, raw_candles, raw_htf_candles, {})
+
+    # 1. Fetch Execution Data (e.g. 5m) - full cached window so HTF bars can be derived from it
     if raw_candles is None:
-        raw_candles = await market_data.fetch_crypto_candles_raw(exchange, symbol, timeframe=config.CRYPTO_TIMEFRAME)
-    if not raw_candles or len(raw_candles) < 50: 
-        logger.debug(f"{symbol}: Not enough execution data ({len(raw_candles) if raw_candles else 0})")
+        raw_candles = await market_data.fetch_crypto_candles(exchange, symbol, timeframe=config.CRYPTO_TIMEFRAME)
+        if not market_data.is_series_healthy(symbol, config.CRYPTO_TIMEFRAME):
+            logger.debug(f"{symbol}: Skipped, candle series has unfilled gaps")
+            return None
+    candles = market_data.closed_candles(symbol, config.CRYPTO_TIMEFRAME, raw_candles)
+    if candles is None or len(candles) == 0:
         return None
 
-    # 2. Fetch HTF Data (Trend Filter - 15m)
+    key = evaluation_key(symbol, config.CRYPTO_TIMEFRAME, candles.last_timestamp)
+    cached = get_memoized(key)
+    if cached is not None:
+        return _replay(cached, symbol)
+
+    vector = {}
+    signal = await _analyze_crypto(exchange, symbol, candles, raw_htf_candles, vector)
+    if vector: # Only when the indicators were actually computed (not on short history)
+        memoize(key, vector, signal)
+    return signal
+
+async def _analyze_crypto(exchange, symbol, raw_candles, raw_htf_candles, vector):
+    """
+    analyze_crypto without the fetch and the memo. Fills `vector` with the indicator values once computed.
+    ZERO-PANDAS IMPLEMENTATION (List/NumPy only).
+    """
+    candles = as_candle_buffer(raw_candles)
+    if candles is None or len(candles) < 50: 
+        logger.debug(f"{symbol}: Not enough execution data ({len(candles) if candles is not None else 0})")
+        return None
+
+    # 2. Derive HTF Data (Trend Filter - 15m) locally, no second round trip
     if raw_htf_candles is None:
-        # If execution is 5m, use 15m for trend. If execution is 1m, maybe 5m.
-        # Hardcoding 15m as 'HTF' for the 5m Strategy (Option C).
-        htf_frame = '15m'
-        raw_htf_candles = await market_data.fetch_crypto_candles_raw(exchange, symbol, timeframe=htf_frame)
-    if not raw_htf_candles or len(raw_htf_candles) < 50: 
-        logger.debug(f"{symbol}: Not enough HTF data ({len(raw_htf_candles) if raw_htf_candles else 0})")
+        htf_candles = market_data.resample_candles(candles, config.CRYPTO_HTF_TIMEFRAME, config.CRYPTO_TIMEFRAME)
+    else:
+        htf_candles = as_candle_buffer(raw_htf_candles)
+    if htf_candles is None or len(htf_candles) < 50: 
+        logger.debug(f"{symbol}: Not enough HTF data ({len(htf_candles) if htf_candles is not None else 0})")
         return None
 
-    # Extract Lists
+    # Column Views (Zero-Copy NumPy slices of the candle buffers)
+    limit = config.CRYPTO_CANDLE_LIMIT
     
     # Execution Data
-    closes = [x[4] for x in raw_candles]
-    vols = [x[5] for x in raw_candles]
+    closes = candles.close[-limit:]
+    vols = candles.volume[-limit:]
     
     # HTF Data
-    highs_htf = [x[2] for x in raw_htf_candles]
-    lows_htf = [x[3] for x in raw_htf_candles]
-    closes_htf = [x[4] for x in raw_htf_candles]
-    vols_htf = [x[5] for x in raw_htf_candles]
+    highs_htf = htf_candles.high[-limit:]
+    lows_htf = htf_candles.low[-limit:]
+    closes_htf = htf_candles.close[-limit:]
+    vols_htf = htf_candles.volume[-limit:]
 
     # --- Indicators ---
     
@@ -174,23 +310,32 @@ async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=Non
     rsi_series = utils.calculate_rsi_series(closes, period=config.RSI_PERIOD) # For lookback
     
     # Vol Spike
-    vol_curr = vols[-1]
-    vol_ma_20 = utils.calculate_sma(vols, period=20)
+    vol_curr = float(vols[-1])
+    vol_ma = utils.calculate_sma_series(vols, period=20) # Whole window once (prefix sums); the lookback indexes it
 
     # HTF Indicators (Trend)
     ema_20_htf = utils.calculate_ema(closes_htf, period=20)
     ema_50_htf = utils.calculate_ema(closes_htf, period=50)
-    vwap_htf = utils.calculate_vwap(highs_htf, lows_htf, closes_htf, vols_htf)
+    # Session VWAP (anchored to the UTC day, not to wherever the loaded window starts)
+    vwap_htf = utils.calculate_vwap(
+        highs_htf, lows_htf, closes_htf, vols_htf,
+        timestamps=htf_candles.timestamp[-limit:], anchor_offset_ms=market_data.vwap_anchor_offset(symbol)
+    )
     
     # Current Close
     close_curr = closes[-1]
     
     # --- HTF TREND & CONFIRMATION FILTER ---
     if ema_20_htf is None or ema_50_htf is None: return None
+    vector.update(close=float(close_curr), rsi=float(rsi_series[-1]), ema_20_htf=ema_20_htf, ema_50_htf=ema_50_htf, vwap_htf=vwap_htf)
     
     trend_htf = 'BULLISH' if ema_20_htf > ema_50_htf else 'BEARISH'
     
-    # VWAP Filter (Using Latest)
+    # VWAP Filter (Using Latest). No volume in the session yet (NaN) means no VWAP side and no setup,
+    # the same rule screen_crypto applies (every comparison with NaN is False there)
+    if np.isnan(vwap_htf):
+        logger.debug(f"{symbol}: No HTF session volume yet, VWAP undefined")
+        return None
     price_vs_vwap = 'ABOVE' if close_curr > vwap_htf else 'BELOW'
     
     rsi_curr = rsi_series[-1]
@@ -209,12 +354,12 @@ async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=Non
         r_prev = rsi_series[idx_prev]
         
         v_c = vols[idx_curr]
-        v_ma_val = utils.calculate_sma(vols[:idx_curr], period=20)
+        v_ma_val = vol_ma[idx_prev] # Average of the 20 candles before this one (NaN if not enough history)
         
         # Check volume spike only if required by config
         v_spike = True
         if config.REQUIRE_VOLUME_SPIKE:
-            v_spike = v_c > v_ma_val if v_ma_val else False
+            v_spike = v_c > v_ma_val if v_ma_val > 0 else False
         
         # Determine specific signal time logic
         # LONG
@@ -222,7 +367,8 @@ async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=Non
             if r_prev < config.RSI_OVERSOLD and r_curr >= config.RSI_OVERSOLD:
                 signal = 'LONG'
                 setup_type = f'RSI_Reversal_VWAP_Trend (Candle -{i})'
-                entry_price = closes[idx_curr]
+                signal_ts = int(candles.timestamp[idx_curr])
+                entry_price = float(closes[idx_curr])
                 stop_loss = entry_price * (1 - config.CRYPTO_STOP_LOSS)
                 take_profit = entry_price * (1 + config.CRYPTO_TAKE_PROFIT)
                 valid_signal_found = True
@@ -236,7 +382,8 @@ async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=Non
             if r_prev > config.RSI_OVERBOUGHT and r_curr <= config.RSI_OVERBOUGHT:
                 signal = 'SHORT'
                 setup_type = f'RSI_Reversal_VWAP_Trend (Candle -{i})'
-                entry_price = closes[idx_curr]
+                signal_ts = int(candles.timestamp[idx_curr])
+                entry_price = float(closes[idx_curr])
                 stop_loss = entry_price * (1 + config.CRYPTO_STOP_LOSS)
                 take_profit = entry_price * (1 - config.CRYPTO_TAKE_PROFIT)
                 valid_signal_found = True
@@ -276,9 +423,9 @@ async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=Non
         # Let's mock a simple dict for context.
         
         # Simple context string
-        context_str = f"Last 5 Candles (Close): {closes[-5:]} | RSI(14): {rsi_curr:.2f} | Trend: {trend_htf} | VWAP: {price_vs_vwap} | Volume Spike: {v_spike}"
+        context_str = f"Last 5 Candles (Close): {closes[-5:].tolist()} | RSI(14): {rsi_curr:.2f} | Trend: {trend_htf} | VWAP: {price_vs_vwap} | Volume Spike: {v_spike}"
         
-        ai_data = await validate_with_ai(symbol, 'CRYPTO', signal, setup_type, None, context_summary=context_str) # Passing Context String
+        ai_data = await validate_with_ai(symbol, 'CRYPTO', signal, setup_type, None, context_summary=context_str, signal_ts=signal_ts) # Passing Context String
         
         if ai_data.get('verdict') == 'REJECTED':
             logger.info(f"🚫 AI Rejected Signal for {symbol}: {ai_data['reasoning']}")
@@ -303,53 +450,151 @@ async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=Non
     
     return None
 
-async def analyze_stock(symbol, df=None):
+def crypto_indicator_table(candles_by_symbol):
+    """
+    Batched indicators for a whole crypto universe.
+    Stacks the analysis windows analyze_crypto uses (last CRYPTO_CANDLE_LIMIT execution and HTF
+    bars) into symbols x candles arrays and computes RSI, volume MA, HTF EMA 20/50 and VWAP
+    for all pairs in single vectorized calls.
+    Returns: (table, rest). table is {column: array} with one row per symbol (None if no pair has
+    a full window); rest lists symbols with shorter history, to be analyzed one by one.
+    """
+    limit = config.CRYPTO_CANDLE_LIMIT
+    rows, rest = [], []
+    for symbol, candles in candles_by_symbol.items():
+        candles = as_candle_buffer(candles)
+        htf = market_data.resample_candles(candles, config.CRYPTO_HTF_TIMEFRAME, config.CRYPTO_TIMEFRAME)
+        if len(candles) >= limit and len(htf) >= limit:
+            rows.append((symbol, candles, htf))
+        else:
+            rest.append(symbol)
+    if not rows:
+        return None, rest
+
+    def stack(name, htf=False):
+        return np.stack([getattr(h if htf else c, name)[-limit:] for _, c, h in rows])
+
+    closes = stack('close')
+    vols = stack('volume')
+    closes_htf = stack('close', htf=True)
+    vwap_htf = indicators.vwap_series(
+        stack('high', htf=True), stack('low', htf=True), closes_htf, stack('volume', htf=True),
+        timestamps=stack('timestamp', htf=True),
+        anchor_offset_ms=np.array([[market_data.vwap_anchor_offset(symbol)] for symbol, _, _ in rows])
+    )
+    table = {
+        'symbol': np.array([symbol for symbol, _, _ in rows]),
+        'close': closes[:, -1],
+        'volume': vols,
+        'rsi': indicators.rsi_series(closes, config.RSI_PERIOD),
+        'vol_ma': indicators.sma_series(vols, 20),
+        'ema_20_htf': indicators.ema_series(closes_htf, 20)[:, -1],
+        'ema_50_htf': indicators.ema_series(closes_htf, 50)[:, -1],
+        'vwap_htf': vwap_htf[:, -1],
+    }
+    return table, rest
+
+def screen_crypto(table, lookback=10):
     """
-    Analyzes a stock symbol with STRICT 5-Shield Logic.
-    Accepts optional DataFrame for backtesting.
+    Boolean mask over table['symbol']: True where analyze_crypto's rules (HTF trend, VWAP side,
+    volume spike, RSI cross) fire on one of the last `lookback` candles.
+    Only these pairs need the full analyze_crypto pass (and its AI validation).
     """
-    is_backtest = df is not None
+    bullish = (table['ema_20_htf'] > table['ema_50_htf']) & (table['close'] > table['vwap_htf'])
+    bearish = (table['ema_20_htf'] <= table['ema_50_htf']) & (table['close'] <= table['vwap_htf'])
+    rsi, vols, vol_ma = table['rsi'], table['volume'], table['vol_ma']
+
+    mask = np.zeros(len(table['symbol']), dtype=bool)
+    for i in range(1, min(lookback, rsi.shape[1] - 1) + 1):
+        r_curr, r_prev = rsi[:, -i], rsi[:, -(i + 1)]
+        v_spike = vols[:, -i] > vol_ma[:, -(i + 1)] if config.REQUIRE_VOLUME_SPIKE else True
+        long_cross = (r_prev < config.RSI_OVERSOLD) & (r_curr >= config.RSI_OVERSOLD)
+        short_cross = (r_prev > config.RSI_OVERBOUGHT) & (r_curr <= config.RSI_OVERBOUGHT)
+        mask |= v_spike & ((bullish & long_cross) | (bearish & short_cross))
+    return mask
+
+async def daily_trend_ok(symbol):
+    """
+    Daily trend filter for the stock scan: True when the last daily close is above its
+    EMA(STOCK_DAILY_TREND_EMA). Daily bars come from NSE (Yahoo as fallback) and are cached
+    per IST day, so this costs one request per symbol and day. Missing history does not block.
+    """
+    if not config.STOCK_DAILY_TREND_FILTER:
+        return True
+    df = await market_data.fetch_stock_data(symbol, timeframe='1d', period=f"{config.STOCK_DAILY_HISTORY_DAYS}d")
+    if df is None or len(df) < config.STOCK_DAILY_TREND_EMA:
+        logger.debug(f"{symbol}: Not enough daily history for the trend filter ({0 if df is None else len(df)})")
+        return True
+    closes = df['close'].to_numpy(dtype=np.float64)
+    return bool(closes[-1] > utils.calculate_ema(closes, period=config.STOCK_DAILY_TREND_EMA))
+
+async def analyze_stock(symbol, df=None, is_backtest=None):
+    """
+    Analyzes a stock symbol with STRICT 5-Shield Logic (memoized per closed bar in live mode).
+    Accepts optional DataFrame (backtesting, or prefetched by a batched scan with is_backtest=False).
+    Live mode drops a still-forming last bar; a bar that was already evaluated returns the memoized result.
+    """
+    if is_backtest is None:
+        is_backtest = df is not None
+    if is_backtest:
+        return await _analyze_stock(symbol, df, is_backtest, {})
 
     if df is None:
         df = await market_data.fetch_stock_data(symbol)
     if df is None or df.empty: return None
+    if not market_data.is_series_healthy(symbol, config.STOCK_TIMEFRAME):
+        logger.debug(f"{symbol}: Skipped, candle series has unfilled gaps")
+        return None
+    df = market_data.closed_frame(symbol, config.STOCK_TIMEFRAME, df)
+    if df.empty: return None
+
+    key = evaluation_key(symbol, config.STOCK_TIMEFRAME, market_data.last_frame_timestamp(df))
+    cached = get_memoized(key)
+    if cached is not None:
+        return _replay(cached, symbol)
+
+    vector = {}
+    signal = await _analyze_stock(symbol, df, is_backtest, vector)
+    if vector:
+        memoize(key, vector, signal)
+    return signal
+
+async def _analyze_stock(symbol, df, is_backtest, vector):
+    """analyze_stock without the fetch and the memo. Fills `vector` with the latest indicator values once computed."""
+    if df is None or df.empty: return None
         
-    df = market_data.calculate_indicators_stock(df)
-    
     # Need enough data for checks
     if len(df) < 20: return None
-        
-    # Lookback loop for Stocks (Check last 4 candles)
-    if len(df) < 5: return None
+
+    # Only the last 5 candles are needed below (4 candidates + prev)
+    ind = market_data.calculate_indicators_stock(df, tail=5)
+    if ind is None: return None
+    vector.update({name: float(values[-1]) for name, values in ind.items()})
     
     signal = None
     
     for i in range(1, 5):
         # Index -i is Candidate, -(i+1) is Prev
-        curr = df.iloc[-i]
-        prev = df.iloc[-(i+1)]
-        
-        close_price = curr['close']
+        close_price = ind['close'][-i]
         
         # Extract Indicators for this candle
-        ema_fast = curr.get('ema_fast')
-        ema_slow = curr.get('ema_slow')
-        ema_trend = curr.get('ema_trend')
-        ema_slope = curr.get('ema_trend_slope', 0)
-        adx = curr.get('adx', 0)
-        adx_prev = prev.get('adx', 0)
+        ema_fast = ind['ema_fast'][-i]
+        ema_slow = ind['ema_slow'][-i]
+        ema_trend = ind['ema_trend'][-i]
+        ema_slope = ind['ema_trend_slope'][-i]
+        adx = ind['adx'][-i]
+        adx_prev = ind['adx'][-(i+1)]
         
-        rsi = curr.get('rsi')
-        vol_curr = curr.get('volume')
-        vol_avg = curr.get('vol_avg')
-        vol_prev = prev.get('volume')
+        rsi = ind['rsi'][-i]
+        vol_curr = ind['volume'][-i]
+        vol_avg = ind['vol_avg'][-i]
+        vol_prev = ind['volume'][-(i+1)]
         
-        vals_to_check = [ema_fast, ema_slow, ema_trend, rsi, vol_curr, vol_avg]
-        if any(v is None or (isinstance(v, float) and pd.isna(v)) for v in vals_to_check):
+        if np.isnan([ema_fast, ema_slow, ema_trend, rsi, vol_curr, vol_avg]).any():
             continue
 
         # SHIELD 1: Momentum Signal (Primary)
-        cross_signal = (ema_fast > ema_slow) and (prev['ema_fast'] <= prev['ema_slow'])
+        cross_signal = (ema_fast > ema_slow) and (ind['ema_fast'][-(i+1)] <= ind['ema_slow'][-(i+1)])
         separation = (ema_fast - ema_slow) / close_price
         has_separation = separation >= config.EMA_CROSS_THRESHOLD
         closes_above_emas = (close_price > ema_fast) and (close_price > ema_slow)
@@ -363,7 +608,8 @@ async def analyze_stock(symbol, df=None):
             if trend_ok and strength_ok and momentum_ok and volume_ok:
                 signal = 'LONG'
                 setup_type = f'5-Shield Sniper (Candle -{i})'
-                entry_price = close_price
+                signal_ts = str(df['timestamp'].iloc[-i] if 'timestamp' in df.columns else df.index[-i])
+                entry_price = float(close_price)
                 sl_ema = ema_slow * (1 - 0.0005)
                 sl_fixed = entry_price * (1 - config.STOCK_STOP_LOSS)
                 stop_loss = max(sl_ema, sl_fixed)
@@ -396,8 +642,14 @@ async def analyze_stock(symbol, df=None):
                 'df': None
             }
 
-        # AI Validation
-        ai_data = await validate_with_ai(symbol, 'STOCK', signal, setup_type, df)
+        # AI Validation (compact context string instead of the DataFrame)
+        context_str = (
+            f"Last 5 Candles (Close): {ind['close'].round(2).tolist()} | "
+            f"EMA {config.EMA_FAST}/{config.EMA_SLOW}: {ind['ema_fast'][-1]:.2f}/{ind['ema_slow'][-1]:.2f} | "
+            f"EMA 50: {ind['ema_trend'][-1]:.2f} | RSI(14): {ind['rsi'][-1]:.2f} | ADX: {ind['adx'][-1]:.2f} | "
+            f"Volume: {ind['volume'][-1]:.0f} (20-avg {ind['vol_avg'][-1]:.0f})"
+        )
+        ai_data = await validate_with_ai(symbol, 'STOCK', signal, setup_type, None, context_summary=context_str, signal_ts=signal_ts)
         
         if ai_data.get('verdict') == 'REJECTED':
             logger.info(f"🚫 AI Rejected Signal for {symbol}: {ai_data['reasoning']}")
@@ -420,10 +672,10 @@ async def analyze_stock(symbol, df=None):
         sheets.log_signal(signal_data)
         
         # Explicit cleanup
-        del df
+        del df, ind
         
         return signal_data
 
     # Cleanup if no signal
-    del df
+    del df, ind
     return None
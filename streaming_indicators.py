@@ -0,0 +1,217 @@
+import math
+from abc import ABC, abstractmethod
+
+# --- Streaming (Incremental) Indicators ---
+# Stateful counterparts of the indicators.py kernels: each closed candle updates the
+# state in O(1), so a scan does not recompute a whole window when one bar changed.
+# The still-forming bar is applied with update(..., closed=False): it is evaluated against
+# the last CLOSED state and never stored, so the next tick simply re-applies it and
+# rollback() drops it. Values match the full-series kernels bar for bar (None in warmup).
+
+class StreamingIndicator(ABC):
+    """Base class: subclasses set the initial self.state and define _step(state, *bar)."""
+
+    def __init__(self):
+        self.state = None # State as of the last closed bar
+        self.current = None # State including the forming bar
+        self.value = None # Latest value (includes the forming bar)
+        self.closed_value = None # Value as of the last closed bar
+
+    @abstractmethod
+    def _step(self, state, *bar):
+        """Returns (new_state, value) for one bar without modifying `state`."""
+
+    def _commit(self, state, *bar):
+        self.state = state
+
+    def update(self, *bar, closed=True):
+        """Applies one candle. closed=False evaluates the forming bar without committing it."""
+        state, value = self._step(self.state, *bar)
+        if closed:
+            self._commit(state, *bar)
+            self.closed_value = value
+            state = self.state
+        self.current = state
+        self.value = value
+        return value
+
+    def update_many(self, *columns):
+        """Warms up from closed-candle columns (e.g. CandleBuffer views). Returns the last value."""
+        for bar in zip(*columns):
+            self.update(*bar)
+        return self.value
+
+    def rollback(self):
+        """Drops the forming bar: value goes back to the last closed bar."""
+        self.current = self.state
+        self.value = self.closed_value
+        return self.value
+
+def _ewm(prev, x, alpha):
+    return x if prev is None else prev + alpha * (x - prev)
+
+class EMA(StreamingIndicator):
+    """EMA seeded with the SMA of the first `length` values (same as indicators.ema_series)."""
+
+    def __init__(self, length):
+        super().__init__()
+        self.length = length
+        self.state = self.current = {'count': 0, 'seed_sum': 0.0, 'ema': None}
+
+    def _step(self, state, x):
+        count = state['count'] + 1
+        seed_sum, ema = state['seed_sum'], state['ema']
+        if count < self.length:
+            seed_sum += x
+        elif count == self.length:
+            ema = (seed_sum + x) / self.length
+        else:
+            ema = ema + 2.0 / (self.length + 1) * (x - ema)
+        return {'count': count, 'seed_sum': seed_sum, 'ema': ema}, ema
+
+class RSI(StreamingIndicator):
+    """Wilder RSI (same as indicators.rsi_series). None until two closes (or while flat)."""
+
+    def __init__(self, length=14):
+        super().__init__()
+        self.length = length
+        self.state = self.current = {'prev': None, 'avg_gain': None, 'avg_loss': None}
+
+    def _step(self, state, x):
+        prev = state['prev']
+        if prev is None:
+            return {'prev': x, 'avg_gain': None, 'avg_loss': None}, None
+        delta = x - prev
+        alpha = 1.0 / self.length
+        avg_gain = _ewm(state['avg_gain'], max(delta, 0.0), alpha)
+        avg_loss = _ewm(state['avg_loss'], max(-delta, 0.0), alpha)
+        total = avg_gain + avg_loss
+        value = 100 * avg_gain / total if total > 0 else None
+        return {'prev': x, 'avg_gain': avg_gain, 'avg_loss': avg_loss}, value
+
+class SMA(StreamingIndicator):
+    """
+    Rolling mean over `length` values: a ring buffer plus a running total.
+    The total is re-summed every time the ring wraps, so float drift cannot build up.
+    """
+
+    def __init__(self, length):
+        super().__init__()
+        self.length = length
+        self.state = self.current = {'window': [0.0] * length, 'pos': 0, 'count': 0, 'total': 0.0}
+
+    def _step(self, state, x):
+        pos, count = state['pos'], state['count']
+        old = state['window'][pos] if count >= self.length else 0.0
+        total = state['total'] - old + x
+        count = min(count + 1, self.length)
+        value = total / self.length if count == self.length else None
+        # The window itself is only written on commit (it is shared with the closed state)
+        return {'window': state['window'], 'pos': pos, 'count': count, 'total': total}, value
+
+    def _commit(self, state, x):
+        window = state['window']
+        pos = state['pos']
+        window[pos] = x
+        pos = (pos + 1) % self.length
+        total = math.fsum(window) if pos == 0 else state['total']
+        self.state = {'window': window, 'pos': pos, 'count': state['count'], 'total': total}
+
+class VWAP(StreamingIndicator):
+    """
+    Volume weighted average of the typical price (h + l + c) / 3, from running sums.
+    session_ms=None accumulates forever; otherwise the sums reset whenever
+    (timestamp + day_offset_ms) // session_ms changes (86400000 with
+    market_data.vwap_anchor_offset(symbol): UTC day for crypto, 09:15 IST for NSE).
+    window=N keeps a rolling N-bar VWAP instead (same as indicators.vwap_series(window=N)).
+    update(timestamp, high, low, close, volume)
+    """
+
+    def __init__(self, session_ms=None, day_offset_ms=0, window=None):
+        super().__init__()
+        self.session_ms = session_ms
+        self.day_offset_ms = day_offset_ms
+        self.window = window
+        self.state = self.current = {'session': None, 'pv': 0.0, 'volume': 0.0}
+        if window:
+            self.state.update(ring=[[0.0, 0.0]] * window, pos=0, count=0)
+
+    def _step(self, state, timestamp, high, low, close, volume):
+        bar_pv = (high + low + close) / 3 * volume
+        if self.window:
+            # Rolling: drop the bar leaving the window (the ring is only written on commit, like SMA)
+            old_pv, old_vol = state['ring'][state['pos']] if state['count'] >= self.window else (0.0, 0.0)
+            pv, vol = state['pv'] - old_pv + bar_pv, state['volume'] - old_vol + volume
+            count = min(state['count'] + 1, self.window)
+            value = pv / vol if count == self.window and vol > 0 else None
+            return dict(state, pv=pv, volume=vol, count=count), value
+
+        session = (int(timestamp) + self.day_offset_ms) // self.session_ms if self.session_ms else 0
+        pv, vol = (state['pv'], state['volume']) if session == state['session'] else (0.0, 0.0)
+        pv += bar_pv
+        vol += volume
+        value = pv / vol if vol > 0 else None
+        return {'session': session, 'pv': pv, 'volume': vol}, value
+
+    def _commit(self, state, timestamp, high, low, close, volume):
+        if not self.window:
+            self.state = state
+            return
+        ring = state['ring']
+        pos = state['pos']
+        ring[pos] = [(high + low + close) / 3 * volume, volume]
+        pos = (pos + 1) % self.window
+        if pos == 0: # Re-sum once per lap so float drift cannot build up
+            state = dict(state, pv=math.fsum(r[0] for r in ring), volume=math.fsum(r[1] for r in ring))
+        self.state = dict(state, ring=ring, pos=pos)
+
+class ADX(StreamingIndicator):
+    """
+    Average Directional Index (same as indicators.adx_series).
+    update(high, low, close); plus_di / minus_di of the latest bar are in self.di.
+    """
+
+    def __init__(self, length=14):
+        super().__init__()
+        self.length = length
+        self.state = self.current = {
+            'count': 0, 'prev': None, 'tr_sum': 0.0, 'atr': None,
+            'pos': None, 'neg': None, 'plus_di': None, 'minus_di': None, 'adx': None,
+        }
+
+    def _step(self, state, high, low, close):
+        new = dict(state, count=state['count'] + 1, prev=[high, low, close])
+        if state['prev'] is None:
+            return new, None
+        prev_high, prev_low, prev_close = state['prev']
+        alpha = 1.0 / self.length
+
+        # 1. Directional movement (Wilder RMA, from the first change)
+        up, dn = high - prev_high, prev_low - low
+        new['pos'] = _ewm(state['pos'], up if up > dn and up > 0 else 0.0, alpha)
+        new['neg'] = _ewm(state['neg'], dn if dn > up and dn > 0 else 0.0, alpha)
+
+        # 2. ATR: mean of the first length-1 true ranges, then Wilder RMA
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if new['count'] < self.length:
+            new['tr_sum'] = state['tr_sum'] + tr
+            return new, None
+        if state['atr'] is None:
+            new['atr'] = (state['tr_sum'] + tr) / (self.length - 1)
+        else:
+            new['atr'] = state['atr'] + alpha * (tr - state['atr'])
+
+        # 3. DI and ADX (a bar with no movement either way counts as DX 0)
+        if new['atr'] == 0:
+            return new, state['adx']
+        new['plus_di'] = 100 * new['pos'] / new['atr']
+        new['minus_di'] = 100 * new['neg'] / new['atr']
+        di_sum = new['plus_di'] + new['minus_di']
+        dx = 100 * abs(new['plus_di'] - new['minus_di']) / di_sum if di_sum > 0 else 0.0
+        new['adx'] = _ewm(state['adx'], dx, alpha)
+        return new, new['adx']
+
+    @property
+    def di(self):
+        """(plus_di, minus_di) of the latest bar (None in warmup)."""
+        return self.current['plus_di'], self.current['minus_di']
@@ -2,11 +2,29 @@ import logging
 import os
 import asyncio
 from telegram import Bot, InputFile
+from telegram.error import RetryAfter
 import config
+import rate_limiter
 # import chart_generator
 
 logger = logging.getLogger(__name__)
 
+async def send_message(bot: Bot, chat_id, text, **kwargs):
+    """
+    Sends a message within Telegram's limits (global + per-chat token buckets).
+    A RetryAfter (flood control) answer pauses the chat bucket and the message is sent once more.
+    """
+    for attempt in range(2):
+        await rate_limiter.acquire('telegram')
+        await rate_limiter.acquire(f'telegram_chat:{chat_id}')
+        try:
+            return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+            rate_limiter.penalize(f'telegram_chat:{chat_id}', retry_after)
+            if attempt == 1:
+                raise
+
 async def send_signal(bot: Bot, signal_data, market_type, balance=None):
     """
     Sends signal to the appropriate Telegram channel.
@@ -72,6 +90,8 @@ async def send_signal(bot: Bot, signal_data, market_type, balance=None):
     try:
         # Send Photo with Caption (If chart exists)
         if chart_path and os.path.exists(chart_path):
+            await rate_limiter.acquire('telegram')
+            await rate_limiter.acquire(f'telegram_chat:{channel_id}')
             with open(chart_path, 'rb') as photo:
                 await bot.send_photo(chat_id=channel_id, photo=photo, caption=message, parse_mode='Markdown')
             # Cleanup
@@ -81,7 +101,7 @@ async def send_signal(bot: Bot, signal_data, market_type, balance=None):
                 pass
         else:
             # Text Only (Crypto falls here now)
-            await bot.send_message(chat_id=channel_id, text=message, parse_mode='Markdown')
+            await send_message(bot, channel_id, message, parse_mode='Markdown')
 
         # Send Poll (Disabled per user request)
         # question = "What's your risk tolerance for this trade?"
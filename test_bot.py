@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+import config
+import market_data
+import bot
+from candle_buffer import CandleBuffer
+
+class TestStreamBarClose(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.analysed = []
+
+        async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=None):
+            self.analysed.append(symbol)
+            return None
+
+        self.saved = (bot.crypto_scan_blocked, bot.signals.analyze_crypto, config.CRYPTO_PAIRS, bot.MAX_CRYPTO_PAIRS)
+        bot.crypto_scan_blocked = lambda: None
+        bot.signals.analyze_crypto = analyze_crypto
+        bot.future_mgr.check_balance_sufficiency = lambda: None
+        config.CRYPTO_PAIRS = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']
+        bot.MAX_CRYPTO_PAIRS = 2
+        market_data.clear_candle_cache()
+        market_data._series_health.clear()
+        for symbol in config.CRYPTO_PAIRS:
+            market_data._candle_cache[(symbol, config.CRYPTO_TIMEFRAME)] = CandleBuffer.from_ohlcv([[0, 1, 1, 1, 1, 1]])
+
+    def tearDown(self):
+        bot.crypto_scan_blocked, bot.signals.analyze_crypto, config.CRYPTO_PAIRS, bot.MAX_CRYPTO_PAIRS = self.saved
+        del bot.future_mgr.check_balance_sufficiency
+        market_data.clear_candle_cache()
+        market_data._series_health.clear()
+
+    async def test_same_gates_as_the_scan(self):
+        market_data._series_health[('ETH/USDT', config.CRYPTO_TIMEFRAME)] = {'healthy': False}
+        for symbol in config.CRYPTO_PAIRS:
+            await bot.on_crypto_bar_close(None, symbol)
+        self.assertEqual(self.analysed, ['BTC/USDT']) # ETH gapped, SOL past the pair cap
+
+    async def test_memoized_signal_is_not_dispatched_again(self):
+        sent = []
+
+        async def send_signal(tg_bot, signal, market, balance=None):
+            sent.append(signal)
+        saved, bot.telegram_handler.send_signal = bot.telegram_handler.send_signal, send_signal
+        try:
+            await bot.dispatch_crypto_signal(None, {'symbol': 'BTC/USDT', 'side': 'LONG', 'memoized': True})
+        finally:
+            bot.telegram_handler.send_signal = saved
+        self.assertEqual(sent, [])
+
+    async def test_waits_for_the_scan_lock(self):
+        async with bot.SCAN_LOCK:
+            task = asyncio.create_task(bot.on_crypto_bar_close(None, 'BTC/USDT'))
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.analysed, [])
+        await task
+        self.assertEqual(self.analysed, ['BTC/USDT'])
+
+class TestStockScanDailyTrend(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.analysed = []
+        symbols = ['UP.NS', 'DOWN.NS']
+
+        async def fetch_stock_intraday_batch(scan_list):
+            return {symbol: object() for symbol in scan_list}
+
+        async def daily_trend_ok(symbol):
+            return symbol == 'UP.NS'
+
+        async def analyze_stock(symbol, df=None, is_backtest=None):
+            self.analysed.append(symbol)
+            return None
+
+        self.saved = (
+            bot.utils.is_market_open, market_data.fetch_stock_intraday_batch, bot.signals.daily_trend_ok,
+            bot.signals.analyze_stock, bot.signals.is_evaluated, config.STOCK_SYMBOLS,
+        )
+        bot.utils.is_market_open = lambda market: True
+        market_data.fetch_stock_intraday_batch = fetch_stock_intraday_batch
+        bot.signals.daily_trend_ok = daily_trend_ok
+        bot.signals.analyze_stock = analyze_stock
+        bot.signals.is_evaluated = lambda symbol, timeframe: False
+        bot.stock_mgr.check_balance_sufficiency = lambda: None
+        config.STOCK_SYMBOLS = symbols
+
+    def tearDown(self):
+        (bot.utils.is_market_open, market_data.fetch_stock_intraday_batch, bot.signals.daily_trend_ok,
+         bot.signals.analyze_stock, bot.signals.is_evaluated, config.STOCK_SYMBOLS) = self.saved
+        del bot.stock_mgr.check_balance_sufficiency
+
+    async def test_symbols_below_the_daily_trend_are_not_analysed(self):
+        await bot.scan_stocks(SimpleNamespace(bot=None))
+        self.assertEqual(self.analysed, ['UP.NS'])
+
+class TestCryptoScanScreenFailure(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.analysed = []
+        candles = CandleBuffer.from_ohlcv([[0, 1, 1, 1, 1, 1]])
+
+        async def fetch_crypto_candles(exchange, symbol, timeframe=None):
+            return candles
+
+        def crypto_indicator_table(candles_by_symbol):
+            raise ValueError("bad frame")
+
+        async def analyze_crypto(exchange, symbol, raw_candles=None, raw_htf_candles=None):
+            self.analysed.append(symbol)
+            return None
+
+        self.saved = (
+            bot.utils.is_market_open, market_data.get_crypto_exchange, market_data.fetch_crypto_candles,
+            market_data.closed_candles, bot.signals.crypto_indicator_table, bot.signals.analyze_crypto,
+            bot.signals.is_evaluated, config.CRYPTO_PAIRS,
+        )
+        bot.utils.is_market_open = lambda market: market == 'CRYPTO'
+        market_data.get_crypto_exchange = lambda: object()
+        market_data.fetch_crypto_candles = fetch_crypto_candles
+        market_data.closed_candles = lambda symbol, timeframe, candles: candles
+        bot.signals.crypto_indicator_table = crypto_indicator_table
+        bot.signals.analyze_crypto = analyze_crypto
+        bot.signals.is_evaluated = lambda symbol, timeframe: False
+        bot.spot_mgr.check_balance_sufficiency = lambda: None
+        bot.future_mgr.check_balance_sufficiency = lambda: None
+        config.CRYPTO_PAIRS = ['BTC/USDT', 'ETH/USDT']
+        market_data._series_health.clear()
+
+    def tearDown(self):
+        (bot.utils.is_market_open, market_data.get_crypto_exchange, market_data.fetch_crypto_candles,
+         market_data.closed_candles, bot.signals.crypto_indicator_table, bot.signals.analyze_crypto,
+         bot.signals.is_evaluated, config.CRYPTO_PAIRS) = self.saved
+        del bot.spot_mgr.check_balance_sufficiency
+        del bot.future_mgr.check_balance_sufficiency
+
+    async def test_every_pair_is_analysed_when_the_screen_fails(self):
+        await bot.scan_crypto(SimpleNamespace(bot=None))
+        self.assertEqual(self.analysed, ['BTC/USDT', 'ETH/USDT'])
+
+if __name__ == '__main__':
+    unittest.main()
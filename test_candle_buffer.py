@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from candle_buffer import CandleBuffer
+import market_data
+
+STEP = 300000 # 5m in ms
+
+def make_candles(n, start=1_700_000_100_000 // 900000 * 900000):
+    return [[start + i * STEP, 100 + i, 101 + i, 99 + i, 100.5 + i, 10.0 + i] for i in range(n)]
+
+class TestCandleBuffer(unittest.TestCase):
+    def test_ring_keeps_last_capacity_candles(self):
+        buf = CandleBuffer(5)
+        for c in make_candles(23):
+            buf.append(*c)
+        self.assertEqual(len(buf), 5)
+        self.assertEqual(buf.close.tolist(), [118.5, 119.5, 120.5, 121.5, 122.5])
+        self.assertTrue(buf.close.flags['C_CONTIGUOUS'])
+
+    def test_views_are_zero_copy(self):
+        buf = CandleBuffer.from_ohlcv(make_candles(10))
+        self.assertTrue(np.shares_memory(buf.close, buf._ohlcv))
+
+    def test_same_timestamp_replaces_forming_bar(self):
+        buf = CandleBuffer.from_ohlcv(make_candles(3), capacity=10)
+        last = buf.to_list()[-1]
+        buf.append(last[0], 1, 2, 0.5, 1.5, 99)
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(buf.volume[-1], 99)
+
+    def test_merge_replaces_overlap(self):
+        candles = make_candles(8)
+        buf = CandleBuffer.from_ohlcv(candles[:6], capacity=6)
+        buf.merge(candles[5:])
+        self.assertEqual(buf.to_list(), candles[-6:])
+
+    def test_rejects_older_candle(self):
+        buf = CandleBuffer.from_ohlcv(make_candles(3))
+        with self.assertRaises(ValueError):
+            buf.append(0, 1, 1, 1, 1, 1)
+
+class TestResample(unittest.TestCase):
+    def test_resample_5m_to_15m(self):
+        candles = make_candles(7) # 2 full 15m buckets + 1 forming bar
+        htf = market_data.resample_candles(candles, '15m', '5m')
+        self.assertEqual(len(htf), 3)
+        self.assertEqual(htf.to_list()[0], [candles[0][0], 100.0, 103.0, 99.0, 102.5, 33.0])
+        self.assertEqual(htf.to_list()[-1], [candles[6][0], 106.0, 107.0, 105.0, 106.5, 16.0])
+
+    def test_leading_partial_bucket_dropped(self):
+        candles = make_candles(7)[1:]
+        htf = market_data.resample_candles(candles, '15m', '5m')
+        self.assertEqual(htf.timestamp[0], candles[2][0])
+
+if __name__ == '__main__':
+    unittest.main()
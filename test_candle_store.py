@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from candle_store import CandleStore, CANDLE_DTYPE
+
+STEP = 300000 # 5m in ms
+
+def make_candles(n, start=1_700_000_100_000 // STEP * STEP):
+    return [[start + i * STEP, 100 + i, 101 + i, 99 + i, 100.5 + i, 10.0 + i] for i in range(n)]
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CandleStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_range_query(self):
+        candles = make_candles(10)
+        self.assertEqual(self.store.write('BTC/USDT', '5m', candles[:6]), 6)
+        self.assertEqual(self.store.write('BTC/USDT', '5m', candles[6:]), 4)
+        buf = self.store.read('BTC/USDT', '5m', start=candles[2][0], end=candles[5][0])
+        self.assertEqual(buf.to_list(), candles[2:5])
+        self.assertEqual(self.store.read('BTC/USDT', '5m', limit=3).to_list(), candles[-3:])
+
+    def test_gap_backfill_and_known_empty(self):
+        candles = make_candles(10)
+        self.store.write('BTC/USDT', '5m', candles[:3] + candles[6:])
+        self.assertEqual(self.store.gaps('BTC/USDT', '5m', STEP), [(candles[3][0], candles[6][0])])
+
+        self.assertEqual(self.store.write('BTC/USDT', '5m', candles[3:5]), 2)
+        self.assertEqual(self.store.read('BTC/USDT', '5m').to_list(), candles[:5] + candles[6:])
+        gap = (candles[5][0], candles[6][0])
+        self.assertEqual(self.store.gaps('BTC/USDT', '5m', STEP), [gap])
+        self.store.mark_empty('BTC/USDT', '5m', *gap)
+        self.assertEqual(self.store.gaps('BTC/USDT', '5m', STEP), [])
+
+    def test_torn_trailing_record_ignored(self):
+        candles = make_candles(4)
+        self.store.write('BTC/USDT', '5m', candles[:3])
+        with open(self.store._path('BTC/USDT', '5m'), 'ab') as f:
+            f.write(b'\x00' * (CANDLE_DTYPE.itemsize // 2)) # Crash mid-write
+        self.store.write('BTC/USDT', '5m', candles[3:])
+        self.assertEqual(self.store.read('BTC/USDT', '5m').to_list(), candles)
+        self.assertEqual(os.path.getsize(self.store._path('BTC/USDT', '5m')), 4 * CANDLE_DTYPE.itemsize)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+import pandas as pd
+try:
+    import pandas_ta as ta
+except ImportError: # Dev requirement (requirements-dev.txt): only the reference comparisons need it
+    ta = None
+import config
+import indicators
+import market_data
+import utils
+
+def make_ohlcv(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    high = close + rng.uniform(0, 40, n)
+    low = close - rng.uniform(0, 40, n)
+    volume = rng.uniform(1e5, 1e6, n)
+    return high, low, close, volume
+
+class TestIndicatorsMatchPandasTA(unittest.TestCase):
+    def setUp(self):
+        self.high, self.low, self.close, self.volume = make_ohlcv()
+        self.h, self.l, self.c, self.v = map(pd.Series, (self.high, self.low, self.close, self.volume))
+
+    def assertMatches(self, ours, theirs):
+        np.testing.assert_allclose(ours, np.asarray(theirs, dtype=float), rtol=1e-9, atol=0, equal_nan=True)
+
+    @unittest.skipUnless(ta, "pandas_ta not installed")
+    def test_moving_averages(self):
+        self.assertMatches(indicators.sma_series(self.volume, 20), ta.sma(self.v, length=20))
+        self.assertMatches(indicators.ema_series(self.close, 20), ta.ema(self.c, length=20))
+        self.assertMatches(indicators.ema_series(self.close, 200), ta.ema(self.c, length=200))
+
+    @unittest.skipUnless(ta, "pandas_ta not installed")
+    def test_rsi(self):
+        self.assertMatches(indicators.rsi_series(self.close, 14), ta.rsi(self.c, length=14))
+        self.assertMatches(utils.calculate_rsi_series(self.close, 14), ta.rsi(self.c, length=14))
+        self.assertAlmostEqual(utils.calculate_rsi(self.close, 14), ta.rsi(self.c, length=14).iloc[-1], places=9)
+
+    @unittest.skipUnless(ta, "pandas_ta not installed")
+    def test_atr_and_adx(self):
+        self.assertMatches(indicators.atr_series(self.high, self.low, self.close, 14), ta.atr(self.h, self.l, self.c, length=14))
+        adx, plus_di, minus_di = indicators.adx_series(self.high, self.low, self.close, 14)
+        expected = ta.adx(self.h, self.l, self.c, length=14)
+        self.assertMatches(adx, expected['ADX_14'])
+        self.assertMatches(plus_di, expected['DMP_14'])
+        self.assertMatches(minus_di, expected['DMN_14'])
+
+    def test_sma_series_matches_trailing_slices(self):
+        vol_ma = utils.calculate_sma_series(self.volume, 20)
+        for i in range(1, 11): # analyze_crypto lookback: MA of the 20 candles before candle -i
+            self.assertAlmostEqual(vol_ma[-(i + 1)], utils.calculate_sma(self.volume[:-i], 20), delta=1e-6)
+
+    @unittest.skipUnless(ta, "pandas_ta not installed")
+    def test_stock_indicators_match_pandas_ta_columns(self):
+        df = pd.DataFrame({'open': self.close, 'high': self.high, 'low': self.low, 'close': self.close, 'volume': self.volume})
+        ind = market_data.calculate_indicators_stock(df)
+        ema_trend = ta.ema(df['close'], length=50)
+        self.assertMatches(ind['ema_fast'], ta.ema(df['close'], length=config.EMA_FAST))
+        self.assertMatches(ind['ema_200'], ta.ema(df['close'], length=200))
+        self.assertMatches(ind['adx'], ta.adx(df['high'], df['low'], df['close'], length=14)['ADX_14'])
+        self.assertMatches(ind['ema_trend_slope'], (ema_trend - ema_trend.shift(10)) / ema_trend.shift(10) * 100)
+        self.assertMatches(ind['vol_avg'], ta.sma(df['volume'], length=20))
+        self.assertEqual(list(df.columns), ['open', 'high', 'low', 'close', 'volume']) # Input untouched
+
+        tail = market_data.calculate_indicators_stock(df, tail=5)
+        self.assertEqual(len(tail['rsi']), 5)
+        self.assertEqual(tail['rsi'][-1], ind['rsi'][-1])
+
+    def test_vwap_anchors(self):
+        ts = 1700006400000 + np.arange(len(self.close), dtype=np.int64) * 900000 # 15m bars from 00:00 UTC
+        pv = (self.high + self.low + self.close) / 3 * self.volume
+        anchored = indicators.vwap_series(self.high, self.low, self.close, self.volume, timestamps=ts)
+        self.assertAlmostEqual(anchored[95], pv[:96].sum() / self.volume[:96].sum(), places=6)
+        self.assertAlmostEqual(anchored[96], pv[96] / self.volume[96], places=6) # New UTC day starts over
+        rolling = indicators.vwap_series(self.high, self.low, self.close, self.volume, window=20)
+        self.assertAlmostEqual(rolling[-1], pv[-20:].sum() / self.volume[-20:].sum(), places=6)
+
+        for kwargs in ({'timestamps': ts}, {'timestamps': ts, 'anchor_offset_ms': market_data.vwap_anchor_offset('TCS.NS')}, {'window': 20}):
+            series = indicators.vwap_series(self.high, self.low, self.close, self.volume, **kwargs)
+            self.assertAlmostEqual(utils.calculate_vwap(self.high, self.low, self.close, self.volume, **kwargs), series[-1], places=6)
+
+    def test_nse_session_starts_at_open(self):
+        ist_open = 1700019900000 # 2023-11-15 09:15 IST (03:45 UTC)
+        sessions = indicators.session_ids([ist_open - 300000, ist_open], market_data.vwap_anchor_offset('TCS.NS'))
+        self.assertEqual(sessions[1] - sessions[0], 1)
+
+    def test_short_input_is_all_warmup(self):
+        self.assertTrue(np.isnan(indicators.ema_series([1.0, 2.0], 20)).all())
+        self.assertIsNone(utils.calculate_ema([1.0, 2.0], 20))
+        self.assertEqual(utils.calculate_rsi([1.0, 2.0], 14), 50.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import unittest
+import config
+import market_data
+from kline_replay_server import synthetic_klines
+from kline_stream import KlineStream
+from test_market_data import TF_5M, CandleCacheTestCase, FakeExchange
+
+def replayed(bars):
+    """Synthetic replay messages for BTC/USDT (4 ticks per bar, the last one closes it)."""
+    return [json.dumps(m) for m in synthetic_klines(['btcusdt@kline_5m', 'btcusdt@ticker'], bars)]
+
+class TestKlineStream(CandleCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.closed = [] # (symbol, last buffered timestamp) seen by the callback
+
+        async def on_bar_close(symbol):
+            self.closed.append((symbol, market_data.get_cached_candles(symbol, '5m').last_timestamp))
+        self.on_bar_close = on_bar_close
+
+    async def feed(self, stream, messages):
+        for raw in messages:
+            await stream._handle(raw)
+            while stream._callbacks: # Callbacks run before the next message arrives
+                await asyncio.gather(*stream._callbacks)
+
+    async def test_replay_writes_bars_and_fires_once_per_close(self):
+        stream = KlineStream(['BTC/USDT'], timeframe='5m', on_bar_close=self.on_bar_close, rest_seed=False)
+        messages = replayed(3)
+        await self.feed(stream, messages)
+
+        buf = market_data.get_cached_candles('BTC/USDT', '5m')
+        self.assertEqual(len(buf), 3)
+        self.assertEqual([ts for _, ts in self.closed], buf.timestamp.tolist()) # After each close was written
+        self.assertEqual(stream.stats['bars_closed'], 3)
+
+        await self.feed(stream, messages[-2:]) # Replayed again: already closed, nothing fires
+        self.assertEqual(len(self.closed), 3)
+
+    async def test_stale_klines_after_a_rest_seed_do_not_fire(self):
+        exchange = FakeExchange(self.now + 30 * 86400000) # REST seed today, replayed klines are a month old
+        await market_data.fetch_crypto_candles(exchange, 'BTC/USDT', timeframe='5m')
+        stream = KlineStream(['BTC/USDT'], timeframe='5m', on_bar_close=self.on_bar_close)
+        await self.feed(stream, replayed(2))
+        self.assertEqual(self.closed, [])
+        self.assertEqual(market_data.get_cached_candles('BTC/USDT', '5m').last_timestamp, exchange.now // TF_5M * TF_5M)
+
+    async def test_cold_cache_is_refilled_in_the_background(self):
+        saved, market_data._crypto_exchange = market_data._crypto_exchange, FakeExchange(self.now)
+        try:
+            stream = KlineStream(['BTC/USDT'], timeframe='5m', on_bar_close=self.on_bar_close)
+            closed_ts = self.now // TF_5M * TF_5M - TF_5M
+            kline = {'t': closed_ts, 's': 'BTCUSDT', 'o': '1', 'h': '1', 'l': '1', 'c': '1', 'v': '1', 'x': True}
+            await stream._handle(json.dumps({'data': {'e': 'kline', 'E': closed_ts, 'k': kline}}))
+            self.assertEqual(len(stream._refetching), 1) # Scheduled, the message loop did not wait for it
+            while stream._callbacks:
+                await asyncio.gather(*stream._callbacks)
+            self.assertEqual(stream.stats['refetches'], 1)
+            self.assertEqual(len(self.closed), 1) # The close seen while cold is analysed after the refill
+            self.assertEqual(len(market_data.get_cached_candles('BTC/USDT', '5m')), config.CANDLE_CACHE_SIZE)
+        finally:
+            market_data._crypto_exchange = saved
+
+if __name__ == '__main__':
+    unittest.main()
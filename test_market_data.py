@@ -0,0 +1,381 @@
+import asyncio
+import tempfile
+import time
+import unittest
+import numpy as np
+import pandas as pd
+import config
+import market_data
+import rate_limiter
+from candle_store import CandleStore
+
+TF_5M = 300000
+
+class FakeExchange:
+    """
+    Stands in for the ccxt Binance client: 5m bars on a fixed grid up to `now` (the last one
+    still forming). `missing` bars are left out of full downloads (since=None) only, like a
+    flaky first response that a later since= request can fill.
+    """
+    def __init__(self, now, missing=()):
+        self.now = now
+        self.missing = set(missing)
+        self.calls = [] # (method, symbol, since, limit)
+        self.last_response_headers = {}
+
+    def parse_timeframe(self, timeframe):
+        return market_data.ccxt.Exchange.parse_timeframe(timeframe)
+
+    def milliseconds(self):
+        return self.now
+
+    async def fetch_ohlcv(self, symbol, timeframe='5m', since=None, limit=500):
+        self.calls.append(('fetch_ohlcv', symbol, since, limit))
+        forming = self.now // TF_5M * TF_5M
+        first = since if since is not None else forming - (limit - 1) * TF_5M
+        skip = self.missing if since is None else ()
+        bars = [[t, 100.0, 101.0, 99.0, 100.0 + (t // TF_5M) % 7, 10.0] for t in range(first, forming + TF_5M, TF_5M) if t not in skip]
+        return bars[:limit]
+
+    async def fetch_tickers(self, symbols):
+        self.calls.append(('fetch_tickers', tuple(symbols), None, None))
+        await asyncio.sleep(0.01)
+        return {s: {'symbol': s, 'last': 100.0 + i} for i, s in enumerate(symbols)}
+
+STOCK_OPEN_MS = 1700019900000 # 2023-11-15 09:15 IST
+
+class FakeYahoo:
+    """
+    Replaces yf.download / yf.Ticker: `bars` 5m bars per ticker from the NSE open (start= cuts
+    the window). Chunks listed in failing_downloads (by call number) come back empty.
+    """
+    def __init__(self, bars=20, failing_downloads=()):
+        self.bars = bars
+        self.failing_downloads = set(failing_downloads)
+        self.downloads = [] # (tickers, start)
+        self.histories = [] # single-symbol Ticker.history calls
+
+    def frame(self, start=None):
+        ts = STOCK_OPEN_MS + np.arange(self.bars, dtype=np.int64) * TF_5M
+        if start is not None:
+            ts = ts[ts >= int(pd.Timestamp(start).timestamp() * 1000)]
+        close = 100.0 + (ts - STOCK_OPEN_MS) // TF_5M
+        index = pd.to_datetime(ts, unit='ms', utc=True).tz_convert('Asia/Kolkata').rename('Datetime')
+        return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1000.0}, index=index)
+
+    def download(self, tickers, interval=None, start=None, **kwargs):
+        self.downloads.append((list(tickers), start))
+        if len(self.downloads) in self.failing_downloads:
+            return pd.DataFrame()
+        return pd.concat({t: self.frame(start) for t in tickers}, axis=1)
+
+    def Ticker(self, symbol):
+        fake = self
+
+        class Ticker:
+            def history(self, period=None, interval=None, start=None, end=None):
+                fake.histories.append(symbol)
+                return fake.frame(start)
+        return Ticker()
+
+class StockFetchTestCase(unittest.IsolatedAsyncioTestCase):
+    buckets = ('yahoo', 'yahoo_batch')
+
+    def setUp(self):
+        self.yahoo = FakeYahoo()
+        self.saved = market_data.yf.download, market_data.yf.Ticker, {n: rate_limiter._buckets.get(n) for n in self.buckets}
+        market_data.yf.download, market_data.yf.Ticker = self.yahoo.download, self.yahoo.Ticker
+        for name in self.buckets:
+            rate_limiter._buckets[name] = rate_limiter.TokenBucket(name, 1000, 1000)
+        market_data.clear_single_flight_cache()
+        market_data._series_health.clear()
+        market_data._stock_buffers.clear()
+
+    def tearDown(self):
+        market_data.yf.download, market_data.yf.Ticker, buckets = self.saved
+        for name, bucket in buckets.items():
+            rate_limiter._buckets.pop(name)
+            if bucket is not None:
+                rate_limiter._buckets[name] = bucket
+        market_data.clear_single_flight_cache()
+        market_data._stock_buffers.clear()
+
+class TestStockBatch(StockFetchTestCase):
+    async def test_chunks_and_per_ticker_fallback(self):
+        symbols = [f"S{i}.NS" for i in range(120)]
+        self.yahoo.failing_downloads = {2, 3, 4} # Every attempt for the second chunk
+        frames = await market_data.fetch_stock_data_batch(symbols, timeframe='5m')
+
+        self.assertEqual([len(tickers) for tickers, _ in self.yahoo.downloads], [50, 50, 50, 50, 20])
+        self.assertEqual(sorted(self.yahoo.histories), sorted(symbols[50:100])) # Failed chunk, one by one
+        self.assertEqual(sorted(frames), sorted(symbols))
+        df = frames['S7.NS']
+        self.assertEqual(list(df.columns[:6]), ['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(len(df), self.yahoo.bars)
+
+    async def test_grouped_downloads_are_charged_per_ticker(self):
+        bucket = rate_limiter._buckets['yahoo_batch'] = rate_limiter.TokenBucket('yahoo_batch', 0.001, 100)
+        await market_data.fetch_stock_data_batch([f"S{i}.NS" for i in range(30)], timeframe='5m')
+        self.assertAlmostEqual(bucket.tokens, 70, places=1)
+        self.assertAlmostEqual(rate_limiter._buckets['yahoo'].tokens, 1000, places=0) # Single-symbol bucket untouched
+
+class TestStockIntradayBuffers(StockFetchTestCase):
+    symbols = ['A.NS', 'B.NS']
+
+    async def test_warm_buffers_only_download_new_bars(self):
+        await market_data.fetch_stock_intraday_batch(self.symbols, timeframe='5m')
+        last_ts = STOCK_OPEN_MS + (self.yahoo.bars - 1) * TF_5M
+        self.yahoo.bars = 24
+        frames = await market_data.fetch_stock_intraday_batch(self.symbols, timeframe='5m')
+
+        tickers, start = self.yahoo.downloads[-1]
+        self.assertEqual(sorted(tickers), self.symbols)
+        self.assertEqual(int(pd.Timestamp(start).timestamp() * 1000), last_ts)
+        self.assertEqual(sorted(frames), self.symbols)
+        self.assertEqual(len(frames['A.NS']), 24)
+        self.assertEqual(frames['A.NS']['close'].iloc[-1], 123.0)
+
+    async def test_warm_refresh_is_chunked(self):
+        symbols = [f"S{i:03d}.NS" for i in range(120)]
+        await market_data.fetch_stock_intraday_batch(symbols, timeframe='5m')
+        seeded = len(self.yahoo.downloads)
+        frames = await market_data.fetch_stock_intraday_batch(symbols, timeframe='5m')
+        self.assertEqual([len(tickers) for tickers, _ in self.yahoo.downloads[seeded:]], [50, 50, 20])
+        self.assertEqual(len(frames), 120)
+
+    async def test_failed_refresh_leaves_stale_symbols_out(self):
+        await market_data.fetch_stock_intraday_batch(self.symbols, timeframe='5m')
+        self.yahoo.bars = 24
+        self.yahoo.failing_downloads = {2, 3, 4} # Every attempt of the warm refresh
+        frames = await market_data.fetch_stock_intraday_batch(self.symbols, timeframe='5m')
+
+        self.assertEqual(frames, {})
+        self.assertEqual(len(market_data._stock_buffers[('A.NS', '5m')][1]), 20) # Kept for the next scan
+
+class CandleCacheTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.saved_store, config.CANDLE_STORE_ENABLED = config.CANDLE_STORE_ENABLED, False
+        market_data.clear_candle_cache()
+        market_data.clear_single_flight_cache()
+        market_data._series_health.clear()
+        self.now = 1700000100000 // TF_5M * TF_5M + 60000
+
+    def tearDown(self):
+        config.CANDLE_STORE_ENABLED = self.saved_store
+        market_data.clear_candle_cache()
+        market_data.clear_single_flight_cache()
+
+class TestIncrementalCandleFetch(CandleCacheTestCase):
+    async def test_second_fetch_only_asks_for_new_bars(self):
+        exchange = FakeExchange(self.now)
+        buf = await market_data.fetch_crypto_candles(exchange, 'BTC/USDT')
+        self.assertEqual(exchange.calls[0][2], None) # Cold cache: full window
+        self.assertEqual(len(buf), config.CANDLE_CACHE_SIZE)
+        forming = buf.last_timestamp
+
+        exchange.now += 2 * TF_5M
+        market_data.clear_single_flight_cache() # Past the coalescing TTL
+        again = await market_data.fetch_crypto_candles(exchange, 'BTC/USDT')
+        self.assertIs(again, buf)
+        self.assertEqual(exchange.calls[1][2], forming) # Only since the last (still forming) bar
+        self.assertEqual(buf.last_timestamp, forming + 2 * TF_5M)
+        self.assertEqual(len(buf), config.CANDLE_CACHE_SIZE)
+        self.assertTrue((np.diff(buf.timestamp) == TF_5M).all())
+
+    async def test_every_gap_is_backfilled_and_stored(self):
+        forming = self.now // TF_5M * TF_5M
+        first = forming - (config.CANDLE_CACHE_SIZE - 1) * TF_5M
+        holes = [[first + i * TF_5M for i in range(40, 45)], [first + i * TF_5M for i in range(200, 202)]]
+        exchange = FakeExchange(self.now, missing=holes[0] + holes[1])
+
+        with tempfile.TemporaryDirectory() as root:
+            saved_store, market_data._candle_store = market_data._candle_store, CandleStore(root)
+            config.CANDLE_STORE_ENABLED = True
+            try:
+                buf = await market_data.fetch_crypto_candles(exchange, 'BTC/USDT')
+                stored = market_data.get_candle_store().read('BTC/USDT', '5m')
+            finally:
+                market_data._candle_store = saved_store
+
+        self.assertEqual([call[2:] for call in exchange.calls[1:]], [(holes[0][0], 5), (holes[1][0], 2)]) # One request per hole
+        self.assertTrue((np.diff(buf.timestamp) == TF_5M).all())
+        self.assertEqual(len(buf), config.CANDLE_CACHE_SIZE)
+        self.assertTrue(market_data.is_series_healthy('BTC/USDT', '5m'))
+        self.assertEqual(market_data.get_series_health('BTC/USDT')[('BTC/USDT', '5m')]['backfilled_bars'], 7)
+        # The store holds every closed bar, so a restart does not backfill again
+        self.assertEqual(stored.timestamp.tolist(), buf.timestamp[:-1].tolist())
+
+class TestExchangeCall(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.saved = rate_limiter._buckets.get('binance')
+        self.bucket = rate_limiter._buckets['binance'] = rate_limiter.TokenBucket('binance', 0.001, 1200)
+        self.exchange = FakeExchange(1700000100000)
+
+    def tearDown(self):
+        rate_limiter._buckets.pop('binance')
+        if self.saved is not None:
+            rate_limiter._buckets['binance'] = self.saved
+
+    async def test_calls_are_charged_their_binance_weight(self):
+        await market_data.exchange_call(self.exchange, 'fetch_ohlcv', 'BTC/USDT', '5m', limit=5)
+        self.assertAlmostEqual(self.bucket.tokens, 1198, places=1)
+        await market_data.exchange_call(self.exchange, 'fetch_tickers', ['BTC/USDT'])
+        self.assertAlmostEqual(self.bucket.tokens, 1118, places=1)
+
+    async def test_used_weight_header_drains_the_bucket(self):
+        self.exchange.last_response_headers = {'X-MBX-USED-WEIGHT-1M': '4500'} # 75% of the minute's 6000
+        await market_data.exchange_call(self.exchange, 'fetch_ohlcv', 'BTC/USDT', '5m', limit=5)
+        self.assertLessEqual(self.bucket.tokens, 300)
+
+    async def test_rate_limit_error_pauses_the_bucket(self):
+        async def fetch_ticker(symbol):
+            self.exchange.last_response_headers = {'Retry-After': '30'}
+            raise market_data.ccxt.RateLimitExceeded('429 Too Many Requests')
+        self.exchange.fetch_ticker = fetch_ticker
+
+        with self.assertRaises(market_data.ccxt.RateLimitExceeded):
+            await market_data.exchange_call(self.exchange, 'fetch_ticker', 'BTC/USDT')
+        self.assertEqual(self.bucket.tokens, 0)
+        self.assertGreater(self.bucket._blocked_until - time.monotonic(), 29)
+        self.assertFalse(self.bucket.try_acquire())
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        market_data.clear_single_flight_cache()
+
+    async def test_concurrent_callers_share_one_fetch(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'last': 100.0}
+
+        results = await asyncio.gather(*[market_data.single_flight(('test', 'BTC/USDT', None), fetch) for _ in range(10)])
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    async def test_ttl_reuses_result(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return 42
+
+        market_data.config.SINGLE_FLIGHT_TTL['test_ttl'] = 60
+        try:
+            self.assertEqual(await market_data.single_flight(('test_ttl', 'X', None), fetch), 42)
+            self.assertEqual(await market_data.single_flight(('test_ttl', 'X', None), fetch), 42)
+        finally:
+            del market_data.config.SINGLE_FLIGHT_TTL['test_ttl']
+        self.assertEqual(len(calls), 1)
+
+    async def test_expired_results_are_pruned(self):
+        async def fetch():
+            return 42
+
+        market_data._recent_results[('test_ttl', 'OLD', None)] = (0.0, 1) # Long expired
+        market_data.config.SINGLE_FLIGHT_TTL['test_ttl'] = 60
+        try:
+            await market_data.single_flight(('test_ttl', 'NEW', None), fetch)
+        finally:
+            del market_data.config.SINGLE_FLIGHT_TTL['test_ttl']
+        self.assertEqual(list(market_data._recent_results), [('test_ttl', 'NEW', None)])
+
+class TestMarketPulse(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = 0
+
+        async def fetch():
+            self.calls += 1
+            return {'value': 40 + self.calls, 'value_classification': 'Fear'}
+
+        async def fetch_price():
+            return {'price': 1.0}
+
+        self.saved = dict(market_data._PULSE_FETCHERS)
+        market_data._PULSE_FETCHERS.update(fear_greed=fetch, nifty=fetch_price, usdinr=fetch_price)
+        market_data._pulse_cache.clear()
+
+    def tearDown(self):
+        market_data._PULSE_FETCHERS.update(self.saved)
+        market_data._pulse_cache.clear()
+        market_data._pulse_tasks.clear()
+
+    async def test_served_from_memory_until_expired_then_refreshed_in_background(self):
+        self.assertEqual((await market_data.get_fear_and_greed_index())['value'], 41) # Cold: waits for the fetch
+        self.assertEqual((await market_data.get_fear_and_greed_index())['value'], 41)
+        self.assertEqual(self.calls, 1) # Within the TTL
+
+        expires, value = market_data._pulse_cache['fear_greed']
+        market_data._pulse_cache['fear_greed'] = (0.0, value)
+        self.assertEqual((await market_data.get_fear_and_greed_index())['value'], 41) # Stale value, no wait
+        await market_data._pulse_tasks['fear_greed']
+        self.assertEqual(self.calls, 2)
+        self.assertEqual((await market_data.get_fear_and_greed_index())['value'], 42)
+
+    async def test_refresh_job_only_fetches_expired_items(self):
+        for name in ('nifty', 'usdinr'): # Fresh: the refresh job must not touch them
+            market_data._pulse_cache[name] = (market_data.time.monotonic() + 60, {'price': 1.0})
+        await market_data.refresh_market_pulse()
+        self.assertEqual(self.calls, 1)
+        await market_data.refresh_market_pulse()
+        self.assertEqual(self.calls, 1)
+        await market_data.refresh_market_pulse(force=True)
+        self.assertEqual(self.calls, 2)
+
+class TestPriceSnapshot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.exchange = FakeExchange(0)
+        self.saved, market_data._crypto_exchange = market_data._crypto_exchange, self.exchange
+        market_data.clear_single_flight_cache()
+        market_data._stream_tickers.clear()
+
+    def tearDown(self):
+        market_data._crypto_exchange = self.saved
+        market_data.clear_single_flight_cache()
+        market_data._stream_tickers.clear()
+
+    async def test_one_bulk_request_shared_within_ttl(self):
+        held = [{'BTC/USDT', 'ETH/USDT'}, {'ETH/USDT', 'BTC/USDT'}, {'BTC/USDT', 'ETH/USDT'}] # Spot, futures, /price
+        snapshots = await asyncio.gather(*[market_data.fetch_price_snapshot(symbols) for symbols in held])
+        snapshots.append(await market_data.fetch_price_snapshot({'ETH/USDT', 'BTC/USDT'}))
+
+        self.assertEqual(self.exchange.calls, [('fetch_tickers', ('BTC/USDT', 'ETH/USDT'), None, None)])
+        self.assertTrue(all(s is snapshots[0] for s in snapshots))
+        self.assertEqual(dict(snapshots[0]), {'BTC/USDT': 100.0, 'ETH/USDT': 101.0})
+        with self.assertRaises(TypeError):
+            snapshots[0]['BTC/USDT'] = 0 # Read-only
+
+        market_data.clear_single_flight_cache() # TTL over
+        await market_data.fetch_price_snapshot({'BTC/USDT', 'ETH/USDT'})
+        self.assertEqual(len(self.exchange.calls), 2)
+
+    async def test_fresh_streamed_prices_skip_rest(self):
+        market_data.update_stream_ticker('BTC/USDT', 123.0, market_data.ccxt.Exchange.milliseconds())
+        snapshot = await market_data.fetch_price_snapshot({'BTC/USDT', 'ETH/USDT'})
+        self.assertEqual(self.exchange.calls, [('fetch_tickers', ('ETH/USDT',), None, None)])
+        self.assertEqual(snapshot['BTC/USDT'], 123.0)
+
+class TestSeriesHealth(unittest.TestCase):
+    STEP = 300000 # 5m in ms
+
+    def setUp(self):
+        market_data._series_health.clear()
+
+    def test_gap_marks_series_unhealthy_and_is_not_retried(self):
+        ts = [i * self.STEP for i in range(100) if not 40 <= i < 45]
+        stats = market_data.record_series_health('X/USDT', '5m', ts, attempted=[(40 * self.STEP, 45 * self.STEP)])
+        self.assertEqual((stats['gaps'], stats['missing_bars']), (1, 5))
+        self.assertFalse(market_data.is_series_healthy('X/USDT', '5m'))
+        self.assertEqual(market_data._new_gaps('X/USDT', '5m', ts, self.STEP), [])
+
+    def test_overnight_close_is_not_a_gap(self):
+        day = 86400000
+        session = [day * d + 3 * 3600000 + i * self.STEP for d in range(2) for i in range(75)] # 09:15-15:25 IST
+        stats = market_data.record_series_health('TCS.NS', '5m', session, market_data.session_day_offset('TCS.NS'))
+        self.assertEqual(stats['gaps'], 0)
+        self.assertTrue(market_data.is_series_healthy('TCS.NS', '5m'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import config
+import market_data
+import nse_client
+import signals
+from nse_client import NSEDataClient
+
+def make_rows(days):
+    """NSE historical API rows, newest first (as the API returns them)."""
+    rows = []
+    for d in days:
+        rows.append({
+            'CH_TIMESTAMP': f"2024-01-{d:02d}", 'CH_OPENING_PRICE': 100 + d, 'CH_TRADE_HIGH_PRICE': 105 + d,
+            'CH_TRADE_LOW_PRICE': 95 + d, 'CH_CLOSING_PRICE': 101 + d, 'CH_TOT_TRADED_QTY': 1000 * d,
+        })
+    return sorted(rows, key=lambda r: r['CH_TIMESTAMP'], reverse=True)
+
+def build_fixture_app(rows):
+    """Local stand-in for nseindia.com: cookie-setting home page + historical equity API."""
+    app = web.Application()
+    app['requests'] = []
+
+    async def home(request):
+        resp = web.Response(text="ok")
+        resp.set_cookie('nsit', 'fixture')
+        return resp
+
+    async def history(request):
+        if request.cookies.get('nsit') != 'fixture':
+            return web.Response(status=401)
+        app['requests'].append(dict(request.query))
+        return web.json_response({'data': rows})
+
+    app.router.add_get('/', home)
+    app.router.add_get('/api/historical/cm/equity', history)
+    return app
+
+class TestNSEDataClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.app = build_fixture_app(make_rows([2, 3, 4, 5]))
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        self.client = NSEDataClient(base_url=str(self.server.make_url('/')), chunk_days=1000)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_daily_candles_in_shared_format(self):
+        candles = await self.client.fetch_daily('RELIANCE.NS', days=10)
+        self.assertEqual(len(candles), 4)
+        self.assertEqual(candles.close.tolist(), [103.0, 104.0, 105.0, 106.0]) # Oldest first
+        self.assertEqual(candles.timestamp[0], 1704133800000) # 2024-01-02 00:00 IST
+        self.assertEqual(self.app['requests'][0]['symbol'], 'RELIANCE')
+
+    async def test_result_cached_for_the_day(self):
+        first = await self.client.fetch_daily('TCS', days=10)
+        second = await self.client.fetch_daily('TCS', days=10)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.app['requests']), 1)
+
+    async def test_long_history_is_chunked(self):
+        self.client.chunk_days = 5
+        await self.client.fetch_daily('INFY', days=14)
+        self.assertEqual(len(self.app['requests']), 3)
+
+class TestDailyTrendFilter(unittest.IsolatedAsyncioTestCase):
+    """signals.daily_trend_ok reads its daily bars from NSE through market_data.fetch_stock_data."""
+    async def asyncSetUp(self):
+        self.saved = nse_client._client, config.STOCK_DAILY_TREND_EMA
+        config.STOCK_DAILY_TREND_EMA = 3
+        market_data.clear_single_flight_cache()
+
+    async def asyncTearDown(self):
+        await nse_client.close_nse_client()
+        await self.server.close()
+        nse_client._client, config.STOCK_DAILY_TREND_EMA = self.saved
+        market_data.clear_single_flight_cache()
+
+    async def serve(self, rows):
+        self.server = TestServer(build_fixture_app(rows))
+        await self.server.start_server()
+        nse_client._client = NSEDataClient(base_url=str(self.server.make_url('/')), chunk_days=1000)
+
+    async def test_close_above_daily_ema_passes(self):
+        await self.serve(make_rows(range(2, 12))) # Rising closes
+        self.assertTrue(await signals.daily_trend_ok('RELIANCE.NS'))
+        self.assertEqual(len(self.server.app['requests']), 1)
+
+    async def test_close_below_daily_ema_is_filtered(self):
+        rows = make_rows(range(2, 12))
+        for row in rows:
+            row['CH_CLOSING_PRICE'] = 200 - row['CH_CLOSING_PRICE'] # Falling closes
+        await self.serve(rows)
+        self.assertFalse(await signals.daily_trend_ok('RELIANCE.NS'))
+
+if __name__ == '__main__':
+    unittest.main()
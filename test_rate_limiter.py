@@ -0,0 +1,26 @@
+import time
+import unittest
+from rate_limiter import TokenBucket
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_then_paced(self):
+        bucket = TokenBucket('test', rate=20, capacity=5)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.02) # Burst is free
+        for _ in range(4):
+            await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.18) # 4 more tokens at 20/s
+
+    async def test_penalize_pauses_and_halves_rate(self):
+        bucket = TokenBucket('test', rate=100, capacity=10)
+        bucket.penalize(retry_after=0.1)
+        self.assertEqual(bucket.rate, 50)
+        self.assertFalse(bucket.try_acquire())
+        start = time.monotonic()
+        await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+if __name__ == '__main__':
+    unittest.main()
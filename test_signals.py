@@ -0,0 +1,157 @@
+import asyncio
+import time
+import unittest
+import numpy as np
+import config
+import indicators
+import market_data
+import signals
+from candle_buffer import CandleBuffer
+
+def make_candles(seed, n=400):
+    """Random-walk 5m candles aligned to 15m boundaries."""
+    rng = np.random.default_rng(seed)
+    ts = (1700000100000 // 900000) * 900000 + np.arange(n, dtype=np.int64) * 300000
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.3, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.3, n)
+    return CandleBuffer.from_arrays(ts, open_, high, low, close, rng.uniform(10, 100, n))
+
+class TestCryptoScreen(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.candles = {f"C{i}/USDT": make_candles(i) for i in range(40)}
+        self.candles['NEW/USDT'] = make_candles(99, n=150) # Not enough HTF bars for the stacked window
+
+    def test_2d_kernels_match_row_by_row(self):
+        closes = np.stack([c.close[-100:] for c in self.candles.values()])
+        batched = indicators.rsi_series(closes, 14)
+        for row, c in zip(batched, self.candles.values()):
+            np.testing.assert_allclose(row, indicators.rsi_series(c.close[-100:], 14), rtol=1e-12, equal_nan=True)
+
+    async def test_mask_matches_analyze_crypto(self):
+        for spike in (False, True):
+            with self.subTest(require_volume_spike=spike):
+                saved, config.REQUIRE_VOLUME_SPIKE = config.REQUIRE_VOLUME_SPIKE, spike
+                try:
+                    table, rest = signals.crypto_indicator_table(self.candles)
+                    mask = signals.screen_crypto(table)
+                    self.assertEqual(rest, ['NEW/USDT'])
+                    for symbol, hit in zip(table['symbol'], mask):
+                        result = await signals.analyze_crypto(None, symbol, raw_candles=self.candles[symbol])
+                        self.assertEqual(result is not None, bool(hit), symbol)
+                finally:
+                    config.REQUIRE_VOLUME_SPIKE = saved
+
+    async def test_screen_keeps_every_pair_analyze_would_signal(self):
+        # Zero volume since the UTC day started: the HTF session VWAP is NaN for every pair
+        for c in self.candles.values():
+            c.volume[c.timestamp >= c.last_timestamp // 86400000 * 86400000] = 0.0
+        saved, config.REQUIRE_VOLUME_SPIKE = config.REQUIRE_VOLUME_SPIKE, False
+        try:
+            table, _ = signals.crypto_indicator_table(self.candles)
+            self.assertTrue(np.isnan(table['vwap_htf']).all())
+            mask = signals.screen_crypto(table)
+            for symbol, hit in zip(table['symbol'], mask):
+                result = await signals.analyze_crypto(None, symbol, raw_candles=self.candles[symbol])
+                self.assertFalse(result is not None and not hit, symbol)
+        finally:
+            config.REQUIRE_VOLUME_SPIKE = saved
+
+class TestEvaluationMemo(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        signals.clear_evaluation_memo()
+        market_data.clear_candle_cache()
+        self.saved_rsi = config.RSI_OVERSOLD, config.RSI_OVERBOUGHT
+
+    def tearDown(self):
+        config.RSI_OVERSOLD, config.RSI_OVERBOUGHT = self.saved_rsi
+        market_data.clear_candle_cache()
+
+    def test_key_changes_with_closed_bar_and_config(self):
+        bar = 1700000100000
+        key = signals.evaluation_key('BTC/USDT', '5m', bar - 300000)
+        signals.memoize(key, {'rsi': 55.0}, None)
+        self.assertEqual(signals.get_memoized(key), {'indicators': {'rsi': 55.0}, 'signal': None})
+        self.assertTrue(signals.is_evaluated('BTC/USDT', '5m', now_ms=bar + 240000))
+
+        self.assertFalse(signals.is_evaluated('BTC/USDT', '5m', now_ms=bar + 300000))
+        config.RSI_PERIOD += 1
+        try:
+            self.assertIsNone(signals.get_memoized(signals.evaluation_key('BTC/USDT', '5m', bar - 300000)))
+        finally:
+            config.RSI_PERIOD -= 1
+
+    async def test_forming_bar_is_not_analysed_or_memoized(self):
+        c = make_candles(3)
+        forming = market_data.last_closed_candle_ts('5m') + 2 * 300000 # Ends after now
+        candles = CandleBuffer.from_arrays(c.timestamp - c.last_timestamp + forming, c.open, c.high, c.low, c.close, c.volume)
+        closed_ts, closed_close = int(candles.timestamp[-2]), float(candles.close[-2])
+        config.RSI_OVERSOLD, config.RSI_OVERBOUGHT = 0, 100 # No RSI cross can fire, nothing reaches the AI
+
+        self.assertIsNone(await signals.analyze_crypto(object(), 'ETH/USDT', raw_candles=candles))
+        key = signals.evaluation_key('ETH/USDT', '5m', closed_ts)
+        self.assertEqual(signals.get_memoized(key)['indicators']['close'], closed_close)
+
+        # The forming bar changes before the next scan: the same closed bars, nothing re-evaluated
+        candles.append(forming, 100.0, 500.0, 100.0, 500.0, 1e6)
+        self.assertIsNone(await signals.analyze_crypto(object(), 'ETH/USDT', raw_candles=candles))
+        self.assertEqual(signals.get_memoized(key)['indicators']['close'], closed_close)
+
+        # Once the stream reports it closed it is analysed with its final values
+        market_data._stream_closed[('ETH/USDT', '5m')] = forming
+        await signals.analyze_crypto(object(), 'ETH/USDT', raw_candles=candles)
+        self.assertIsNone(signals.get_memoized(key))
+        self.assertEqual(signals.get_memoized(signals.evaluation_key('ETH/USDT', '5m', forming))['indicators']['close'], 500.0)
+
+    async def test_evaluated_bar_returns_the_memoized_signal(self):
+        candles = make_candles(5) # Closed long ago
+        key = signals.evaluation_key('ETH/USDT', config.CRYPTO_TIMEFRAME, candles.last_timestamp)
+        signals.memoize(key, {'rsi': 51.0}, {'symbol': 'ETH/USDT', 'side': 'LONG'})
+        # Any network access would fail: the exchange is a bare object
+        replayed = await signals.analyze_crypto(object(), 'ETH/USDT', raw_candles=candles)
+        self.assertEqual(replayed, {'symbol': 'ETH/USDT', 'side': 'LONG', 'memoized': True})
+        self.assertNotIn('memoized', signals.get_memoized(key)['signal'])
+
+class TestHedgedValidation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls, self.cancelled = [], []
+
+    def provider(self, name, delay, verdict=None):
+        async def ask(prompt):
+            self.calls.append(name)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(name)
+                raise
+            if verdict is None:
+                raise ValueError("429 RESOURCE_EXHAUSTED")
+            return {'confidence': '70%', 'reasoning': name, 'verdict': verdict}
+        return (name, name, ask)
+
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        providers = [self.provider('groq', 5, 'APPROVED'), self.provider('gemini', 0.02, 'REJECTED'), self.provider('openrouter', 0.01, 'APPROVED')]
+        start = time.perf_counter()
+        verdict = await signals.first_verdict(providers, "prompt", hedge_delay=0.05, budget=1)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(verdict['reasoning'], 'gemini')
+        self.assertEqual(self.calls, ['groq', 'gemini'])
+        await asyncio.sleep(0)
+        self.assertEqual(self.cancelled, ['groq'])
+
+    async def test_failure_moves_on_without_waiting(self):
+        providers = [self.provider('groq', 0, None), self.provider('gemini', 0.01, 'APPROVED')]
+        verdict = await signals.first_verdict(providers, "prompt", hedge_delay=None, budget=1)
+        self.assertEqual(verdict['reasoning'], 'gemini')
+
+    async def test_budget_returns_none(self):
+        providers = [self.provider('groq', 5, 'APPROVED'), self.provider('gemini', 5, 'APPROVED')]
+        start = time.perf_counter()
+        self.assertIsNone(await signals.first_verdict(providers, "prompt", hedge_delay=0.02, budget=0.1))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        await asyncio.sleep(0)
+        self.assertEqual(sorted(self.cancelled), ['gemini', 'groq'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+import indicators
+import streaming_indicators as si
+
+def make_ohlcv(n=400, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    high = close + rng.uniform(0, 40, n)
+    low = close - rng.uniform(0, 40, n)
+    volume = rng.uniform(1e5, 1e6, n)
+    return high, low, close, volume
+
+def run(indicator, *columns):
+    """Feeds closed bars one at a time and collects every value (NaN for None)."""
+    values = [indicator.update(*bar) for bar in zip(*columns)]
+    return np.array([np.nan if x is None else x for x in values])
+
+class TestStreamingIndicators(unittest.TestCase):
+    def setUp(self):
+        self.high, self.low, self.close, self.volume = make_ohlcv()
+
+    def assertSeries(self, ours, expected):
+        np.testing.assert_allclose(ours, expected, rtol=1e-9, equal_nan=True)
+
+    def test_bar_by_bar_matches_full_series(self):
+        self.assertSeries(run(si.EMA(20), self.close), indicators.ema_series(self.close, 20))
+        self.assertSeries(run(si.RSI(14), self.close), indicators.rsi_series(self.close, 14))
+        self.assertSeries(run(si.SMA(20), self.volume), indicators.sma_series(self.volume, 20))
+        self.assertSeries(run(si.ADX(14), self.high, self.low, self.close), indicators.adx_series(self.high, self.low, self.close, 14)[0])
+
+    def test_session_vwap_resets(self):
+        vwap = si.VWAP(session_ms=1000)
+        vwap.update(900, 12, 8, 10, 1)
+        self.assertEqual(vwap.update(950, 22, 18, 20, 1), 15)
+        self.assertEqual(vwap.update(1000, 32, 28, 30, 5), 30) # New session
+
+    def test_rolling_vwap_matches_series(self):
+        ts = np.arange(len(self.close)) * 300000
+        expected = indicators.vwap_series(self.high, self.low, self.close, self.volume, window=20)
+        self.assertSeries(run(si.VWAP(window=20), ts, self.high, self.low, self.close, self.volume), expected)
+
+    def test_forming_bar_is_reapplied_and_rolled_back(self):
+        rsi = si.RSI(14)
+        rsi.update_many(self.close[:-1])
+        closed = rsi.value
+        rsi.update(self.close[-1] * 1.05, closed=False)
+        self.assertNotAlmostEqual(rsi.value, closed)
+        rsi.update(self.close[-1], closed=False) # Next tick of the same bar
+        self.assertAlmostEqual(rsi.value, indicators.rsi_series(self.close, 14)[-1], places=9)
+        self.assertEqual(rsi.rollback(), closed)
+
+if __name__ == '__main__':
+    unittest.main()
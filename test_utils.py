@@ -0,0 +1,40 @@
+import asyncio
+import time
+import unittest
+import utils
+
+class TestBoundedTasks(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_ordered_and_bounded(self):
+        running, peak = 0, 0
+
+        async def work(delay):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(delay)
+            running -= 1
+            if delay == 0.03:
+                raise ValueError("exchange error")
+            return delay
+
+        delays = [0.2, 0.05, 0.03, 0.1, 5.0, 0.01]
+        start = time.perf_counter()
+        results = await utils.bounded_gather(work, delays, limit=4, timeout=0.3)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, [0.2, 0.05, None, 0.1, None, 0.01]) # Input order, failures/timeouts as None
+        self.assertEqual(peak, 4)
+        self.assertLess(elapsed, 1.0) # ~ the slowest item (timeout), not the sum
+
+    async def test_tasks_can_be_consumed_in_order(self):
+        async def work(delay):
+            await asyncio.sleep(delay)
+            return delay
+
+        seen = []
+        for task in utils.bounded_tasks(work, [0.05, 0.01], limit=2, timeout=None):
+            seen.append(await task)
+        self.assertEqual(seen, [0.05, 0.01])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+import unittest
+import signals
+import verdict_cache
+from verdict_cache import VerdictCache
+
+APPROVED = {'confidence': '80% (G)', 'reasoning': 'Trend intact', 'verdict': 'APPROVED'}
+
+class TestVerdictCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ai_verdicts.json')
+
+    def tearDown(self):
+        verdict_cache._verdict_cache = None
+        self.tmp.cleanup()
+
+    def test_lru_eviction_and_ttl(self):
+        cache = VerdictCache(max_size=2, ttl=60)
+        cache.put('a', APPROVED)
+        cache.put('b', APPROVED)
+        cache.get('a') # 'b' is now the least recently used
+        cache.put('c', APPROVED)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), APPROVED)
+
+        cache.ttl = -1
+        cache.put('d', APPROVED)
+        self.assertIsNone(cache.get('d')) # Expired
+
+    def test_persisted_across_restarts(self):
+        VerdictCache(self.path, ttl=60).put('a', APPROVED)
+        self.assertEqual(VerdictCache(self.path).get('a'), APPROVED)
+        self.assertEqual(len(VerdictCache(os.path.join(self.tmp.name, 'missing.json'))), 0)
+
+    async def test_redetected_signal_skips_the_llm(self):
+        verdict_cache._verdict_cache = VerdictCache(self.path, ttl=60)
+        ts = 1700000100000
+        key = verdict_cache.verdict_key('BTC/USDT', 'LONG', 'RSI_Reversal_VWAP_Trend', ts, signals.AI_PROMPT_VERSION)
+        verdict_cache.get_verdict_cache().put(key, APPROVED)
+
+        start = time.perf_counter()
+        ai_data = await signals.validate_with_ai('BTC/USDT', 'CRYPTO', 'LONG', 'RSI_Reversal_VWAP_Trend (Candle -3)', None, signal_ts=ts)
+        self.assertEqual(ai_data, APPROVED) # Candle -1 when first seen, -3 now: same signal
+        self.assertLess(time.perf_counter() - start, 0.01)
+
+if __name__ == '__main__':
+    unittest.main()
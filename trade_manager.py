@@ -7,6 +7,7 @@ import market_data
 import config
 import asyncio
 import sheets
+import telegram_handler
 import utils
 
 logger = logging.getLogger(__name__)
@@ -153,37 +154,31 @@ class TradeManager:
             
             if channel_id:
                 try:
-                    await bot.send_message(chat_id=channel_id, text=msg, parse_mode='Markdown')
+                    await telegram_handler.send_message(bot, channel_id, msg, parse_mode='Markdown')
                 except Exception as e:
                     logger.error(f"Failed to send trade open notification: {e}")
 
-    async def update_trades(self, bot):
-        """Checks live price for all active trades."""
+    def held_symbols(self):
+        """Symbols of active trades, split by market: (crypto, stock)."""
+        crypto = {t['symbol'] for t in self.active_trades if 'CRYPTO' in t['market']}
+        stock = {t['symbol'] for t in self.active_trades if t['market'] == 'STOCK'}
+        return crypto, stock
+
+    async def update_trades(self, bot, snapshot=None):
+        """
+        Checks live price for all active trades.
+        snapshot: shared read-only {symbol: last price} (see market_data.fetch_price_snapshot);
+        fetched for this manager's own symbols when not given.
+        """
         if not self.active_trades:
             return
 
+        if snapshot is None:
+            snapshot = await market_data.fetch_price_snapshot(*self.held_symbols())
+
         for trade in self.active_trades[:]:
             try:
-                # Fetch current price with retries
-                curr_price = None
-                for attempt in range(3):
-                    try:
-                        if 'CRYPTO' in trade['market']:
-                            exchange = market_data.get_crypto_exchange()
-                            ticker = await asyncio.to_thread(exchange.fetch_ticker, trade['symbol'])
-                            curr_price = ticker['last']
-                        else:
-                            # Stocks
-                            df = await market_data.fetch_stock_data(trade['symbol'], period='1d', interval='5m')
-                            if df is not None and not df.empty:
-                                curr_price = df['close'].iloc[-1]
-                        
-                        if curr_price is not None:
-                            break
-                    except Exception as e:
-                        logger.warning(f"Attempt {attempt+1} failed for {trade['symbol']}: {e}")
-                        await asyncio.sleep(1)
-
+                curr_price = snapshot.get(trade['symbol'])
                 if curr_price is None:
                     continue
 
@@ -299,7 +294,7 @@ class TradeManager:
              channel_id = config.TELEGRAM_STOCK_CHANNEL_ID
 
         if channel_id:
-             asyncio.create_task(bot.send_message(chat_id=channel_id, text=msg, parse_mode='Markdown'))
+             asyncio.create_task(telegram_handler.send_message(bot, channel_id, msg, parse_mode='Markdown'))
         else:
              logger.info(f"Trade Closed ({outcome}): {trade['symbol']} (No Channel set)")
 
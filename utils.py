@@ -1,7 +1,12 @@
+import asyncio
+import logging
 import pytz
 from datetime import datetime
 import config
 import numpy as np
+import indicators
+
+logger = logging.getLogger(__name__)
 
 def get_ist_time():
     """Returns current time in IST."""
@@ -46,69 +51,63 @@ def calculate_position_size(account_balance, risk_percentage, stop_loss_percenta
 
 # --- Lightweight Indicators (Zero-Pandas) ---
 
+# Inputs may be lists or NumPy arrays (e.g. zero-copy CandleBuffer views); np.asarray never copies arrays.
+
 def calculate_sma(values, period):
     """Simple Moving Average using NumPy."""
     if len(values) < period: return None
     return float(np.mean(values[-period:]))
 
+def calculate_sma_series(values, period):
+    """SMA for every candle (NumPy array via prefix sums, NaN for the first period-1)."""
+    return indicators.sma_series(values, period)
+
 def calculate_ema(values, period):
-    """Exponential Moving Average using NumPy (or manual loop)."""
+    """Exponential Moving Average (latest value, SMA-seeded)."""
     if len(values) < period: return None
-    
-    # Simple initialization with SMA
-    ema = np.mean(values[:period]) 
-    multiplier = 2 / (period + 1)
-    
-    for value in values[period:]:
-        ema = (value - ema) * multiplier + ema
-        
-    return float(ema)
+    return float(indicators.ema_series(values, period)[-1])
 
 def calculate_rsi(prices, period=14):
-    """Relative Strength Index using NumPy."""
+    """Relative Strength Index (latest value, Wilder smoothing)."""
     if len(prices) < period + 1: return 50.0 # Default neutral
-    
-    deltas = np.diff(prices)
-    gains = np.maximum(deltas, 0)
-    losses = np.abs(np.minimum(deltas, 0))
-    
-    # Calculate initial averages
-    avg_gain = np.mean(gains[:period])
-    avg_loss = np.mean(losses[:period])
-    
-    # Optimize: If avg_loss is 0, RSI is 100
-    if avg_loss == 0: return 100.0
-    
-    # Smoothed updates (Wilder's Smoothing)
-    # The standard formula usually keeps updating. 
-    # For a snapshot, a simple SMA based RSI is often "close enough" but 
-    # Wilder's is better. Let's do a simple rolling update if we have enough data.
-    
-    for i in range(period, len(gains)):
-        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        
-    if avg_loss == 0: return 100.0
-    rs = avg_gain / avg_loss
-    return float(100 - (100 / (1 + rs)))
-
-def calculate_vwap(high, low, close, volume):
-    """Volume Weighted Average Price (Full Series)."""
-    # Assuming inputs are lists or arrays of same length
-    h = np.array(high)
-    l = np.array(low)
-    c = np.array(close)
-    v = np.array(volume)
-    
-    typical_price = (h + l + c) / 3
-    # Cumulative VWAP
-    # We only need the latest VWAP really, but standard definition is cumulative from start of session.
-    # For crypto (24/7), 'session' is ambiguous. 
-    # Usually rolling VWAP or valid for the loaded window (100 candles).
-    
-    tp_v = typical_price * v
-    cum_tp_v = np.cumsum(tp_v)
-    cum_vol = np.cumsum(v)
-    
-    vwap_series = cum_tp_v / cum_vol
-    return vwap_series[-1] # Return latest value only
+    rsi = indicators.rsi_series(prices, period)[-1]
+    return 50.0 if np.isnan(rsi) else float(rsi) # No movement at all -> neutral
+
+def calculate_rsi_series(prices, period=14):
+    """RSI for every candle (NumPy array, NaN where undefined), e.g. for signal lookbacks."""
+    return indicators.rsi_series(prices, period)
+
+def calculate_vwap(high, low, close, volume, timestamps=None, anchor_offset_ms=0, window=None):
+    """
+    Volume Weighted Average Price (latest value).
+    Anchored to sessions when timestamps are given (see indicators.vwap_series), rolling with window=N,
+    otherwise cumulative over the loaded window.
+    """
+    return indicators.vwap_latest(high, low, close, volume, timestamps, anchor_offset_ms, window)
+
+# --- Async Helpers ---
+
+def bounded_tasks(worker, items, limit, timeout, label='task'):
+    """
+    Schedules worker(item) for every item with at most `limit` running at once and a per-item
+    timeout (seconds, None = no limit). Returns the tasks in input order, so callers can consume
+    results in a deterministic order while later items are still running.
+    A task resolves to None if its worker raised or timed out (logged, never raised).
+    """
+    sem = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with sem:
+            try:
+                return await asyncio.wait_for(worker(item), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{label} {item}: timed out after {timeout}s")
+            except Exception as e:
+                logger.error(f"{label} {item}: {e}")
+            return None
+
+    return [asyncio.create_task(run(item)) for item in items]
+
+async def bounded_gather(worker, items, limit, timeout, label='task'):
+    """bounded_tasks, awaited: the results in input order (None for failures)."""
+    return await asyncio.gather(*bounded_tasks(worker, items, limit, timeout, label))
@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+import config
+
+logger = logging.getLogger(__name__)
+
+def verdict_key(symbol, side, setup, signal_ts, prompt_version):
+    """Identity of one detected signal: the same crossover re-detected on a later scan maps to the same key."""
+    return f"{symbol}|{side}|{setup}|{signal_ts}|v{prompt_version}"
+
+class VerdictCache:
+    """
+    LRU cache of AI verdicts ({'confidence', 'reasoning', 'verdict'}) with a TTL, persisted to JSON.
+    The lookback re-detects a crossover on every scan until it ages out; each detection after the
+    first is answered from here instead of another 1-10 s LLM call.
+    """
+    def __init__(self, path=None, max_size=500, ttl=3600):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at epoch seconds, verdict)
+        if path:
+            self._load()
+
+    def get(self, key):
+        """The cached verdict (None on a miss or once expired)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, verdict):
+        self._entries[key] = (time.time() + self.ttl, verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self.save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """Writes the live entries (oldest first) to `path` atomically."""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump([[key, expires, verdict] for key, (expires, verdict) in self._entries.items()], f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save AI verdicts to {self.path}: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                rows = json.load(f)
+            now = time.time()
+            for key, expires, verdict in rows[-self.max_size:]:
+                if expires > now:
+                    self._entries[key] = (expires, verdict)
+            logger.info(f"Loaded {len(self._entries)} cached AI verdicts")
+        except (OSError, ValueError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Could not load AI verdicts from {self.path}: {e}")
+
+_verdict_cache = None
+
+def get_verdict_cache():
+    global _verdict_cache
+    if _verdict_cache is None:
+        _verdict_cache = VerdictCache(config.AI_VERDICT_CACHE_PATH, config.AI_VERDICT_CACHE_SIZE, config.AI_VERDICT_CACHE_TTL)
+    return _verdict_cache